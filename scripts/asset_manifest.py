@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Typed asset manifest for the Next.js site.
+
+Pages used to reference assets through hardcoded paths or ``*_latest`` CDN
+aliases, which are cached for only 300 seconds. This module emits a
+deterministic module mapping logical asset IDs to the immutable versioned
+CDN URLs (cached for a year), so pages can link the exact bytes they were
+built against:
+
+  asset ID:  {event}/{type}/{slug}{-lang?}        e.g. iccv2025/r/iccv2025-report-en
+  files:     one entry per variant and extension of the current version
+             (key, url, size, short content hash, ext, variant)
+
+Sources:
+  - ``--results FILE``: JSON printed by ``upload_static.py`` (single result,
+    batch array or ``{"results": [...]}``) or ``image_derivatives.py``.
+  - ``--from-inventory``: every asset in the local inventory index
+    (``inventory.py``; ``--refresh`` lists the bucket first, which also picks
+    up promotions and rollbacks made since the last refresh).
+  Results override the inventory for the assets they contain.
+
+Each asset is emitted at the version its latest alias points to (the
+``points-to`` metadata stored by the inventory), so a rollback with
+``promote_latest.py`` rolls the site back too. Assets without a resolvable
+alias fall back to their newest upload.
+
+Output:
+  - ``.ts`` (default ``src/data/cdnAssets.ts``): types plus an
+    ``as const satisfies`` object, formatted like the repo's Prettier config
+    (single quotes, no semicolons, ES5 trailing commas), so
+    ``npm run format-check`` passes on the generated file.
+  - ``.json``: the same data for other consumers.
+  Keys are sorted and no timestamps are written, so unchanged inputs give a
+  byte-identical file; the file is only rewritten when its content changes.
+
+Examples:
+  $ python upload_static.py --manifest slides.yaml > /tmp/published.json
+  $ python asset_manifest.py --results /tmp/published.json --from-inventory
+  $ python asset_manifest.py --from-inventory --refresh --prefix iccv2025/ --output ../src/data/cdnAssets.json
+"""
+
+import argparse
+import json
+import re
+from pathlib import Path
+from typing import Final
+
+from inventory import INVENTORY_PATH, Inventory, parse_cdn_key, refresh_alias_targets, refresh_from_listing
+from upload_static import error_result, is_client_error, make_s3_client, resolve_env_targets
+
+
+MANIFEST_PATH: Final = Path(__file__).resolve().parent.parent / "src" / "data" / "cdnAssets.ts"
+PRINT_WIDTH: Final = 80  # Prettier default
+TS_HEADER: Final = """\
+// Generated by scripts/asset_manifest.py. Do not edit by hand.
+
+export type CdnAssetFile = {
+  key: string
+  url: string
+  size: number
+  hash: string
+  ext: string
+  variant: string | null
+}
+
+export type CdnAsset = {
+  event: string
+  type: string
+  slug: string
+  lang: string | null
+  versionTag: string
+  url: string
+  files: readonly CdnAssetFile[]
+}
+
+"""
+
+
+# -------- Collection --------
+
+def asset_id(fields: dict) -> str:
+    """Logical ID of an asset: ``{event}/{type}/{slug}{-lang?}``.
+
+    Examples:
+      >>> asset_id({"event": "iccv2025", "type": "r", "slug": "iccv2025-report", "lang": "en"})
+      'iccv2025/r/iccv2025-report-en'
+    """
+    lang = f"-{fields['lang']}" if fields.get("lang") else ""
+    return f"{fields['event']}/{fields['type']}/{fields['slug']}{lang}"
+
+
+def file_record(key: str, url: str, size: int, order: float, current: bool = False) -> dict | None:
+    """Describe one published versioned file, or ``None`` for aliases, sidecars and foreign keys.
+
+    ``current`` marks a file a latest alias points to.
+    """
+    fields = parse_cdn_key(key)
+    if fields is None or fields["is_alias"] or fields["encoding"] is not None:
+        return None
+    return {
+        "id": asset_id(fields),
+        "event": fields["event"],
+        "type": fields["type"],
+        "slug": fields["slug"],
+        "lang": fields["lang"],
+        "versionTag": fields["version_tag"],
+        "order": order,
+        "current": current,
+        "file": {
+            "key": key,
+            "url": url,
+            "size": size,
+            "hash": fields["hash"],
+            "ext": fields["ext"],
+            "variant": fields["variant"],
+        },
+    }
+
+
+def records_from_results(results: list[dict]) -> list[dict]:
+    """Turn uploader results into file records (failed entries and dry-runs are skipped).
+
+    A successful upload leaves its alias pointing at the new version, so the
+    records are marked current.
+    """
+    records = []
+    for r in results:
+        if "error" in r or r.get("dry_run") or "key_versioned" not in r:
+            continue
+        url = r["cloudfront_url_versioned"]
+        record = file_record(r["key_versioned"], url, r.get("size", 0), float("inf"), current=True)
+        if record:
+            records.append(record)
+    return records
+
+
+def load_results(path: Path) -> list[dict]:
+    """Read uploader output: one result, an array, or ``{"results": [...]}``."""
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if isinstance(data, dict):
+        data = data.get("results", [data])
+    return data
+
+
+def records_from_inventory(inventory: Inventory, *, bucket: str, domain: str, prefixes: list[str]) -> list[dict]:
+    """Turn inventory rows into file records ordered by upload time, marking alias targets current."""
+    records = []
+    for prefix in prefixes:
+        rows = inventory.query(bucket, prefix=prefix)
+        # Same resolution as Inventory.aliases(): stored points-to, else a single-part ETag match
+        by_etag = {r["etag"]: r["key"] for r in rows if not r["is_alias"] and r["encoding"] is None}
+        targets = {
+            r["points_to"] or by_etag.get(r["etag"]) for r in rows if r["is_alias"] and r["encoding"] is None
+        }
+        for row in rows:
+            url = f"https://{domain}/{row['key']}"
+            record = file_record(row["key"], url, row["size"], row["last_modified"], current=row["key"] in targets)
+            if record:
+                records.append(record)
+    return records
+
+
+def _natural(value: str | None) -> tuple:
+    """Sort key that orders ``w320`` before ``w1200`` and ``None`` first."""
+    if value is None:
+        return ()
+    return tuple(int(t) if t.isdigit() else t for t in re.split(r"(\d+)", value))
+
+
+def build_manifest(records: list[dict]) -> dict[str, dict]:
+    """Group file records into assets, keeping only the current version of each.
+
+    For every asset the version of its most recent ``current`` record (an
+    alias target) wins; an asset with no current record takes the version of
+    its most recent record. Ties go to the record listed last. Within that
+    version the most recent file per (variant, ext) is kept. The asset
+    ``url`` is the file without a variant (or the first file in natural
+    variant order).
+
+    Examples:
+      >>> recs = [
+      ...     file_record("e/a/p_v1_aaaaaaaaaaaa-w640.webp", "u1", 5, 1),
+      ...     file_record("e/a/p_v2_bbbbbbbbbbbb-w1200.webp", "u3", 9, 2),
+      ...     file_record("e/a/p_v2_bbbbbbbbbbbb-w320.webp", "u2", 3, 2),
+      ... ]
+      >>> m = build_manifest(recs)["e/a/p"]
+      >>> m["versionTag"], m["url"], [f["variant"] for f in m["files"]]
+      ('v2', 'u2', ['w320', 'w1200'])
+
+      After a rollback the alias points at v1, which wins over the newer v2:
+
+      >>> recs[0]["current"] = True
+      >>> build_manifest(recs)["e/a/p"]["versionTag"]
+      'v1'
+    """
+    by_asset = {}
+    for pos, rec in enumerate(records):
+        by_asset.setdefault(rec["id"], []).append((rec["order"], pos, rec))
+    manifest = {}
+    for aid, entries in sorted(by_asset.items()):
+        recs = [rec for _, _, rec in sorted(entries, key=lambda e: e[:2])]
+        newest = ([rec for rec in recs if rec["current"]] or recs)[-1]
+        files = {}
+        for rec in recs:
+            if rec["versionTag"] == newest["versionTag"]:
+                files[(rec["file"]["variant"], rec["file"]["ext"])] = rec["file"]
+        ordered = [files[k] for k in sorted(files, key=lambda k: (_natural(k[0]), k[1]))]
+        manifest[aid] = {
+            "event": newest["event"],
+            "type": newest["type"],
+            "slug": newest["slug"],
+            "lang": newest["lang"],
+            "versionTag": newest["versionTag"],
+            "url": ordered[0]["url"],
+            "files": ordered,
+        }
+    return manifest
+
+
+# -------- Rendering --------
+
+def _ts_key(key: str) -> str:
+    """Render an object key, quoting it only when it is not an identifier."""
+    return key if re.fullmatch(r"[A-Za-z_$][\w$]*", key) else _ts_value(key)
+
+
+def _ts_value(value) -> str:
+    """Render a scalar as a TypeScript literal (single-quoted strings)."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'").replace("\n", "\\n") + "'"
+
+
+def _ts_lines(value, indent: int) -> list[str]:
+    """Render a dict/list body as Prettier-formatted lines at ``indent`` spaces."""
+    pad = " " * indent
+    lines = []
+    items = value.items() if isinstance(value, dict) else ((None, v) for v in value)
+    for key, item in items:
+        head = f"{pad}{_ts_key(key)}: " if key is not None else pad
+        if isinstance(item, (dict, list)):
+            if not item:
+                lines.append(f"{head}{'{}' if isinstance(item, dict) else '[]'},")
+                continue
+            open_, close = ("{", "}") if isinstance(item, dict) else ("[", "]")
+            lines.append(f"{head}{open_}")
+            lines += _ts_lines(item, indent + 2)
+            lines.append(f"{pad}{close},")
+        elif key is not None and len(f"{head}{_ts_value(item)},") > PRINT_WIDTH:
+            # Prettier moves long string values below their key
+            lines.append(head.rstrip())
+            lines.append(f"{pad}  {_ts_value(item)},")
+        else:
+            lines.append(f"{head}{_ts_value(item)},")
+    return lines
+
+
+def render_ts(manifest: dict[str, dict]) -> str:
+    """Render the manifest as a typed TypeScript module.
+
+    Examples:
+      >>> print(render_ts({}), end="")  # doctest: +ELLIPSIS
+      // Generated by scripts/asset_manifest.py. Do not edit by hand.
+      ...
+      export const cdnAssets = {} as const satisfies Record<string, CdnAsset>
+      <BLANKLINE>
+      export type CdnAssetId = keyof typeof cdnAssets
+    """
+    if manifest:
+        body = "\n".join(["export const cdnAssets = {", *_ts_lines(manifest, 2), "}"])
+    else:
+        body = "export const cdnAssets = {}"
+    footer = "export type CdnAssetId = keyof typeof cdnAssets"
+    return f"{TS_HEADER}{body} as const satisfies Record<string, CdnAsset>\n\n{footer}\n"
+
+
+def render_json(manifest: dict[str, dict]) -> str:
+    """Render the manifest as sorted, indented JSON."""
+    return json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True) + "\n"
+
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """Write ``content`` unless the file already holds it; return whether it was written."""
+    if path.exists() and path.read_text(encoding="utf-8") == content:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+    return True
+
+
+# -------- CLI --------
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments for the manifest emitter.
+
+    Returns:
+      An ``argparse.Namespace`` with ``results``, ``from_inventory``,
+      ``refresh``, ``prefix``, ``db`` and ``output`` attributes.
+    """
+    p = argparse.ArgumentParser(description="Emit a typed manifest of versioned LIMIT.Lab CDN assets")
+    p.add_argument("--results", action="append", default=[], help="Uploader JSON output (repeatable)")
+    p.add_argument(
+        "--from-inventory", action="store_true", help="Include the current (alias) version of every indexed asset"
+    )
+    p.add_argument("--refresh", action="store_true", help="Refresh the inventory from a listing first")
+    p.add_argument("--prefix", action="append", default=None, help="Only include assets under this prefix")
+    p.add_argument("--db", default=str(INVENTORY_PATH), help="Path of the inventory database")
+    p.add_argument("--output", default=str(MANIFEST_PATH), help="Output file (.ts or .json)")
+    args = p.parse_args()
+    if not args.results and not args.from_inventory:
+        p.error("give --results and/or --from-inventory")
+    return args
+
+
+def main() -> int:
+    """CLI entry point.
+
+    Exit codes:
+      0: Success (manifest written or already up to date).
+      1: Generic error (e.g., unreadable results file).
+      3: AWS client error (STS/S3 API responded with an error).
+
+    Returns:
+      Process exit code: 0 on success, non-zero on failure.
+    """
+    inventory = None
+    try:
+        args = parse_args()
+        records = []
+        if args.from_inventory:
+            env_info = resolve_env_targets(dry_run=True)  # reads the bucket only
+            inventory = Inventory(Path(args.db))
+            s3 = make_s3_client()
+            if args.refresh:
+                refresh_from_listing(inventory, s3, bucket=env_info["bucket"], prefixes=args.prefix)
+            for prefix in args.prefix or [""]:
+                # Indexes from before points-to was stored; only unresolved aliases are read
+                refresh_alias_targets(inventory, s3, bucket=env_info["bucket"], prefix=prefix)
+            records += records_from_inventory(
+                inventory, bucket=env_info["bucket"], domain=env_info["domain"], prefixes=args.prefix or [""]
+            )
+        for path in args.results:
+            records += [
+                r
+                for r in records_from_results(load_results(Path(path)))
+                if not args.prefix or r["file"]["key"].startswith(tuple(args.prefix))
+            ]
+        manifest = build_manifest(records)
+        output = Path(args.output)
+        content = render_json(manifest) if output.suffix == ".json" else render_ts(manifest)
+        changed = write_if_changed(output, content)
+        files = sum(len(a["files"]) for a in manifest.values())
+        print(json.dumps({"output": str(output), "assets": len(manifest), "files": files, "changed": changed}))
+        return 0
+    except Exception as e:
+        print(json.dumps({"error": error_result("", e)["error"]}, ensure_ascii=False))
+        return 3 if is_client_error(e) else 1
+    finally:
+        if inventory is not None:
+            inventory.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline benchmark harness for ``upload_static.upload()``.
+
+Runs the real upload path (hashing, PUT/multipart, alias copy) end to end
+against a local S3 stand-in, so performance changes to the uploader can be
+measured without touching the prod/dev buckets:
+
+  - ``--moto`` starts a moto server in a child process (``pip install
+    "moto[server]"``). It keeps objects in memory, so prefer MinIO for the
+    multi-GB corpus.
+  - ``--endpoint-url URL`` targets an already running emulator such as MinIO
+    (``minio server /tmp/minio``); credentials come from the usual AWS
+    environment variables.
+
+Synthetic corpora (generated once per run into a temporary directory,
+deterministic for a given ``--seed``):
+  tiny    2000 JSON-sized files (0.5-4 KiB): per-request latency bound.
+  slides  40 PDF-sized files (256 KiB-40 MiB, log-uniform): the common publish.
+  blobs   1 file of ``--blob-gb`` GiB: multipart throughput and memory bound.
+
+Each corpus runs in a fresh worker process so its peak RSS is isolated.
+Reported per corpus: objects/s, MB/s, per-object latency p50/p95/max,
+hash MB/s (from the upload timings), peak RSS and retry count. Results are
+written to a JSON file together with the git commit and host details;
+``--compare BASELINE.json`` prints the relative change against an earlier
+run and exits non-zero when throughput regresses beyond ``--tolerance``.
+
+Examples:
+  $ python bench_upload_static.py --moto --corpus tiny,slides --output bench.json
+  $ python bench_upload_static.py --endpoint-url http://127.0.0.1:9000 --blob-gb 4 \\
+        --output bench-new.json --compare bench.json
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Final
+
+from upload_static import BATCH_JOBS, MIB, MULTIPART_MAX_WORKERS, PhaseTimer, make_s3_client, upload
+
+
+BENCH_BUCKET: Final = "limitlab-bench"
+CORPORA: Final = {
+    "tiny": {"count": 2000, "min_size": 512, "max_size": 4 * 1024, "ext": ".json"},
+    "slides": {"count": 40, "min_size": 256 * 1024, "max_size": 40 * MIB, "ext": ".pdf"},
+    "blobs": {"count": 1, "min_size": None, "max_size": None, "ext": ".mp4"},  # sized by --blob-gb
+}
+BLOCK_SIZE: Final = 8 * MIB
+
+
+# -------- Corpus --------
+
+def corpus_sizes(spec: dict, seed: int) -> list[int]:
+    """Draw deterministic, log-uniform file sizes for a corpus spec.
+
+    Examples:
+      >>> spec = {"count": 3, "min_size": 100, "max_size": 100, "ext": ".json"}
+      >>> corpus_sizes(spec, 1)
+      [100, 100, 100]
+    """
+    rng = random.Random(seed)
+    lo, hi = math.log(spec["min_size"]), math.log(spec["max_size"])
+    return [int(math.exp(rng.uniform(lo, hi))) for _ in range(spec["count"])]
+
+
+def write_corpus(out_dir: Path, name: str, spec: dict, seed: int) -> list[Path]:
+    """Write a synthetic corpus; every file gets unique content (distinct hashes).
+
+    Args:
+      out_dir: Directory receiving the files.
+      name: Corpus name (file name prefix).
+      spec: Entry of ``CORPORA`` with sizes filled in.
+      seed: Random seed.
+
+    Returns:
+      The written file paths.
+    """
+    block = random.Random(seed).randbytes(BLOCK_SIZE)
+    paths = []
+    for i, size in enumerate(corpus_sizes(spec, seed)):
+        path = out_dir / f"{name}-{i:05d}{spec['ext']}"
+        with path.open("wb") as f:
+            header = f"{name}:{seed}:{i}\n".encode()
+            f.write(header[:size])
+            remaining = size - min(len(header), size)
+            offset = i % BLOCK_SIZE
+            while remaining > 0:
+                chunk = block[offset : offset + remaining]
+                f.write(chunk)
+                remaining -= len(chunk)
+                offset = 0
+        paths.append(path)
+    return paths
+
+
+# -------- S3 stand-in --------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_moto() -> tuple[subprocess.Popen, str]:
+    """Start ``moto.server`` in a child process and wait until it accepts connections.
+
+    Returns:
+      ``(process, endpoint_url)``; the server log is written to a temporary file.
+
+    Raises:
+      RuntimeError: If moto is not installed or the server does not come up.
+    """
+    port = _free_port()
+    # The server logs every request; a file (unlike an undrained pipe) never blocks it
+    log = tempfile.NamedTemporaryFile(prefix="moto-", suffix=".log", delete=False)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "moto.server", "-H", "127.0.0.1", "-p", str(port)],
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+    log.close()
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            err = Path(log.name).read_text(errors="replace").strip().splitlines()
+            raise RuntimeError(f"moto server failed ({err[-1] if err else 'no output'}); pip install 'moto[server]'.")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return proc, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("moto server did not start within 30 s.")
+
+
+def point_sdk_at(endpoint_url: str) -> None:
+    """Route every boto3 S3 client of this process (and its children) to ``endpoint_url``.
+
+    ``AWS_ENDPOINT_URL_S3`` is honored by botocore, so ``upload()`` and
+    ``make_s3_client()`` run unmodified. Dummy credentials are filled in
+    only when none are configured.
+    """
+    os.environ["AWS_ENDPOINT_URL_S3"] = endpoint_url
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench-secret")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+
+# -------- Measurement --------
+
+def percentile(values: list[float], q: float) -> float | None:
+    """Nearest-rank percentile (``q`` in 0..100).
+
+    Examples:
+      >>> percentile([1.0, 2.0, 3.0, 4.0], 50), percentile([1.0, 2.0, 3.0, 4.0], 95)
+      (2.0, 4.0)
+      >>> percentile([], 50) is None
+      True
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def run_corpus(name: str, paths: list[str], *, jobs: int, max_workers: int, part_size: int) -> dict:
+    """Upload one corpus with ``upload()`` and summarize; runs in a worker process.
+
+    Args:
+      name: Corpus name (used as the benchmark event prefix).
+      paths: Files to upload.
+      jobs: Objects uploaded concurrently.
+      max_workers: Concurrent parts per multipart upload.
+      part_size: Multipart part size in bytes.
+
+    Returns:
+      A JSON-serializable summary (see the module docstring).
+    """
+    s3 = make_s3_client(jobs * max_workers)
+    timer = PhaseTimer()
+    latencies, errors = [], []
+
+    def one(i_path: tuple[int, str]) -> None:
+        i, path = i_path
+        start = time.perf_counter()
+        try:
+            result = upload(
+                bucket=BENCH_BUCKET,
+                domain="bench.invalid",
+                file_path=Path(path),
+                event="bench",
+                type_code=name,
+                slug=f"obj-{i:05d}",
+                version_tag="v0",
+                lang=None,
+                variant=None,
+                dry_run=False,
+                env="bench",
+                account_id="000000000000",
+                part_size=part_size,
+                max_workers=max_workers,
+                s3=s3,
+            )
+        except Exception as e:
+            errors.append(f"{path}: {e}")
+            return
+        latencies.append(time.perf_counter() - start)
+        for phase, p in result["timings"].items():
+            timer.add(phase, p["seconds"], nbytes=p["bytes"], retries=p["retries"], count=p["count"])
+
+    total_bytes = sum(os.path.getsize(p) for p in paths)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        list(pool.map(one, enumerate(paths)))
+    elapsed = time.perf_counter() - start
+
+    phases = timer.as_dict()
+    hashing = [phases[k] for k in ("hash", "hash_part") if k in phases]
+    hash_bytes, hash_seconds = sum(p["bytes"] for p in hashing), sum(p["seconds"] for p in hashing)
+    return {
+        "objects": len(paths),
+        "bytes": total_bytes,
+        "errors": errors[:20],
+        "error_count": len(errors),
+        "seconds": round(elapsed, 6),
+        "objects_per_s": round(len(latencies) / elapsed, 3) if elapsed else None,
+        "mb_per_s": round(total_bytes / MIB / elapsed, 3) if elapsed else None,
+        "latency_s": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "max": max(latencies, default=None),
+        },
+        "hash_mb_per_s": round(hash_bytes / MIB / hash_seconds, 3) if hash_seconds else None,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),  # KiB on Linux
+        "retries": sum(p["retries"] for p in phases.values()),
+        "phases": phases,
+    }
+
+
+def host_info() -> dict:
+    """Describe the run (commit, interpreter, CPU) so results can be compared."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> tuple[dict, bool]:
+    """Relative change of the headline metrics against a baseline run.
+
+    Args:
+      current: Result document of this run.
+      baseline: Result document of an earlier run.
+      tolerance: Allowed relative throughput drop (e.g., 0.1 for 10 %).
+
+    Returns:
+      ``(deltas, regressed)``; deltas map corpus to metric to relative change.
+
+    Examples:
+      >>> cur = {"corpora": {"tiny": {"mb_per_s": 9.0, "objects_per_s": 90.0, "latency_s": {"p95": 0.2}}}}
+      >>> base = {"corpora": {"tiny": {"mb_per_s": 10.0, "objects_per_s": 100.0, "latency_s": {"p95": 0.1}}}}
+      >>> compare(cur, base, 0.05)
+      ({'tiny': {'mb_per_s': -0.1, 'objects_per_s': -0.1, 'latency_p95': 1.0}}, True)
+    """
+    deltas, regressed = {}, False
+    for name, cur in current["corpora"].items():
+        base = baseline.get("corpora", {}).get(name)
+        if not base:
+            continue
+        pairs = {
+            "mb_per_s": (cur["mb_per_s"], base["mb_per_s"]),
+            "objects_per_s": (cur["objects_per_s"], base["objects_per_s"]),
+            "latency_p95": (cur["latency_s"]["p95"], base["latency_s"]["p95"]),
+        }
+        deltas[name] = {k: round(c / b - 1, 4) for k, (c, b) in pairs.items() if c is not None and b}
+        regressed |= any(deltas[name].get(k, 0) < -tolerance for k in ("mb_per_s", "objects_per_s"))
+    return deltas, regressed
+
+
+# -------- CLI --------
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments for the benchmark harness.
+
+    Returns:
+      An ``argparse.Namespace`` with ``moto``, ``endpoint_url``, ``corpus``,
+      ``blob_gb``, ``seed``, ``jobs``, ``max_workers``, ``part_size_mb``,
+      ``workdir``, ``output``, ``compare`` and ``tolerance`` attributes.
+    """
+    p = argparse.ArgumentParser(description="Benchmark upload_static.upload() against a local S3 stand-in")
+    target = p.add_mutually_exclusive_group(required=True)
+    target.add_argument("--moto", action="store_true", help="Start a moto server child process")
+    target.add_argument("--endpoint-url", help="Endpoint of a running S3 emulator (e.g., MinIO)")
+    p.add_argument("--corpus", default=",".join(CORPORA), help="Comma-separated corpora to run")
+    p.add_argument("--blob-gb", type=float, default=2.0, help="Size of the blobs corpus file in GiB")
+    p.add_argument("--seed", type=int, default=20251019, help="Seed for the synthetic corpora")
+    p.add_argument("--jobs", type=int, default=BATCH_JOBS, help="Objects uploaded concurrently")
+    p.add_argument("--max-workers", type=int, default=MULTIPART_MAX_WORKERS, help="Concurrent parts per upload")
+    p.add_argument("--part-size-mb", type=int, default=16, help="Multipart part size in MiB")
+    p.add_argument("--workdir", default=None, help="Directory for the generated corpora (default: temp dir)")
+    p.add_argument("--output", default="bench_upload_static.json", help="JSON results file")
+    p.add_argument("--compare", default=None, help="Baseline results file to compare against")
+    p.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative throughput drop")
+    args = p.parse_args()
+    unknown = set(args.corpus.split(",")) - set(CORPORA)
+    if unknown:
+        p.error(f"unknown corpus: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main() -> int:
+    """CLI entry point.
+
+    Exit codes:
+      0: Benchmark completed (and no regression against ``--compare``).
+      1: Generic error (e.g., emulator not reachable, upload failures).
+      2: Throughput regressed beyond ``--tolerance``.
+
+    Returns:
+      Process exit code.
+    """
+    moto = None
+    try:
+        args = parse_args()
+        if args.moto:
+            moto, endpoint = start_moto()
+        else:
+            endpoint = args.endpoint_url
+        point_sdk_at(endpoint)
+
+        s3 = make_s3_client()
+        try:
+            s3.create_bucket(Bucket=BENCH_BUCKET)
+        except s3.exceptions.BucketAlreadyOwnedByYou:
+            pass
+
+        doc = {
+            "host": host_info(),
+            "target": {"kind": "moto" if args.moto else "endpoint", "endpoint_url": endpoint},
+            "settings": {
+                "seed": args.seed,
+                "jobs": args.jobs,
+                "max_workers": args.max_workers,
+                "part_size_mb": args.part_size_mb,
+                "blob_gb": args.blob_gb,
+            },
+            "corpora": {},
+        }
+        with tempfile.TemporaryDirectory(dir=args.workdir) as tmp:
+            # spawn: each corpus starts from a clean interpreter, so ru_maxrss is per corpus
+            ctx = multiprocessing.get_context("spawn")
+            for name in args.corpus.split(","):
+                spec = dict(CORPORA[name])
+                if name == "blobs":
+                    spec["min_size"] = spec["max_size"] = int(args.blob_gb * 1024 * MIB)
+                corpus_dir = Path(tmp) / name
+                corpus_dir.mkdir()
+                paths = [str(p) for p in write_corpus(corpus_dir, name, spec, args.seed)]
+                with ctx.Pool(1) as pool:
+                    doc["corpora"][name] = pool.apply(
+                        run_corpus,
+                        (name, paths),
+                        {"jobs": args.jobs, "max_workers": args.max_workers, "part_size": args.part_size_mb * MIB},
+                    )
+
+        regressed = False
+        if args.compare:
+            baseline = json.loads(Path(args.compare).read_text())
+            doc["comparison"], regressed = compare(doc, baseline, args.tolerance)
+            same_target = baseline.get("target", {}).get("kind") == doc["target"]["kind"]
+            if baseline.get("settings") != doc["settings"] or not same_target:
+                doc["comparison_warning"] = "baseline was run with different settings or target"
+        Path(args.output).write_text(json.dumps(doc, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+        summary = {
+            name: {k: r[k] for k in ("objects_per_s", "mb_per_s", "latency_s", "hash_mb_per_s", "peak_rss_mb")}
+            for name, r in doc["corpora"].items()
+        }
+        report = {"output": args.output, "summary": summary}
+        if args.compare:
+            report["comparison"] = doc["comparison"]
+            report["comparison_warning"] = doc.get("comparison_warning")
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        if any(r["error_count"] for r in doc["corpora"].values()):
+            return 1
+        return 2 if regressed else 0
+    except Exception as e:
+        print(json.dumps({"error": str(e)}, ensure_ascii=False))
+        return 1
+    finally:
+        if moto is not None:
+            moto.terminate()
+            moto.wait()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
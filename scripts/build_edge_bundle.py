@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Build the Lambda@Edge bundle of the precompressed-sidecar handler.
+
+Terraform deploys ``terraform/modules/s3_cloudfront/edge/precompressed_sidecars.zip``
+as is, so no provider is needed to package the function. The archive is
+byte-for-byte reproducible (stored members, fixed timestamps and permissions):
+rebuilding an unchanged handler produces the same file and the same
+``source_code_hash``, so ``terraform plan`` stays clean.
+
+Usage:
+  Rebuild after editing ``precompressed_sidecars.mjs``:
+    $ python build_edge_bundle.py
+
+  Fail (exit 1) when the committed bundle is out of date, e.g. in CI:
+    $ python build_edge_bundle.py --check
+"""
+
+import argparse
+import io
+import json
+import sys
+import zipfile
+from pathlib import Path
+from typing import Final
+
+EDGE_DIR: Final = Path(__file__).resolve().parent.parent / "terraform" / "modules" / "s3_cloudfront" / "edge"
+BUNDLE_SOURCES: Final = ("precompressed_sidecars.mjs",)
+BUNDLE_PATH: Final = EDGE_DIR / "precompressed_sidecars.zip"
+ZIP_EPOCH: Final = (1980, 1, 1, 0, 0, 0)  # earliest timestamp a zip entry can hold
+
+
+def build_bundle(sources: dict[str, bytes]) -> bytes:
+    """Create a deterministic zip archive of the handler sources.
+
+    Args:
+      sources: Archive member name -> file contents.
+
+    Returns:
+      The zip archive bytes.
+
+    Examples:
+      >>> build_bundle({"a.mjs": b"x"}) == build_bundle({"a.mjs": b"x"})
+      True
+      >>> zipfile.ZipFile(io.BytesIO(build_bundle({"a.mjs": b"x"}))).namelist()
+      ['a.mjs']
+    """
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name in sorted(sources):
+            info = zipfile.ZipInfo(name, date_time=ZIP_EPOCH)
+            info.compress_type = zipfile.ZIP_STORED  # deflate output varies across zlib builds
+            info.external_attr = 0o644 << 16
+            info.create_system = 3  # unix, so the permissions above apply
+            zf.writestr(info, sources[name])
+    return buf.getvalue()
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments.
+
+    Returns:
+      An ``argparse.Namespace`` with a ``check`` attribute.
+    """
+    p = argparse.ArgumentParser(description="Build the Lambda@Edge bundle of the precompressed-sidecar handler")
+    p.add_argument("--check", action="store_true", help="Only verify that the committed bundle is up to date")
+    return p.parse_args()
+
+
+def main() -> int:
+    """CLI entry point.
+
+    Exit codes:
+      0: Bundle written, or up to date with ``--check``.
+      1: Bundle out of date with ``--check``, or a source is missing.
+
+    Returns:
+      Process exit code.
+    """
+    args = parse_args()
+    try:
+        bundle = build_bundle({name: (EDGE_DIR / name).read_bytes() for name in BUNDLE_SOURCES})
+    except OSError as e:
+        print(json.dumps({"error": {"code": "", "message": str(e)}}, ensure_ascii=False))
+        return 1
+    current = BUNDLE_PATH.read_bytes() if BUNDLE_PATH.exists() else None
+    result = {"bundle": str(BUNDLE_PATH), "up_to_date": current == bundle}
+    if not args.check and current != bundle:
+        BUNDLE_PATH.write_bytes(bundle)
+        result["written"] = True
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 1 if args.check and current != bundle else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,96 +3,159 @@
 This script creates a Terraform backend for the given environment to store the
 state. This script is idempotent and can be run multiple times.
 Following resources are created:
-- S3 bucket
+- S3 bucket (versioning, AES256 default encryption, SSO admin bucket policy)
 - DynamoDB table
 
+Every step reads the current state first and only applies the difference, so
+a re-run against an up-to-date account performs no writes. One boto3 session
+and one client per service are shared by all steps, and the independent
+steps (the bucket chain, the DynamoDB table and the IAM role lookup) run
+concurrently. ``--check`` reports drift without changing anything and exits
+with status 1 when the backend does not match. A step that cannot read or
+write its resource (AccessDenied, throttling, ...) fails the whole run with
+status 2, so a drift check never passes on a state it could not read.
+
 """
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import boto3
 from botocore.exceptions import ClientError
 
-def create_s3_bucket(bucket_name: str, region: str) -> None:
+PRINT_LOCK = threading.Lock()
+ENCRYPTION_RULES = [{"ApplyServerSideEncryptionByDefault": {"SSEAlgorithm": "AES256"}}]
+
+
+def _log(message: str) -> None:
+    """Print one whole line at a time; steps report from parallel threads."""
+    with PRINT_LOCK:
+        print(message, flush=True)
+
+
+def create_s3_bucket(bucket_name: str, region: str, s3=None, check: bool = False) -> bool:
     """
     Create an S3 bucket for storing Terraform state, ensuring idempotency.
 
     Args:
         bucket_name (str): The name of the S3 bucket to create.
         region (str): The AWS region where the bucket will be created.
+        s3: Optional shared S3 client.
+        check (bool): Only report whether the bucket is missing.
 
+    Returns:
+        bool: True if the bucket was (or, with ``check``, would be) created.
+
+    Raises:
+        ClientError: If the bucket cannot be read or created (e.g., AccessDenied).
     """
-    s3 = boto3.client("s3", region_name=region)
+    s3 = s3 or boto3.client("s3", region_name=region)
     try:
         # Check if the bucket already exists
         s3.head_bucket(Bucket=bucket_name)
-        print(f"S3 bucket '{bucket_name}' already exists.")
+        _log(f"S3 bucket '{bucket_name}' already exists.")
     except ClientError as e:
         if e.response["Error"]["Code"] == "404":
+            if check:
+                _log(f"Drift: S3 bucket '{bucket_name}' does not exist.")
+                return True
             # Create the bucket if it doesn"t exist
             s3.create_bucket(
                 Bucket=bucket_name,
                 CreateBucketConfiguration={"LocationConstraint": region}
             )
-            print(f"S3 bucket '{bucket_name}' created successfully.")
-        else:
-            print(f"Error checking S3 bucket: {e}")
+            _log(f"S3 bucket '{bucket_name}' created successfully.")
+            return True
+        _log(f"Error checking S3 bucket: {e}")
+        raise
+    return False
 
-def enable_versioning(bucket_name: str) -> None:
+def enable_versioning(bucket_name: str, s3=None, check: bool = False) -> bool:
     """
     Enable versioning on the S3 bucket, ensuring idempotency.
 
     Args:
         bucket_name (str): The name of the S3 bucket.
+        s3: Optional shared S3 client.
+        check (bool): Only report whether versioning is off.
+
+    Returns:
+        bool: True if versioning was (or, with ``check``, would be) enabled.
 
+    Raises:
+        ClientError: If the current state cannot be read or written.
     """
-    s3 = boto3.client("s3")
+    s3 = s3 or boto3.client("s3")
     try:
-        # Enable versioning (idempotent by default)
+        if s3.get_bucket_versioning(Bucket=bucket_name).get("Status") == "Enabled":
+            _log(f"Versioning already enabled on S3 bucket '{bucket_name}'.")
+            return False
+        if check:
+            _log(f"Drift: versioning is not enabled on S3 bucket '{bucket_name}'.")
+            return True
         s3.put_bucket_versioning(
             Bucket=bucket_name,
             VersioningConfiguration={"Status": "Enabled"}
         )
-        print(f"Versioning enabled on S3 bucket '{bucket_name}'.")
+        _log(f"Versioning enabled on S3 bucket '{bucket_name}'.")
+        return True
     except ClientError as e:
-        print(f"Error enabling versioning: {e}")
+        _log(f"Error enabling versioning: {e}")
+        raise
 
-def enable_encryption(bucket_name: str) -> None:
+def enable_encryption(bucket_name: str, s3=None, check: bool = False) -> bool:
     """
     Enable server-side encryption on the S3 bucket.
 
     Args:
         bucket_name (str): The name of the S3 bucket.
+        s3: Optional shared S3 client.
+        check (bool): Only report whether the default encryption differs.
 
+    Returns:
+        bool: True if encryption was (or, with ``check``, would be) changed.
+
+    Raises:
+        ClientError: If the current state cannot be read or written.
     """
-    s3 = boto3.client("s3")
+    s3 = s3 or boto3.client("s3")
     try:
+        try:
+            current = s3.get_bucket_encryption(Bucket=bucket_name)["ServerSideEncryptionConfiguration"]["Rules"]
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ServerSideEncryptionConfigurationNotFoundError":
+                raise
+            current = []
+        defaults = [rule.get("ApplyServerSideEncryptionByDefault", {}) for rule in current]
+        if any(d.get("SSEAlgorithm") == "AES256" for d in defaults):
+            _log(f"Encryption already enabled on S3 bucket '{bucket_name}'.")
+            return False
+        if check:
+            _log(f"Drift: default encryption on S3 bucket '{bucket_name}' is not AES256.")
+            return True
         s3.put_bucket_encryption(
             Bucket=bucket_name,
-            ServerSideEncryptionConfiguration={
-                "Rules": [
-                    {
-                        "ApplyServerSideEncryptionByDefault": {
-                            "SSEAlgorithm": "AES256"
-                        }
-                    }
-                ]
-            }
+            ServerSideEncryptionConfiguration={"Rules": ENCRYPTION_RULES}
         )
-        print(f"Encryption enabled on S3 bucket '{bucket_name}'.")
+        _log(f"Encryption enabled on S3 bucket '{bucket_name}'.")
+        return True
     except ClientError as e:
-        print(f"Error enabling encryption: {e}")
+        _log(f"Error enabling encryption: {e}")
+        raise
 
-def _find_sso_admin_role_arn(region: str) -> str | None:
+def _find_sso_admin_role_arn(region: str, iam=None) -> str | None:
     """Locate the AWS SSO AdministratorAccess role ARN for the account.
 
     Args:
         region: AWS region that hosts the SSO-managed roles (used in the path prefix).
+        iam: Optional shared IAM client.
 
     Returns:
         The ARN of the first role whose name starts with
         ``AWSReservedSSO_AdministratorAccess`` under the SSO path in the
         current account. Returns ``None`` when no such role is found.
     """
-    iam = boto3.client("iam")
+    iam = iam or boto3.client("iam")
     path_prefix = f"/aws-reserved/sso.amazonaws.com/{region}/"
 
     paginator = iam.get_paginator("list_roles")
@@ -104,22 +167,34 @@ def _find_sso_admin_role_arn(region: str) -> str | None:
     return None
 
 
-def create_s3_bucket_policy(bucket_name: str, region: str) -> None:
+def create_s3_bucket_policy(
+    bucket_name: str, region: str, s3=None, principal_arn: str | None = None, check: bool = False
+) -> bool:
     """
     Create or update the bucket policy for an S3 bucket.
 
     Args:
         bucket_name (str): The name of the S3 bucket.
         region (str): The AWS region.
+        s3: Optional shared S3 client.
+        principal_arn (str | None): SSO admin role ARN when already looked up;
+            ``_find_sso_admin_role_arn`` is called otherwise.
+        check (bool): Only report whether the policy differs.
+
+    Returns:
+        bool: True if the policy was (or, with ``check``, would be) written.
+
+    Raises:
+        ClientError: If the current state cannot be read or written.
     """
-    s3 = boto3.client("s3")
+    s3 = s3 or boto3.client("s3")
     try:
-        principal_arn = _find_sso_admin_role_arn(region)
+        principal_arn = principal_arn or _find_sso_admin_role_arn(region)
         if not principal_arn:
-            print(
+            _log(
                 "No AWS SSO AdministratorAccess role found; skipping bucket policy application."
             )
-            return
+            return False
 
         # Define the bucket policy
         bucket_policy = {
@@ -138,65 +213,167 @@ def create_s3_bucket_policy(bucket_name: str, region: str) -> None:
             ]
         }
 
+        # Compare with the current policy; S3 returns it re-serialized, so compare parsed JSON
+        try:
+            current = json.loads(s3.get_bucket_policy(Bucket=bucket_name)["Policy"])
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "NoSuchBucketPolicy":
+                raise
+            current = None
+        if current == bucket_policy:
+            _log(f"Bucket policy on '{bucket_name}' is up to date.")
+            return False
+        if check:
+            _log(f"Drift: bucket policy on '{bucket_name}' differs from the expected policy.")
+            return True
+
         # Put the bucket policy
         s3.put_bucket_policy(
             Bucket=bucket_name,
             Policy=json.dumps(bucket_policy)
         )
-        print(f"Bucket policy applied to '{bucket_name}'.")
+        _log(f"Bucket policy applied to '{bucket_name}'.")
+        return True
     except ClientError as e:
-        print(f"Error setting bucket policy: {e}")
+        _log(f"Error setting bucket policy: {e}")
+        raise
 
-def create_dynamodb_table(table_name: str, region: str) -> None:
+def create_dynamodb_table(table_name: str, region: str, dynamodb=None, check: bool = False) -> bool:
     """
     Create a DynamoDB table for Terraform state locking, ensuring idempotency.
 
     Args:
         table_name (str): The name of the DynamoDB table to create.
         region (str): The AWS region where the table will be created.
+        dynamodb: Optional shared DynamoDB client.
+        check (bool): Only report whether the table is missing.
+
+    Returns:
+        bool: True if the table was (or, with ``check``, would be) created.
 
+    Raises:
+        ClientError: If the current state cannot be read or written.
     """
-    dynamodb = boto3.client("dynamodb", region_name=region)
+    dynamodb = dynamodb or boto3.client("dynamodb", region_name=region)
     try:
-        # Check if the table already exists
-        existing_tables = dynamodb.list_tables()["TableNames"]
-        if table_name in existing_tables:
-            print(f"DynamoDB table '{table_name}' already exists.")
-        else:
-            # Create the table if it doesn"t exist
-            dynamodb.create_table(
-                TableName=table_name,
-                KeySchema=[
-                    {"AttributeName": "LockID", "KeyType": "HASH"}
-                ],
-                AttributeDefinitions=[
-                    {"AttributeName": "LockID", "AttributeType": "S"}
-                ],
-                ProvisionedThroughput={
-                    "ReadCapacityUnits": 1,
-                    "WriteCapacityUnits": 1
-                }
-            )
-            print(f"DynamoDB table '{table_name}' created successfully.")
+        # Check if the table already exists (one call, unlike a paginated ListTables)
+        try:
+            dynamodb.describe_table(TableName=table_name)
+            _log(f"DynamoDB table '{table_name}' already exists.")
+            return False
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ResourceNotFoundException":
+                raise
+        if check:
+            _log(f"Drift: DynamoDB table '{table_name}' does not exist.")
+            return True
+        # Create the table if it doesn"t exist
+        dynamodb.create_table(
+            TableName=table_name,
+            KeySchema=[
+                {"AttributeName": "LockID", "KeyType": "HASH"}
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "LockID", "AttributeType": "S"}
+            ],
+            ProvisionedThroughput={
+                "ReadCapacityUnits": 1,
+                "WriteCapacityUnits": 1
+            }
+        )
+        _log(f"DynamoDB table '{table_name}' created successfully.")
+        return True
     except ClientError as e:
-        print(f"Error creating DynamoDB table: {e}")
+        _log(f"Error creating DynamoDB table: {e}")
+        raise
 
-def get_aws_account_id() -> str | None:
+def get_aws_account_id(sts_client=None) -> str | None:
     """
     Retrieve the AWS account ID of the current caller.
 
+    Args:
+        sts_client: Optional shared STS client.
+
     Returns:
         str: The AWS account ID.
     """
     try:
-        sts_client = boto3.client("sts")
+        sts_client = sts_client or boto3.client("sts")
         response = sts_client.get_caller_identity()
         account_id = response["Account"]
         return account_id
     except Exception as e:
-        print(f"Error retrieving AWS account ID: {e}")
+        _log(f"Error retrieving AWS account ID: {e}")
         return None
 
+def bootstrap_backend(
+    bucket_name: str, table_name: str, region: str, session=None, check: bool = False
+) -> bool:
+    """
+    Bring the Terraform backend to the expected state with concurrent steps.
+
+    The bucket chain (bucket, then versioning, encryption and policy), the
+    DynamoDB table and the IAM role lookup are independent and run in
+    parallel on clients created once from a shared session.
+
+    Args:
+        bucket_name (str): The name of the state bucket.
+        table_name (str): The name of the lock table.
+        region (str): The AWS region.
+        session: Optional ``boto3.session.Session`` to create clients from.
+        check (bool): Only report drift; perform no writes.
+
+    Returns:
+        bool: True if any resource was (or, with ``check``, would be) changed.
+
+    Raises:
+        ClientError: The first error of any step, raised only after every
+            submitted step has finished, so no failure goes unreported.
+            A state that cannot be read is never reported as "no drift".
+    """
+    session = session or boto3.session.Session(region_name=region)
+    s3 = session.client("s3", region_name=region)
+    dynamodb = session.client("dynamodb", region_name=region)
+    iam = session.client("iam")
+    errors: list[ClientError] = []
+
+    def collect(future):
+        # Every future is drained; errors are raised together after the pool
+        try:
+            return future.result()
+        except ClientError as e:
+            errors.append(e)
+            return None
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        role = pool.submit(_find_sso_admin_role_arn, region, iam)
+        table = pool.submit(create_dynamodb_table, table_name, region, dynamodb, check)
+        bucket = pool.submit(create_s3_bucket, bucket_name, region, s3, check)
+        changes = [collect(bucket)]
+        steps = []
+        # Nothing else can be read from a bucket that does not exist or cannot be read
+        if changes[0] is not None and not (check and changes[0]):
+            steps += [
+                pool.submit(enable_versioning, bucket_name, s3, check),
+                pool.submit(enable_encryption, bucket_name, s3, check),
+            ]
+            try:
+                principal_arn = role.result()
+            except ClientError as e:
+                _log(f"Error looking up the AWS SSO AdministratorAccess role: {e}")
+                errors.append(e)
+            else:
+                if principal_arn:
+                    steps.append(pool.submit(create_s3_bucket_policy, bucket_name, region, s3, principal_arn, check))
+                else:
+                    _log("No AWS SSO AdministratorAccess role found; skipping bucket policy application.")
+        else:
+            collect(role)
+        changes += [collect(step) for step in steps] + [collect(table)]
+    if errors:
+        raise errors[0]
+    return any(changes)
+
 def main() -> None:
     """
     Main function to parse arguments and execute bucket and table creation.
@@ -217,10 +394,17 @@ def main() -> None:
     parser = argparse.ArgumentParser(description="Create S3 bucket and DynamoDB table for Terraform backend.")
     parser.add_argument("--project-name", type=str, default="limitlab-webpage", help="Project name.")
     parser.add_argument("--region", type=str, default="ap-northeast-1", help="AWS region to use.")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Report drift without changing anything (exit 1 on drift, 2 if the state cannot be read).",
+    )
     args = parser.parse_args()
 
+    session = boto3.session.Session(region_name=args.region)
+
     # Get AWS account ID
-    account_id = get_aws_account_id()
+    account_id = get_aws_account_id(session.client("sts"))
     if account_id not in id_to_environment:
         print(f"AWS account ID: {account_id} is unknown. Exiting.")
         sys.exit(1)
@@ -235,11 +419,15 @@ def main() -> None:
     s3_bucket_name = f"{environment}-{project_name}-state"
     dynamodb_table_name = f"{environment}-{project_name}-state-lock"
 
-    create_s3_bucket(s3_bucket_name, region)
-    enable_versioning(s3_bucket_name)
-    enable_encryption(s3_bucket_name)
-    create_s3_bucket_policy(s3_bucket_name, region)
-    create_dynamodb_table(dynamodb_table_name, region)
+    try:
+        changed = bootstrap_backend(
+            s3_bucket_name, dynamodb_table_name, region, session=session, check=args.check
+        )
+    except ClientError as e:
+        print(f"Could not {'read' if args.check else 'apply'} the backend state: {e}")
+        sys.exit(2)
+    if args.check and changed:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
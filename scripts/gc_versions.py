@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Retention-aware garbage collection of superseded versioned CDN objects.
+
+Every publish through ``upload_static.py`` adds an immutable
+``{slug}_{version-tag}_{hash}{lang?}{variant?}.{ext}`` object and nothing is
+ever removed, so storage and listing cost grow with each re-publish. This
+command deletes versioned objects that no retention rule protects.
+
+Retention (an object is kept if ANY rule holds):
+  - It is one of the ``--keep-last`` newest objects of its
+    ``{event}/{type}/{slug}{lang?}{variant?}.{ext}`` group.
+  - It was uploaded less than ``--keep-days`` days ago.
+  - A latest alias points to it. The reference set is read from the
+    ``points-to`` metadata of every alias (HEAD requests run concurrently);
+    aliases without that metadata fall back to ETag equality, and if the
+    target still cannot be found the whole group is kept.
+
+Precompressed ``.br``/``.gz`` sidecars follow their versioned object. Aliases,
+keys outside the URL design and the dedup index are never touched.
+
+Planning reads the local inventory index (``inventory.py``), refreshing it
+from a listing first unless ``--no-refresh`` is given. By default the command
+only prints the report; nothing is deleted without ``--apply`` (or ``--yes``).
+Deletions are sent as ``DeleteObjects`` batches of 1000 keys in parallel. On a bucket with S3 versioning enabled,
+deletions leave noncurrent versions that a lifecycle rule must expire.
+
+Examples:
+  $ python gc_versions.py
+  $ python gc_versions.py --prefix iccv2025/ --keep-last 2 --keep-days 90 --apply
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Final
+
+from inventory import INVENTORY_JOBS, INVENTORY_PATH, Inventory, refresh_from_listing
+from upload_static import error_result, head_object_or_none, is_client_error, make_s3_client, resolve_env_targets
+
+
+GC_KEEP_LAST: Final = 3
+GC_KEEP_DAYS: Final = 30
+DELETE_BATCH: Final = 1000  # DeleteObjects limit per request
+
+
+def group_of(row: dict) -> tuple:
+    """Retention group of an inventory row: one URL-design asset across versions.
+
+    Examples:
+      >>> group_of({"event": "e", "type": "s", "slug": "t", "lang": "ja", "variant": None, "ext": "pdf"})
+      ('e', 's', 't', 'ja', None, 'pdf')
+    """
+    return tuple(row[c] for c in ("event", "type", "slug", "lang", "variant", "ext"))
+
+
+def alias_targets(s3, *, bucket: str, rows: list[dict], jobs: int = INVENTORY_JOBS) -> tuple[set[str], set[tuple]]:
+    """Resolve what every latest alias points to.
+
+    Args:
+      s3: A boto3 S3 client.
+      bucket: Bucket name.
+      rows: Inventory rows (aliases and versioned objects).
+      jobs: Number of concurrent HEAD requests.
+
+    Returns:
+      ``(referenced, unresolved)``: the versioned keys aliases point to, and
+      the groups of aliases whose target could not be determined.
+
+    Examples:
+      >>> from types import SimpleNamespace
+      >>> row = {"event": "e", "type": "s", "lang": None, "variant": None, "ext": "pdf", "encoding": None}
+      >>> rows = [
+      ...     {**row, "key": "e/s/a_latest.pdf", "slug": "a", "is_alias": True, "etag": "1"},
+      ...     {**row, "key": "e/s/b_latest.pdf", "slug": "b", "is_alias": True, "etag": "2"},
+      ... ]
+      >>> heads = {"e/s/a_latest.pdf": {"Metadata": {"points-to": "e/s/a_v1_000000000001.pdf"}},
+      ...          "e/s/b_latest.pdf": {"Metadata": {}}}
+      >>> s3 = SimpleNamespace(head_object=lambda Bucket, Key: heads[Key])
+      >>> alias_targets(s3, bucket="bkt", rows=rows)
+      ({'e/s/a_v1_000000000001.pdf'}, {('e', 's', 'b', None, None, 'pdf')})
+    """
+    aliases = [r for r in rows if r["is_alias"] and r["encoding"] is None]
+    by_etag = {r["etag"]: r["key"] for r in rows if not r["is_alias"] and r["encoding"] is None}
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(aliases) or 1))) as pool:
+        heads = list(pool.map(lambda r: head_object_or_none(s3, bucket=bucket, key=r["key"]), aliases))
+    referenced, unresolved = set(), set()
+    for alias, head in zip(aliases, heads):
+        if head is None:
+            continue  # deleted since the inventory refresh
+        target = head.get("Metadata", {}).get("points-to") or by_etag.get(alias["etag"])
+        if target:
+            referenced.add(target)
+        else:
+            unresolved.add(group_of(alias))
+    return referenced, unresolved
+
+
+def plan_gc(
+    rows: list[dict],
+    *,
+    referenced: set[str],
+    protected_groups: set[tuple] = frozenset(),
+    keep_last: int = GC_KEEP_LAST,
+    keep_days: float = GC_KEEP_DAYS,
+    now: float | None = None,
+) -> dict:
+    """Decide which versioned objects (and their sidecars) to delete.
+
+    Args:
+      rows: Inventory rows.
+      referenced: Versioned keys that latest aliases point to.
+      protected_groups: Groups that must be kept entirely.
+      keep_last: Newest objects kept per group.
+      keep_days: Objects younger than this many days are kept.
+      now: Current time in epoch seconds (defaults to ``time.time()``).
+
+    Returns:
+      ``{"delete": [keys], "bytes": int, "kept": int}`` with sidecars of
+      deleted objects included in ``delete`` and ``bytes``.
+
+    Examples:
+      >>> day = 86400
+      >>> rows = [
+      ...     {"key": f"e/s/t_v{i}_{i:012x}.pdf", "event": "e", "type": "s", "slug": "t", "lang": None,
+      ...      "variant": None, "ext": "pdf", "version_tag": f"v{i}", "is_alias": False, "encoding": None,
+      ...      "size": 10, "last_modified": i * day}
+      ...     for i in range(1, 6)
+      ... ]
+      >>> plan = plan_gc(rows, referenced=set(), keep_last=2, keep_days=1, now=6 * day)
+      >>> plan["delete"], plan["bytes"], plan["kept"]
+      (['e/s/t_v1_000000000001.pdf', 'e/s/t_v2_000000000002.pdf', 'e/s/t_v3_000000000003.pdf'], 30, 2)
+
+      An alias target is kept however old it is:
+
+      >>> plan = plan_gc(rows, referenced={"e/s/t_v1_000000000001.pdf"}, keep_last=2, keep_days=1, now=6 * day)
+      >>> plan["delete"], plan["kept"]
+      (['e/s/t_v2_000000000002.pdf', 'e/s/t_v3_000000000003.pdf'], 3)
+
+      A group whose alias could not be resolved is kept whole:
+
+      >>> plan_gc(rows, referenced=set(), protected_groups={("e", "s", "t", None, None, "pdf")}, keep_last=1,
+      ...         keep_days=0, now=6 * day)
+      {'delete': [], 'bytes': 0, 'kept': 5}
+
+      Sidecars go with their versioned object:
+
+      >>> sidecar = {**rows[0], "key": "e/s/t_v1_000000000001.pdf.gz", "encoding": "gzip", "size": 4}
+      >>> plan = plan_gc([*rows, sidecar], referenced=set(), keep_last=4, keep_days=0, now=6 * day)
+      >>> plan["delete"], plan["bytes"]
+      (['e/s/t_v1_000000000001.pdf', 'e/s/t_v1_000000000001.pdf.gz'], 14)
+    """
+    now = time.time() if now is None else now
+    sidecars = {}
+    groups = {}
+    for row in rows:
+        if row["is_alias"] or row["version_tag"] is None:
+            continue
+        if row["encoding"] is not None:
+            sidecars.setdefault(row["key"].rsplit(".", 1)[0], []).append(row)
+        else:
+            groups.setdefault(group_of(row), []).append(row)
+    delete, reclaimed, kept = [], 0, 0
+    for group, versions in groups.items():
+        versions.sort(key=lambda r: (r["last_modified"], r["key"]), reverse=True)
+        for rank, row in enumerate(versions):
+            if (
+                group in protected_groups
+                or rank < keep_last
+                or now - row["last_modified"] < keep_days * 86400
+                or row["key"] in referenced
+            ):
+                kept += 1
+                continue
+            for victim in [row, *sidecars.get(row["key"], [])]:
+                delete.append(victim["key"])
+                reclaimed += victim["size"]
+    return {"delete": sorted(delete), "bytes": reclaimed, "kept": kept}
+
+
+def delete_keys(s3, *, bucket: str, keys: list[str], jobs: int = INVENTORY_JOBS) -> dict:
+    """Delete keys with parallel ``DeleteObjects`` batches of up to 1000 keys.
+
+    Returns:
+      ``{"deleted": [keys], "errors": [{"key", "code", "message"}]}``.
+    """
+    batches = [keys[i : i + DELETE_BATCH] for i in range(0, len(keys), DELETE_BATCH)]
+
+    def run(batch: list[str]) -> dict:
+        return s3.delete_objects(
+            Bucket=bucket, Delete={"Objects": [{"Key": k} for k in batch], "Quiet": True}
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(batches) or 1))) as pool:
+        responses = list(pool.map(run, batches))
+    errors = [
+        {"key": e.get("Key"), "code": e.get("Code"), "message": e.get("Message")}
+        for resp in responses
+        for e in resp.get("Errors", [])
+    ]
+    failed = {e["key"] for e in errors}
+    return {"deleted": [k for k in keys if k not in failed], "errors": errors}
+
+
+# -------- CLI --------
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments for the GC CLI.
+
+    Returns:
+      An ``argparse.Namespace`` with ``prefix``, ``keep_last``, ``keep_days``,
+      ``apply``, ``no_refresh``, ``db`` and ``jobs`` attributes.
+    """
+    p = argparse.ArgumentParser(description="Delete superseded versioned objects from the LIMIT.Lab CDN bucket")
+    p.add_argument("--prefix", action="append", default=None, help="Only collect under this prefix (repeatable)")
+    p.add_argument("--keep-last", type=int, default=GC_KEEP_LAST, help="Newest versions kept per slug/lang/variant")
+    p.add_argument("--keep-days", type=float, default=GC_KEEP_DAYS, help="Keep versions newer than this many days")
+    p.add_argument(
+        "--apply",
+        "--yes",
+        action="store_true",
+        help="Delete the planned objects (without it, only the report is printed)",
+    )
+    p.add_argument("--no-refresh", action="store_true", help="Plan from the inventory index as it is")
+    p.add_argument("--db", default=str(INVENTORY_PATH), help="Path of the inventory database")
+    p.add_argument("--jobs", type=int, default=INVENTORY_JOBS, help="Concurrent listings, HEADs and delete batches")
+    args = p.parse_args()
+    if args.keep_last < 1:
+        p.error("--keep-last must be at least 1")
+    return args
+
+
+def main() -> int:
+    """CLI entry point.
+
+    Steps:
+      1) Refresh the inventory index for the prefixes (unless ``--no-refresh``).
+      2) Resolve every alias target (``points-to``) with concurrent HEADs.
+      3) Plan deletions with ``plan_gc()`` and print the report.
+      4) Only with ``--apply``, delete in parallel batches and drop the keys
+         from the index.
+
+    Exit codes:
+      0: Success (report printed, all planned deletions done).
+      1: Generic error, or some keys could not be deleted.
+      3: AWS client error (STS/S3 API responded with an error).
+
+    Returns:
+      Process exit code: 0 on success, non-zero on failure.
+    """
+    inventory = None
+    try:
+        args = parse_args()
+        env_info = resolve_env_targets(dry_run=not args.apply)
+        bucket = env_info["bucket"]
+        s3 = make_s3_client(args.jobs)
+        inventory = Inventory(Path(args.db))
+        if not args.no_refresh:
+            refresh_from_listing(inventory, s3, bucket=bucket, prefixes=args.prefix, jobs=args.jobs)
+        rows = [r for prefix in args.prefix or [""] for r in inventory.query(bucket, prefix=prefix)]
+        referenced, unresolved = alias_targets(s3, bucket=bucket, rows=rows, jobs=args.jobs)
+        plan = plan_gc(
+            rows,
+            referenced=referenced,
+            protected_groups=unresolved,
+            keep_last=args.keep_last,
+            keep_days=args.keep_days,
+        )
+        result = {
+            "bucket": bucket,
+            "policy": {"keep_last": args.keep_last, "keep_days": args.keep_days, "keep_alias_targets": True},
+            "dry_run": not args.apply,
+            "kept": plan["kept"],
+            "delete_count": len(plan["delete"]),
+            "bytes_reclaimed": plan["bytes"],
+            "unresolved_alias_groups": sorted("/".join(str(f) for f in g) for g in unresolved),
+            "delete": plan["delete"],
+        }
+        if args.apply and plan["delete"]:
+            outcome = delete_keys(s3, bucket=bucket, keys=plan["delete"], jobs=args.jobs)
+            inventory.forget(bucket, outcome["deleted"])
+            result["deleted_count"] = len(outcome["deleted"])
+            result["errors"] = outcome["errors"]
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 1 if result.get("errors") else 0
+    except Exception as e:
+        print(json.dumps({"error": error_result("", e)["error"]}, ensure_ascii=False))
+        return 3 if is_client_error(e) else 1
+    finally:
+        if inventory is not None:
+            inventory.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
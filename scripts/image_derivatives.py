@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Responsive image derivatives for the LIMIT.Lab CDN URL design.
+
+The CDN file naming convention reserves a ``variant`` suffix (e.g., ``-w1200``)
+for resolution/format variants. This module produces those variants from one
+source image and publishes each of them through ``upload_static.upload_batch``
+so that every derivative gets its own versioned key and latest alias:
+
+  {slug}_{version-tag}_{hash}{lang?}-w{N}.{ext}
+  {slug}_latest{lang?}-w{N}.{ext}
+
+For every width in the ladder, the image is re-encoded in the source format
+and in each requested modern format (WebP/AVIF by default). Widths larger
+than the source are skipped (no upscaling). Encoding runs in a process pool.
+
+Dependencies:
+  - Pillow is required (``pip install pillow``). AVIF needs Pillow >= 11.3 or
+    the ``pillow-avif-plugin`` package; requesting AVIF without it fails fast.
+
+Examples:
+  Publish a width ladder for a member photo:
+    $ python image_derivatives.py \\
+        --file ../public/members/yuki.asano-256x256.jpg \\
+        --event site \\
+        --type a \\
+        --slug yuki-asano \\
+        --version-tag v2025-10-19 \\
+        --widths 64,128,256
+
+  Preview the planned keys without uploading (offline with LIMITLAB_ENV, which only --dry-run honors):
+    $ python image_derivatives.py --file poster.png --event iccv2025 --type p \\
+        --slug found-poster --version-tag v1.0.0 --dry-run
+"""
+
+import argparse
+import json
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Final
+
+from botocore.exceptions import ClientError
+
+from upload_static import BATCH_JOBS, resolve_env_targets, upload_batch
+
+
+DEFAULT_WIDTHS: Final = (320, 640, 1200)
+DEFAULT_FORMATS: Final = ("webp", "avif")
+
+# Encoder settings per output format (Pillow save() keyword arguments)
+SAVE_OPTIONS: Final = {
+    "jpeg": {"quality": 85, "optimize": True, "progressive": True},
+    "png": {"optimize": True},
+    "webp": {"quality": 80, "method": 6},
+    "avif": {"quality": 60},
+}
+EXTENSIONS: Final = {"jpeg": ".jpg", "png": ".png", "webp": ".webp", "avif": ".avif"}
+
+
+def _load_pillow():
+    """Import Pillow lazily so the module can be inspected without it."""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError as e:
+        raise RuntimeError("Image derivatives require Pillow (pip install pillow).") from e
+    try:
+        import pillow_avif  # noqa: F401  (registers the AVIF plugin on older Pillow)
+    except ImportError:
+        pass
+    return Image, ImageOps
+
+
+def check_formats(formats: list[str]) -> None:
+    """Fail fast when Pillow cannot encode one of the requested formats.
+
+    Args:
+      formats: Output format names (e.g., ``["webp", "avif"]``).
+
+    Raises:
+      ValueError: If a format is unknown to this module.
+      RuntimeError: If Pillow is missing or lacks an encoder for a format.
+    """
+    Image, _ = _load_pillow()
+    Image.init()
+    for fmt in formats:
+        if fmt not in SAVE_OPTIONS:
+            raise ValueError(f"Unsupported format: {fmt} (choose from {', '.join(SAVE_OPTIONS)}).")
+        if fmt.upper() not in Image.SAVE:
+            raise RuntimeError(f"This Pillow build cannot encode {fmt.upper()}.")
+
+
+def source_format(file_path: Path) -> str:
+    """Map a source file extension to an output format name.
+
+    Examples:
+      >>> source_format(Path("a.JPG")), source_format(Path("b.png"))
+      ('jpeg', 'png')
+    """
+    ext = file_path.suffix.lower()
+    for fmt, fmt_ext in EXTENSIONS.items():
+        if ext == fmt_ext or (fmt == "jpeg" and ext == ".jpeg"):
+            return fmt
+    raise ValueError(f"Unsupported source image type: {file_path.suffix}")
+
+
+def plan_derivatives(source_width: int, widths: list[int], formats: list[str]) -> list[tuple[int, str]]:
+    """List the ``(width, format)`` pairs to produce for a source image.
+
+    Widths wider than the source are dropped; if that leaves nothing, the
+    source width itself is used so at least one variant per format exists.
+
+    Args:
+      source_width: Width of the source image in pixels.
+      widths: Requested width ladder.
+      formats: Output formats (source format first, then modern formats).
+
+    Returns:
+      Sorted ``(width, format)`` pairs.
+
+    Examples:
+      >>> plan_derivatives(800, [320, 640, 1200], ["jpeg", "webp"])
+      [(320, 'jpeg'), (320, 'webp'), (640, 'jpeg'), (640, 'webp')]
+      >>> plan_derivatives(256, [320], ["webp"])
+      [(256, 'webp')]
+    """
+    ladder = sorted({w for w in widths if 0 < w <= source_width}) or [source_width]
+    return [(w, fmt) for w in ladder for fmt in dict.fromkeys(formats)]
+
+
+def render_derivative(src: Path, out_dir: Path, width: int, fmt: str) -> Path:
+    """Resize and encode one derivative; runs in a worker process.
+
+    EXIF orientation is applied before resizing, and the aspect ratio is kept.
+
+    Args:
+      src: Source image path.
+      out_dir: Directory that receives the encoded file.
+      width: Target width in pixels.
+      fmt: Output format name (key of ``SAVE_OPTIONS``).
+
+    Returns:
+      Path of the written derivative (``{stem}-w{width}{ext}``).
+    """
+    Image, ImageOps = _load_pillow()
+    with Image.open(src) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.width != width:
+            im = im.resize((width, max(1, round(im.height * width / im.width))), Image.Resampling.LANCZOS)
+        if fmt == "jpeg" and im.mode not in ("RGB", "L"):
+            im = im.convert("RGB")
+        out = out_dir / f"{src.stem}-w{width}{EXTENSIONS[fmt]}"
+        im.save(out, format=fmt.upper(), **SAVE_OPTIONS[fmt])
+    return out
+
+
+def build_derivatives(src: Path, out_dir: Path, widths: list[int], formats: list[str]) -> list[tuple[int, Path]]:
+    """Produce every planned derivative of ``src`` in parallel worker processes.
+
+    Args:
+      src: Source image path.
+      out_dir: Directory that receives the encoded files.
+      widths: Width ladder in pixels.
+      formats: Modern output formats added next to the source format.
+
+    Returns:
+      ``(width, path)`` pairs for every derivative written.
+    """
+    Image, _ = _load_pillow()
+    with Image.open(src) as im:
+        source_width = im.width
+        if im.getexif().get(0x0112) in (5, 6, 7, 8):  # rotated 90 degrees by EXIF
+            source_width = im.height
+    tasks = plan_derivatives(source_width, widths, [source_format(src), *formats])
+
+    with ProcessPoolExecutor() as pool:
+        futures = [(w, pool.submit(render_derivative, src, out_dir, w, fmt)) for w, fmt in tasks]
+        return [(w, f.result()) for w, f in futures]
+
+
+# -------- CLI --------
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments for the derivative publisher.
+
+    Returns:
+      An ``argparse.Namespace`` with ``file``, ``event``, ``type_code``,
+      ``slug``, ``version_tag``, ``lang``, ``widths``, ``formats``, ``dry_run``
+      and ``jobs`` attributes.
+    """
+    p = argparse.ArgumentParser(description="Publish responsive image derivatives to the LIMIT.Lab CDN")
+    p.add_argument("--file", required=True, help="Path to the source image")
+    p.add_argument("--event", required=True, help="Event id (e.g., iccv2025)")
+    p.add_argument("--type", required=True, dest="type_code", help="Asset type code (s|p|r|a)")
+    p.add_argument("--slug", required=True, help="Slug (descriptive name)")
+    p.add_argument("--version-tag", required=True, help='Version tag (e.g., "v2025-10-19" or "v1.2.3")')
+    p.add_argument("--lang", default=None, help='Optional language suffix (e.g., "ja" or "-ja")')
+    p.add_argument(
+        "--widths",
+        default=",".join(map(str, DEFAULT_WIDTHS)),
+        help="Comma-separated width ladder in pixels (e.g., 320,640,1200)",
+    )
+    p.add_argument(
+        "--formats",
+        default=",".join(DEFAULT_FORMATS),
+        help="Comma-separated extra formats besides the source format (webp, avif; empty for none)",
+    )
+    p.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print a preview without uploading (set LIMITLAB_ENV=prod|dev to skip STS)",
+    )
+    p.add_argument("--jobs", type=int, default=BATCH_JOBS, help="Derivatives uploaded concurrently")
+    return p.parse_args()
+
+
+def main() -> int:
+    """CLI entry point.
+
+    Steps:
+      1) Parse CLI args, then resolve environment/bucket/domain (override,
+         cache or STS; read-only).
+      2) Render the derivatives into a temporary directory (process pool).
+      3) Publish them with ``upload_batch()`` using ``w{N}`` as the variant.
+      4) Print a JSON array with one ``upload()`` result per derivative.
+
+    Exit codes:
+      0: Success (all derivatives uploaded or previewed).
+      1: Generic error (e.g., Pillow missing, unsupported format).
+      3: AWS client error (STS/S3 API responded with an error).
+
+    Returns:
+      Process exit code: 0 on success, non-zero on failure.
+    """
+    try:
+        args = parse_args()
+        env_info = resolve_env_targets(dry_run=args.dry_run)
+        src = Path(args.file)
+        if not src.exists():
+            raise FileNotFoundError(str(src))
+        widths = [int(w) for w in args.widths.split(",") if w.strip()]
+        formats = [f.strip().lower() for f in args.formats.split(",") if f.strip()]
+        check_formats([source_format(src), *formats])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            derivatives = build_derivatives(src, Path(tmp), widths, formats)
+            results = upload_batch(
+                [{"file": str(path), "variant": f"w{width}"} for width, path in derivatives],
+                env_info=env_info,
+                dry_run=args.dry_run,
+                defaults={
+                    "event": args.event,
+                    "type": args.type_code,
+                    "slug": args.slug,
+                    "version_tag": args.version_tag,
+                    "lang": args.lang,
+                },
+                jobs=args.jobs,
+            )
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        errors = [r["error"] for r in results if "error" in r]
+        if any(isinstance(err, dict) for err in errors):
+            return 3
+        return 1 if errors else 0
+    except ClientError as e:
+        msg = e.response.get("Error", {})
+        print(json.dumps({"error": {"code": msg.get("Code"), "message": msg.get("Message")}}, ensure_ascii=False))
+        return 3
+    except Exception as e:
+        print(json.dumps({"error": str(e)}, ensure_ascii=False))
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,674 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local SQLite inventory of the LIMIT.Lab CDN bucket.
+
+Questions such as "what is the latest version of slug X for event Y" used to
+need a ``ListObjectsV2`` walk plus a HEAD per object to read the
+``version-tag``/``content-hash`` metadata written by ``upload_static.py``.
+Every field of the CDN URL design is already encoded in the key:
+
+  {event}/{type}/{slug}_{version-tag}_{hash}{lang?}{variant?}.{ext}[.br|.gz]
+  {event}/{type}/{slug}_latest{lang?}{variant?}.{ext}[.br|.gz]
+
+so this module parses keys once and keeps them in a compact SQLite index
+(``~/.cache/limitlab/inventory.sqlite3``) together with size, ETag,
+last-modified time and the Cache-Control policy the rule table assigns.
+Queries are then answered locally in milliseconds.
+
+Refreshing:
+  - ``refresh`` lists the bucket (top-level prefixes concurrently) or the
+    given ``--prefix`` values and applies only the differences: new and
+    changed keys are upserted, keys gone from a refreshed prefix are removed,
+    unchanged rows are not rewritten.
+  - ``refresh --inventory-manifest`` loads an S3 Inventory report instead
+    (``manifest.json`` as a local path or ``s3://`` URI; CSV, or Parquet
+    with ``pyarrow`` installed), which avoids listing very large buckets.
+
+Alias targets come from the ``points-to`` metadata that ``upload_static.py``
+and ``promote_latest.py`` write on every alias. A refresh HEADs (concurrently)
+only the aliases that are new or changed since the last refresh and stores
+the target in the ``points_to`` column. ETags cannot be used instead: an
+alias is a server-side copy, and the copy's ETag differs from a source that
+was uploaded in parts (every file above the 64 MiB multipart threshold).
+ETag equality is only a fallback for aliases without the metadata.
+
+Examples:
+  $ python inventory.py refresh
+  $ python inventory.py refresh --prefix iccv2025/
+  $ python inventory.py latest --event iccv2025 --type s --slug found-opening --lang ja
+  $ python inventory.py query --event iccv2025 --type s
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import re
+import sqlite3
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Final
+
+from upload_static import (
+    CACHE_DIR,
+    CACHE_POLICIES,
+    ENCODING_SUFFIXES,
+    LANG_CODES,
+    cache_control_for,
+    error_result,
+    head_object_or_none,
+    is_client_error,
+    list_prefix,
+    make_s3_client,
+    norm_suffix,
+    resolve_env_targets,
+)
+
+
+INVENTORY_PATH: Final = CACHE_DIR / "inventory.sqlite3"
+INVENTORY_JOBS: Final = 16
+COLUMNS: Final = (
+    "key",
+    "event",
+    "type",
+    "slug",
+    "version_tag",
+    "hash",
+    "lang",
+    "variant",
+    "ext",
+    "encoding",
+    "is_alias",
+    "size",
+    "etag",
+    "last_modified",
+    "cache_control",
+    "points_to",
+)
+
+_NAME_RE: Final = re.compile(
+    r"(?P<slug>.+?)_(?:(?P<version_tag>v[^_]+)_(?P<hash>[0-9a-f]{12})|latest)"
+    r"(?P<suffix>(?:-[^._]+)*)\.(?P<ext>[^_]+?)(?P<enc>\.br|\.gz)?"
+)
+_ENCODINGS: Final = {suffix: enc for enc, suffix in ENCODING_SUFFIXES.items()}
+
+
+# -------- Key parsing --------
+
+def split_suffix(suffix: str) -> tuple[str | None, str | None]:
+    """Split ``{lang?}{variant?}`` tokens into a language and a variant.
+
+    A first token listed in ``LANG_CODES`` is the language; the remaining
+    tokens form the variant.
+
+    Examples:
+      >>> split_suffix("-ja-w1200"), split_suffix("-w320"), split_suffix("")
+      (('ja', 'w1200'), (None, 'w320'), (None, None))
+      >>> split_suffix("-sm"), split_suffix("-en-hd")
+      ((None, 'sm'), ('en', 'hd'))
+    """
+    tokens = suffix.split("-")[1:]
+    lang = tokens.pop(0) if tokens and tokens[0] in LANG_CODES else None
+    return lang, "-".join(tokens) or None
+
+
+def parse_cdn_key(key: str) -> dict | None:
+    """Parse a key following the CDN URL design into its fields.
+
+    Args:
+      key: Object key.
+
+    Returns:
+      A dictionary with ``event``, ``type``, ``slug``, ``version_tag`` and
+      ``hash`` (``None`` for aliases), ``lang``, ``variant``, ``ext``,
+      ``encoding`` (``"br"``/``"gzip"`` for sidecars) and ``is_alias``; or
+      ``None`` if the key is outside the design (e.g., ``_private/...``).
+
+    Examples:
+      >>> r = parse_cdn_key("iccv2025/s/talk_v1.0.0_abcdef123456-ja.pdf")
+      >>> r["slug"], r["version_tag"], r["hash"], r["lang"], r["ext"], r["is_alias"]
+      ('talk', 'v1.0.0', 'abcdef123456', 'ja', 'pdf', False)
+      >>> r = parse_cdn_key("e/a/photo_latest-w320.webp.br")
+      >>> r["variant"], r["encoding"], r["is_alias"]
+      ('w320', 'br', True)
+      >>> parse_cdn_key("_private/dedup/sha256.json.gz") is None
+      True
+    """
+    parts = key.split("/")
+    if len(parts) != 3:
+        return None
+    event, type_code, filename = parts
+    m = _NAME_RE.fullmatch(filename)
+    if not m:
+        return None
+    lang, variant = split_suffix(m.group("suffix"))
+    return {
+        "event": event,
+        "type": type_code,
+        "slug": m.group("slug"),
+        "version_tag": m.group("version_tag"),
+        "hash": m.group("hash"),
+        "lang": lang,
+        "variant": variant,
+        "ext": m.group("ext"),
+        "encoding": _ENCODINGS.get(m.group("enc")),
+        "is_alias": m.group("version_tag") is None,
+    }
+
+
+def _epoch(value) -> float:
+    """Convert a listing datetime or an inventory ISO-8601 string to epoch seconds."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value.timestamp()
+
+
+def inventory_row(key: str, size: int, etag: str, last_modified, cache_rules=CACHE_POLICIES["cdn"]) -> tuple:
+    """Build one ``objects`` row (in ``COLUMNS`` order) from listing fields.
+
+    ``points_to`` is left unknown (``None``); ``refresh_alias_targets()``
+    fills it in for aliases.
+
+    Examples:
+      >>> row = inventory_row("e/s/t_latest.pdf", 3, '"abc"', "2025-10-19T00:00:00.000Z")
+      >>> dict(zip(COLUMNS, row))["etag"], dict(zip(COLUMNS, row))["cache_control"]
+      ('abc', 'public, max-age=300')
+    """
+    fields = parse_cdn_key(key) or {}
+    return (
+        key,
+        *(fields.get(c) for c in COLUMNS[1:10]),
+        int(fields.get("is_alias", False)),
+        size,
+        etag.strip('"'),
+        _epoch(last_modified),
+        cache_control_for(key, cache_rules),
+        None,
+    )
+
+
+# -------- Index --------
+
+class Inventory:
+    """SQLite index of bucket objects with their parsed URL-design fields.
+
+    Rows are keyed on ``(bucket, key)``; refreshes are scoped to a prefix so
+    that a partial listing never removes keys outside it. The index is safe
+    to share across threads.
+
+    Examples:
+      >>> import tempfile
+      >>> inv = Inventory(Path(tempfile.mkdtemp()) / "inventory.sqlite3")
+      >>> rows = [
+      ...     inventory_row("e/s/t_v1_aaaaaaaaaaaa.pdf", 1, '"a"', "2025-01-01T00:00:00Z"),
+      ...     inventory_row("e/s/t_v2_bbbbbbbbbbbb.pdf", 2, '"b"', "2025-02-01T00:00:00Z"),
+      ...     inventory_row("e/s/t_latest.pdf", 2, '"b"', "2025-02-01T00:00:01Z"),
+      ... ]
+      >>> inv.apply("bkt", "", rows, source="test")
+      {'added': 3, 'updated': 0, 'removed': 0, 'unchanged': 0}
+      >>> inv.latest("bkt", event="e", type_code="s", slug="t")["version_tag"]
+      'v2'
+      >>> inv.aliases("bkt", event="e", type_code="s", slug="t")
+      {'e/s/t_latest.pdf': 'e/s/t_v2_bbbbbbbbbbbb.pdf'}
+      >>> inv.unresolved_aliases("bkt")
+      ['e/s/t_latest.pdf']
+      >>> inv.set_points_to("bkt", {"e/s/t_latest.pdf": "e/s/t_v1_aaaaaaaaaaaa.pdf"})
+      >>> inv.aliases("bkt", event="e", type_code="s", slug="t"), inv.unresolved_aliases("bkt")
+      ({'e/s/t_latest.pdf': 'e/s/t_v1_aaaaaaaaaaaa.pdf'}, [])
+      >>> inv.apply("bkt", "e/", rows[1:], source="test")
+      {'added': 0, 'updated': 0, 'removed': 1, 'unchanged': 2}
+      >>> inv.close()
+    """
+
+    def __init__(self, path: Path = INVENTORY_PATH) -> None:
+        """Open (or create) the index database.
+
+        Raises:
+          sqlite3.Error: If the database cannot be opened.
+          OSError: If the parent directory cannot be created.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS objects ("
+            " bucket TEXT NOT NULL, key TEXT NOT NULL, event TEXT, type TEXT, slug TEXT, version_tag TEXT,"
+            " hash TEXT, lang TEXT, variant TEXT, ext TEXT, encoding TEXT, is_alias INTEGER NOT NULL,"
+            " size INTEGER NOT NULL, etag TEXT NOT NULL, last_modified REAL NOT NULL, cache_control TEXT,"
+            " points_to TEXT, PRIMARY KEY (bucket, key)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS objects_slug ON objects (bucket, event, type, slug);"
+            "CREATE TABLE IF NOT EXISTS refreshes ("
+            " bucket TEXT NOT NULL, prefix TEXT NOT NULL, source TEXT NOT NULL, refreshed_at REAL NOT NULL,"
+            " objects INTEGER NOT NULL, PRIMARY KEY (bucket, prefix));"
+        )
+        if "points_to" not in {row["name"] for row in self._db.execute("PRAGMA table_info(objects)")}:
+            # Indexes created before alias targets were stored; NULL means "not resolved yet"
+            self._db.execute("ALTER TABLE objects ADD COLUMN points_to TEXT")
+        self._db.commit()
+
+    def apply(self, bucket: str, prefix: str, rows: list[tuple], *, source: str) -> dict:
+        """Make the index match ``rows`` for every key under ``prefix``.
+
+        Args:
+          bucket: Bucket name.
+          prefix: Scope of the snapshot; keys under it missing from ``rows``
+            are removed, keys outside it are left untouched.
+          rows: Snapshot rows from ``inventory_row()``.
+          source: Where the snapshot came from (``"list"`` or ``"inventory"``).
+
+        Returns:
+          Counts of ``added``, ``updated``, ``removed`` and ``unchanged`` rows.
+        """
+        with self._lock, self._db:
+            # Last-modified catches an alias re-pointed at a version with the same bytes
+            known = {
+                key: (size, etag, last_modified)
+                for key, size, etag, last_modified in self._db.execute(
+                    "SELECT key, size, etag, last_modified FROM objects"
+                    " WHERE bucket = ? AND substr(key, 1, ?) = ?",
+                    (bucket, len(prefix), prefix),
+                )
+            }
+            changed = [row for row in rows if known.get(row[0]) != (row[11], row[12], row[13])]
+            seen = {row[0] for row in rows}
+            gone = [(bucket, key) for key in known if key not in seen]
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO objects (bucket, {', '.join(COLUMNS)})"
+                f" VALUES ({', '.join('?' * (len(COLUMNS) + 1))})",
+                [(bucket, *row) for row in changed],
+            )
+            self._db.executemany("DELETE FROM objects WHERE bucket = ? AND key = ?", gone)
+            self._db.execute(
+                "INSERT OR REPLACE INTO refreshes VALUES (?, ?, ?, ?, ?)",
+                (bucket, prefix, source, time.time(), len(rows)),
+            )
+        added = sum(1 for row in changed if row[0] not in known)
+        return {
+            "added": added,
+            "updated": len(changed) - added,
+            "removed": len(gone),
+            "unchanged": len(rows) - len(changed),
+        }
+
+    def unresolved_aliases(self, bucket: str, prefix: str = "") -> list[str]:
+        """List the aliases (sidecars excluded) under ``prefix`` whose target is not stored yet."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key FROM objects WHERE bucket = ? AND substr(key, 1, ?) = ? AND is_alias = 1"
+                " AND encoding IS NULL AND points_to IS NULL ORDER BY key",
+                (bucket, len(prefix), prefix),
+            ).fetchall()
+        return [row["key"] for row in rows]
+
+    def set_points_to(self, bucket: str, targets: dict[str, str]) -> None:
+        """Store alias targets (``""`` for an alias without ``points-to`` metadata)."""
+        with self._lock, self._db:
+            self._db.executemany(
+                "UPDATE objects SET points_to = ? WHERE bucket = ? AND key = ?",
+                [(target, bucket, key) for key, target in targets.items()],
+            )
+
+    def forget(self, bucket: str, keys: list[str]) -> None:
+        """Remove deleted keys from the index without a refresh."""
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM objects WHERE bucket = ? AND key = ?", [(bucket, k) for k in keys])
+
+    def query(self, bucket: str, **filters) -> list[dict]:
+        """Return rows matching column filters (``None`` values are ignored), oldest first.
+
+        Args:
+          bucket: Bucket name.
+          **filters: Column equality filters, e.g. ``event="e", slug="t"``;
+            ``prefix="e/s/"`` restricts to a key prefix.
+
+        Returns:
+          A list of row dictionaries (``COLUMNS`` keys, ``is_alias`` as bool).
+        """
+        prefix = filters.pop("prefix", None) or ""
+        unknown = set(filters) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown inventory column(s): {', '.join(sorted(unknown))}")
+        active = {k: v for k, v in filters.items() if v is not None}
+        where = "".join(f" AND {column} = ?" for column in active)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM objects WHERE bucket = ? AND substr(key, 1, ?) = ?{where}"
+                " ORDER BY last_modified, key",
+                (bucket, len(prefix), prefix, *active.values()),
+            ).fetchall()
+        return [{**dict(row), "is_alias": bool(row["is_alias"])} for row in rows]
+
+    def versions(
+        self,
+        bucket: str,
+        *,
+        event: str,
+        type_code: str,
+        slug: str,
+        lang: str | None = None,
+        variant: str | None = None,
+    ) -> list[dict]:
+        """List the versioned objects (sidecars excluded) of a slug, oldest first."""
+        rows = self.query(
+            bucket,
+            event=event,
+            type=type_code,
+            slug=slug,
+            lang=norm_suffix(lang)[1:] or None,
+            variant=norm_suffix(variant)[1:] or None,
+            is_alias=0,
+        )
+        return [row for row in rows if row["encoding"] is None]
+
+    def latest(self, bucket: str, **target) -> dict | None:
+        """Return the most recently published version of a slug (see ``versions()``), if any."""
+        versions = self.versions(bucket, **target)
+        return versions[-1] if versions else None
+
+    def aliases(self, bucket: str, *, event: str, type_code: str, slug: str) -> dict[str, str | None]:
+        """Map each alias of a slug to the versioned key it points to (``None`` if unknown).
+
+        The stored ``points-to`` target is used. Aliases without one (legacy
+        objects, or not refreshed yet) fall back to the versioned key with the
+        same ETag, which only matches sources uploaded in a single part.
+        """
+        rows = [r for r in self.query(bucket, event=event, type=type_code, slug=slug) if r["encoding"] is None]
+        by_etag = {r["etag"]: r["key"] for r in rows if not r["is_alias"]}
+        return {r["key"]: r["points_to"] or by_etag.get(r["etag"]) for r in rows if r["is_alias"]}
+
+    def refreshed(self, bucket: str) -> list[dict]:
+        """Describe the refreshes recorded for a bucket (prefix, source, time, object count)."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT prefix, source, refreshed_at, objects FROM refreshes WHERE bucket = ? ORDER BY prefix",
+                (bucket,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+
+# -------- Refresh --------
+
+def top_level_prefixes(s3, *, bucket: str) -> tuple[list[str], dict[str, dict]]:
+    """List the first-level prefixes of a bucket (``{event}/``) and its root objects."""
+    prefixes, root = [], {}
+    for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Delimiter="/"):
+        prefixes += [p["Prefix"] for p in page.get("CommonPrefixes", [])]
+        for obj in page.get("Contents", []):
+            root[obj["Key"]] = {"size": obj["Size"], "etag": obj["ETag"], "last_modified": obj["LastModified"]}
+    return prefixes, root
+
+
+def refresh_alias_targets(
+    inventory: Inventory, s3, *, bucket: str, prefix: str = "", jobs: int = INVENTORY_JOBS
+) -> int:
+    """Read ``points-to`` (concurrent HEADs) for aliases whose target is not stored yet.
+
+    Only aliases added or changed since the last refresh need a HEAD.
+
+    Returns:
+      The number of aliases resolved.
+    """
+    keys = inventory.unresolved_aliases(bucket, prefix)
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(keys) or 1))) as pool:
+        heads = list(pool.map(lambda k: head_object_or_none(s3, bucket=bucket, key=k), keys))
+    targets = {
+        key: head.get("Metadata", {}).get("points-to", "")
+        for key, head in zip(keys, heads)
+        if head is not None  # deleted since the listing; the next refresh drops it
+    }
+    inventory.set_points_to(bucket, targets)
+    return len(targets)
+
+
+def refresh_from_listing(
+    inventory: Inventory,
+    s3,
+    *,
+    bucket: str,
+    prefixes: list[str] | None = None,
+    jobs: int = INVENTORY_JOBS,
+    cache_rules=CACHE_POLICIES["cdn"],
+) -> dict:
+    """Refresh the index from ``ListObjectsV2``, one concurrent walk per prefix.
+
+    Args:
+      inventory: The index to update.
+      s3: A boto3 S3 client.
+      bucket: Bucket name.
+      prefixes: Prefixes to refresh; the whole bucket when omitted (its
+        top-level ``{event}/`` prefixes are then listed concurrently).
+      jobs: Number of concurrent listings.
+      cache_rules: Cache-Control rule table used for the ``cache_control`` column.
+
+    Returns:
+      Per-prefix change counts from ``Inventory.apply()``, plus
+      ``alias_targets`` (aliases resolved by ``refresh_alias_targets()``).
+    """
+    if prefixes:
+        listed = prefixes
+        scopes = {prefix: [prefix] for prefix in prefixes}
+        root = {}
+    else:
+        listed, root = top_level_prefixes(s3, bucket=bucket)
+        scopes = {"": listed}
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(listed) or 1))) as pool:
+        listings = dict(zip(listed, pool.map(lambda p: list_prefix(s3, bucket=bucket, prefix=p), listed)))
+    summary = {}
+    for scope, members in scopes.items():
+        objects = dict(root) if scope == "" else {}
+        for prefix in members:
+            objects.update(listings[prefix])
+        rows = [
+            inventory_row(key, obj["size"], obj["etag"], obj["last_modified"], cache_rules)
+            for key, obj in objects.items()
+        ]
+        summary[scope] = inventory.apply(bucket, scope, rows, source="list")
+        summary[scope]["alias_targets"] = refresh_alias_targets(
+            inventory, s3, bucket=bucket, prefix=scope, jobs=jobs
+        )
+    return summary
+
+
+def _load_pyarrow():
+    """Import pyarrow lazily; only Parquet inventory reports need it."""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Parquet inventory reports require pyarrow (pip install pyarrow).") from e
+    return pq
+
+
+def _read_report_file(data: bytes, fmt: str, schema: list[str]) -> list[dict]:
+    """Decode one inventory data file into dictionaries with ``key``, ``size``, ``etag``, ``last_modified``."""
+    if fmt == "CSV":
+        reader = csv.reader(io.StringIO(gzip.decompress(data).decode("utf-8")))
+        records = [dict(zip(schema, row)) for row in reader]
+        out = []
+        for rec in records:
+            # Reports of versioned buckets list noncurrent versions and delete markers too
+            if rec.get("IsLatest", "true") != "true" or rec.get("IsDeleteMarker", "false") == "true":
+                continue
+            out.append(
+                {
+                    "key": urllib.parse.unquote_plus(rec["Key"]),  # CSV reports URL-encode keys
+                    "size": int(rec.get("Size") or 0),
+                    "etag": rec.get("ETag", ""),
+                    "last_modified": rec["LastModifiedDate"],
+                }
+            )
+        return out
+    if fmt == "Parquet":
+        table = _load_pyarrow().read_table(io.BytesIO(data))
+        out = []
+        for rec in table.to_pylist():
+            if rec.get("is_latest", True) is False or rec.get("is_delete_marker"):
+                continue
+            out.append(
+                {
+                    "key": rec["key"],
+                    "size": int(rec.get("size") or 0),
+                    "etag": rec.get("e_tag") or "",
+                    "last_modified": rec["last_modified_date"],
+                }
+            )
+        return out
+    raise ValueError(f"Unsupported inventory format: {fmt} (CSV or Parquet).")
+
+
+def refresh_from_inventory(
+    inventory: Inventory,
+    manifest: str,
+    *,
+    s3=None,
+    bucket: str | None = None,
+    cache_rules=CACHE_POLICIES["cdn"],
+) -> dict:
+    """Replace the index of a bucket with an S3 Inventory report.
+
+    An inventory report is a full snapshot, so keys absent from it are
+    removed. Data files are read from the destination bucket of an
+    ``s3://`` manifest, or from the manifest's directory for a local one.
+
+    Args:
+      inventory: The index to update.
+      manifest: ``manifest.json`` path or ``s3://bucket/key`` URI.
+      s3: A boto3 S3 client (required for ``s3://`` manifests, and used to
+        resolve alias targets).
+      bucket: Source bucket to record the rows under (defaults to the
+        manifest's ``sourceBucket``).
+      cache_rules: Cache-Control rule table used for the ``cache_control`` column.
+
+    Returns:
+      Change counts from ``Inventory.apply()``, plus ``alias_targets`` when
+      ``s3`` is given (alias targets are then resolved with HEAD requests).
+
+    Raises:
+      ValueError: If the report format is not CSV or Parquet.
+      RuntimeError: If a Parquet report is given without pyarrow.
+    """
+    if manifest.startswith("s3://"):
+        dest, _, manifest_key = manifest[5:].partition("/")
+
+        def read(key: str) -> bytes:
+            return s3.get_object(Bucket=dest, Key=key)["Body"].read()
+
+        doc = json.loads(read(manifest_key))
+    else:
+        base = Path(manifest).parent
+
+        def read(key: str) -> bytes:
+            return (base / Path(key).name).read_bytes()
+
+        doc = json.loads(Path(manifest).read_text(encoding="utf-8"))
+    schema = [field.strip() for field in doc.get("fileSchema", "").split(",")]
+    with ThreadPoolExecutor(max_workers=INVENTORY_JOBS) as pool:
+        files = pool.map(lambda f: _read_report_file(read(f["key"]), doc["fileFormat"], schema), doc["files"])
+        records = [rec for recs in files for rec in recs]
+    rows = [inventory_row(r["key"], r["size"], r["etag"], r["last_modified"], cache_rules) for r in records]
+    bucket = bucket or doc["sourceBucket"]
+    changes = inventory.apply(bucket, "", rows, source="inventory")
+    if s3 is not None:
+        changes["alias_targets"] = refresh_alias_targets(inventory, s3, bucket=bucket)
+    return changes
+
+
+# -------- CLI --------
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments for the inventory CLI.
+
+    Returns:
+      An ``argparse.Namespace`` with ``command``, ``db``, ``prefix``,
+      ``inventory_manifest``, ``jobs``, ``event``, ``type_code``, ``slug``,
+      ``lang`` and ``variant`` attributes.
+    """
+    p = argparse.ArgumentParser(description="Local inventory index of the LIMIT.Lab CDN bucket")
+    p.add_argument("command", choices=("refresh", "query", "latest", "status"), help="Action to perform")
+    p.add_argument("--db", default=str(INVENTORY_PATH), help="Path of the inventory database")
+    p.add_argument("--prefix", action="append", default=None, help="Refresh/query only this prefix (repeatable)")
+    p.add_argument("--inventory-manifest", default=None, help="Refresh from an S3 Inventory manifest.json")
+    p.add_argument("--jobs", type=int, default=INVENTORY_JOBS, help="Concurrent listings")
+    p.add_argument("--event", default=None, help="Event id (e.g., iccv2025)")
+    p.add_argument("--type", dest="type_code", default=None, help="Asset type code (s|p|r|a)")
+    p.add_argument("--slug", default=None, help="Slug (descriptive name)")
+    p.add_argument("--lang", default=None, help="Language suffix filter")
+    p.add_argument("--variant", default=None, help="Variant suffix filter")
+    args = p.parse_args()
+    if args.command == "latest" and not (args.event and args.type_code and args.slug):
+        p.error("latest requires --event, --type and --slug")
+    return args
+
+
+def main() -> int:
+    """CLI entry point.
+
+    Commands:
+      refresh  Update the index from a listing or an S3 Inventory report.
+      query    Print matching rows (filters: prefix, event, type, slug, lang, variant).
+      latest   Print the newest version of a slug and what its aliases point to.
+      status   Print the recorded refreshes of the current bucket.
+
+    Exit codes:
+      0: Success.
+      1: Generic error (e.g., unreadable report, no version found).
+      3: AWS client error (STS/S3 API responded with an error).
+
+    Returns:
+      Process exit code: 0 on success, non-zero on failure.
+    """
+    inventory = None
+    try:
+        args = parse_args()
+        env_info = resolve_env_targets(dry_run=True)  # reads the bucket only
+        bucket = env_info["bucket"]
+        inventory = Inventory(Path(args.db))
+        if args.command == "refresh":
+            s3 = make_s3_client(args.jobs)
+            started = time.perf_counter()
+            if args.inventory_manifest:
+                changes = refresh_from_inventory(inventory, args.inventory_manifest, s3=s3, bucket=bucket)
+            else:
+                changes = refresh_from_listing(inventory, s3, bucket=bucket, prefixes=args.prefix, jobs=args.jobs)
+            result = {"bucket": bucket, "changes": changes, "seconds": round(time.perf_counter() - started, 3)}
+        elif args.command == "query":
+            result = inventory.query(
+                bucket,
+                prefix=(args.prefix or [""])[0],
+                event=args.event,
+                type=args.type_code,
+                slug=args.slug,
+                lang=norm_suffix(args.lang)[1:] or None,
+                variant=norm_suffix(args.variant)[1:] or None,
+            )
+        elif args.command == "latest":
+            target = {"event": args.event, "type_code": args.type_code, "slug": args.slug}
+            latest = inventory.latest(bucket, **target, lang=args.lang, variant=args.variant)
+            if latest is None:
+                raise ValueError(f"No version of {args.slug} in the inventory (run: inventory.py refresh).")
+            result = {"latest": latest, "aliases": inventory.aliases(bucket, **target)}
+        else:
+            result = {"bucket": bucket, "db": args.db, "refreshes": inventory.refreshed(bucket)}
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+    except Exception as e:
+        print(json.dumps({"error": error_result("", e)["error"]}, ensure_ascii=False))
+        return 3 if is_client_error(e) else 1
+    finally:
+        if inventory is not None:
+            inventory.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
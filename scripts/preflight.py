@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whole-tree pre-flight check for a CDN publish.
+
+``validate_inputs()`` only looks at one file at a time (existence, extension,
+``v`` prefix), so a large batch could fail, or silently overwrite itself,
+partway through the upload. This module checks a whole publish locally
+before anything is sent:
+
+  - Every name field against ``docs/cdn_url_design.md``:
+      event      lowercase letters/digits/hyphens     e.g. iccv2025
+      type       1-3 lowercase letters (s|p|r|a)      e.g. s
+      slug       lowercase words joined by hyphens    e.g. found-opening-remarks
+      version    "v" + dot/hyphen separated tokens    e.g. v2025-10-19, v1.2.3
+      lang       ISO-639-1 code from LANG_CODES       e.g. ja
+      variant    lowercase tokens joined by hyphens   e.g. w1200, thumb
+      ext        lowercase letters/digits             e.g. .pdf
+    A variant whose first token is a language code without a ``lang`` is
+    rejected because keys parse it as the language. Each planned key must
+    also parse back into the same fields (``inventory.parse_cdn_key``).
+  - Conflicts between entries: two entries that share ``{event, type, slug,
+    lang, variant, ext}`` would race on the same latest alias, and keys that
+    differ only in letter case collide on case-insensitive filesystems and
+    tooling.
+
+Files are hashed in a process pool, so the report contains every planned
+versioned key, latest alias and URL. Digests go through the uploader's
+``HashCache``, so the upload that follows does not read the files again. All problems are reported in one pass.
+
+Sources:
+  - ``--dir ROOT``: every file under ROOT. Files at ``{event}/{type}/{file}``
+    take event and type from the path, files directly under ROOT take them
+    from the flags; the slug is the file stem.
+  - ``--manifest FILE``: a batch manifest as accepted by ``upload_static.py``.
+  The naming flags fill in fields an entry omits. ``upload_static.py
+  --preflight`` runs the same check before a batch upload.
+
+Examples:
+  $ python preflight.py --dir ./publish --version-tag v2025-10-19
+  $ python preflight.py --manifest slides.yaml --event iccv2025 --type s --version-tag v1.0.0
+"""
+
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+from typing import Final
+
+from inventory import parse_cdn_key
+from upload_static import (
+    HASH_JOBS,
+    LANG_CODES,
+    HashCache,
+    build_filename,
+    build_key,
+    error_result,
+    is_client_error,
+    load_manifest,
+    norm_suffix,
+    open_hash_cache,
+    resolve_env_targets,
+    sha256_files,
+)
+
+
+PREFLIGHT_JOBS: Final = HASH_JOBS
+
+# Naming rules from docs/cdn_url_design.md (field -> (pattern, description))
+_TOKENS: Final = r"[a-z0-9]+(?:-[a-z0-9]+)*"
+NAME_RULES: Final = {
+    "event": (re.compile(_TOKENS), "lowercase letters, digits and single hyphens"),
+    "type": (re.compile(r"[a-z]{1,3}"), "a 1-3 letter lowercase type code"),
+    "slug": (re.compile(_TOKENS), "lowercase letters, digits and single hyphens"),
+    "version_tag": (re.compile(r"v[0-9A-Za-z]+(?:[.-][0-9A-Za-z]+)*"), 'a "v" tag such as v2025-10-19 or v1.2.3'),
+    "lang": (re.compile("|".join(sorted(LANG_CODES))), "an ISO-639-1 code listed in upload_static.LANG_CODES"),
+    "variant": (re.compile(_TOKENS), "lowercase letters, digits and single hyphens"),
+    "ext": (re.compile(r"\.[a-z0-9]+"), "a lowercase extension"),
+}
+
+
+# -------- Entries --------
+
+def entries_from_tree(root: Path) -> list[dict]:
+    """Build entries for every regular file under ``root`` (hidden files skipped).
+
+    Files at ``{event}/{type}/{file}`` carry event and type from the path;
+    files directly under ``root`` leave them to defaults. Any other depth is
+    kept with ``depth`` set so the check can report it.
+
+    Raises:
+      NotADirectoryError: If ``root`` is not a directory.
+    """
+    if not root.is_dir():
+        raise NotADirectoryError(str(root))
+    entries = []
+    for path in sorted(root.rglob("*")):
+        rel = path.relative_to(root)
+        if not path.is_file() or any(part.startswith(".") for part in rel.parts):
+            continue
+        entry = {"file": str(path), "slug": path.stem}
+        if len(rel.parts) == 3:
+            entry["event"], entry["type"] = rel.parts[:2]
+        elif len(rel.parts) != 1:
+            entry["depth"] = len(rel.parts) - 1
+        entries.append(entry)
+    return entries
+
+
+def name_violations(entry: dict) -> list[dict]:
+    """Check the naming fields of one entry (defaults applied) against ``NAME_RULES``.
+
+    Args:
+      entry: Entry with ``file``, ``event``, ``type``, ``slug``,
+        ``version_tag`` and optional ``lang``/``variant``.
+
+    Returns:
+      ``{"source_file", "field", "value", "rule"}`` records, empty if valid.
+
+    Examples:
+      >>> ok = {"file": "a.pdf", "event": "iccv2025", "type": "s", "slug": "talk", "version_tag": "v1.0.0"}
+      >>> name_violations(ok)
+      []
+      >>> [v["field"] for v in name_violations({**ok, "slug": "Talk_v2", "variant": "en"})]
+      ['slug', 'variant']
+      >>> name_violations({**ok, "variant": "sm"}), name_violations({**ok, "lang": "xx"})[0]["field"]
+      ([], 'lang')
+      >>> name_violations({**ok, "file": "a.PDF"})[0]["rule"]
+      'a lowercase extension'
+    """
+    source = entry["file"]
+    violations = []
+
+    def add(field: str, value, rule: str) -> None:
+        violations.append({"source_file": source, "field": field, "value": value, "rule": rule})
+
+    if "depth" in entry:
+        add("file", source, f"files go at ROOT/{{event}}/{{type}}/ or directly under ROOT, not {entry['depth']} deep")
+    values = {
+        **{f: entry.get(f) for f in ("event", "type", "slug", "version_tag")},
+        "lang": norm_suffix(entry.get("lang"))[1:] or None,
+        "variant": norm_suffix(entry.get("variant"))[1:] or None,
+        "ext": Path(source).suffix,
+    }
+    for field, value in values.items():
+        pattern, rule = NAME_RULES[field]
+        if value is None and field in ("lang", "variant"):
+            continue
+        if not value:
+            add(field, value, "required")
+        elif not pattern.fullmatch(value):
+            add(field, value, rule)
+    variant = values["variant"]
+    if variant and not values["lang"] and variant.split("-")[0] in LANG_CODES:
+        add("variant", variant, "must not start with a language code when lang is not set")
+    return violations
+
+
+# -------- Planning --------
+
+def hash_files(paths: list[Path], jobs: int = PREFLIGHT_JOBS, hash_cache: HashCache | None = None) -> dict[Path, bytes]:
+    """Hash files in a process pool; unreadable files are left out.
+
+    With ``hash_cache``, cached digests are reused and new ones are stored,
+    so an upload that follows with the same cache does not read the files again.
+    """
+    existing = sorted({p for p in paths if p.is_file()})
+    digests, misses = {}, {}
+    for path in existing:
+        digest, st = hash_cache.lookup(path) if hash_cache else (None, None)
+        if digest is None:
+            misses[path] = st
+        else:
+            digests[path] = digest
+    for (path, st), digest in zip(misses.items(), sha256_files(list(misses), jobs=jobs, processes=True)):
+        digests[path] = digest
+        if hash_cache:
+            hash_cache.store(path, digest, st)
+    return digests
+
+
+def plan_keys(entry: dict, digest: bytes) -> dict:
+    """Planned versioned and latest keys of an entry, as ``upload()`` would name them."""
+    file_path = Path(entry["file"])
+    args = (
+        entry["slug"],
+        entry["version_tag"],
+        digest.hex()[:12],
+        norm_suffix(entry.get("lang")),
+        norm_suffix(entry.get("variant")),
+        file_path.suffix,
+    )
+    return {
+        "source_file": entry["file"],
+        "size": file_path.stat().st_size,
+        "content_hash": digest.hex()[:12],
+        "key_versioned": build_key(entry["event"], entry["type"], build_filename(*args)),
+        "key_latest": build_key(entry["event"], entry["type"], build_filename(*args, latest=True)),
+    }
+
+
+def find_conflicts(planned: list[dict]) -> list[dict]:
+    """Find entries racing on one latest alias and keys that collide when case-folded.
+
+    Returns:
+      ``{"kind", "keys", "source_files"}`` records where ``kind`` is
+      ``"duplicate_latest"`` or ``"case_collision"``.
+
+    Examples:
+      >>> planned = [
+      ...     {"source_file": f, "key_versioned": f"{e}/s/t_v1_{h * 12}.pdf", "key_latest": f"{e}/s/t_latest.pdf"}
+      ...     for f, e, h in [("a/x.pdf", "e", "a"), ("b/x.pdf", "e", "b"), ("c/x.pdf", "E", "c")]
+      ... ]
+      >>> [(c["kind"], c["source_files"]) for c in find_conflicts(planned)]
+      [('duplicate_latest', ['a/x.pdf', 'b/x.pdf']), ('case_collision', ['a/x.pdf', 'b/x.pdf', 'c/x.pdf'])]
+    """
+    by_latest, by_folded = {}, {}
+    for p in planned:
+        by_latest.setdefault(p["key_latest"], []).append(p["source_file"])
+        for key in (p["key_versioned"], p["key_latest"]):
+            by_folded.setdefault(key.casefold(), {}).setdefault(key, set()).add(p["source_file"])
+    conflicts = [
+        {"kind": "duplicate_latest", "keys": [key], "source_files": sorted(sources)}
+        for key, sources in sorted(by_latest.items())
+        if len(sources) > 1
+    ]
+    seen = set()
+    for variants in by_folded.values():
+        sources = sorted(set().union(*variants.values()))
+        if len(variants) > 1 and tuple(sources) not in seen:
+            seen.add(tuple(sources))
+            conflicts.append({"kind": "case_collision", "keys": sorted(variants), "source_files": sources})
+    return conflicts
+
+
+def preflight(
+    entries: list[dict],
+    *,
+    domain: str,
+    defaults: dict | None = None,
+    jobs: int = PREFLIGHT_JOBS,
+    hash_cache: HashCache | None = None,
+) -> dict:
+    """Validate a whole publish and plan every key without touching S3.
+
+    Args:
+      entries: Entry dictionaries (``entries_from_tree``, ``load_manifest``
+        or ``entries_from_dir``).
+      domain: CDN domain used for the planned URLs.
+      defaults: Field values applied to entries that do not set them.
+      jobs: Hashing worker processes.
+      hash_cache: Optional ``HashCache``; only files it misses are hashed,
+        and their digests are stored for the upload that follows.
+
+    Returns:
+      ``{"ok", "files", "bytes", "seconds", "planned", "violations",
+      "conflicts"}``; ``ok`` is False if any violation or conflict was found.
+    """
+    started = time.perf_counter()
+    defaults = {k: v for k, v in (defaults or {}).items() if v is not None}
+    entries = [{**defaults, **entry} for entry in entries]
+    violations = []
+    for entry in entries:
+        if not Path(entry["file"]).is_file():
+            violations.append({"source_file": entry["file"], "field": "file", "value": None, "rule": "must exist"})
+        violations += name_violations(entry)
+    # Badly named entries are still planned so that their conflicts show up in the same pass
+    unplannable = {v["source_file"] for v in violations if v["rule"] in ("required", "must exist")}
+    plannable = [e for e in entries if e["file"] not in unplannable]
+    digests = hash_files([Path(e["file"]) for e in plannable], jobs, hash_cache)
+    planned = [plan_keys(e, digests[Path(e["file"])]) for e in plannable]
+    for p, entry in zip(planned, plannable):
+        fields = parse_cdn_key(p["key_versioned"]) or {}
+        expected = {
+            "slug": entry["slug"],
+            "lang": norm_suffix(entry.get("lang"))[1:] or None,
+            "variant": norm_suffix(entry.get("variant"))[1:] or None,
+        }
+        if any(fields.get(f) != value for f, value in expected.items()):
+            violations.append(
+                {
+                    "source_file": p["source_file"],
+                    "field": "key",
+                    "value": p["key_versioned"],
+                    "rule": "must parse back into the same slug/lang/variant",
+                }
+            )
+        p["cloudfront_url_versioned"] = f"https://{domain}/{p['key_versioned']}"
+        p["cloudfront_url_latest"] = f"https://{domain}/{p['key_latest']}"
+    conflicts = find_conflicts(planned)
+    return {
+        "ok": not violations and not conflicts,
+        "files": len(entries),
+        "bytes": sum(p["size"] for p in planned),
+        "seconds": round(time.perf_counter() - started, 6),
+        "planned": planned,
+        "violations": violations,
+        "conflicts": conflicts,
+    }
+
+
+# -------- CLI --------
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments for the pre-flight check.
+
+    Returns:
+      An ``argparse.Namespace`` with ``dir``, ``manifest``, ``event``,
+      ``type_code``, ``version_tag``, ``lang``, ``variant`` and ``jobs``
+      attributes.
+    """
+    p = argparse.ArgumentParser(description="Validate a whole LIMIT.Lab CDN publish before uploading")
+    src = p.add_mutually_exclusive_group(required=True)
+    src.add_argument("--dir", help="Asset tree: ROOT/{event}/{type}/{file} or files directly under ROOT")
+    src.add_argument("--manifest", help="Batch manifest (.json, .yaml or .csv)")
+    p.add_argument("--event", help="Event id for entries that do not set one")
+    p.add_argument("--type", dest="type_code", help="Asset type code for entries that do not set one")
+    p.add_argument("--version-tag", help="Version tag for entries that do not set one")
+    p.add_argument("--lang", default=None, help="Language suffix for entries that do not set one")
+    p.add_argument("--variant", default=None, help="Variant suffix for entries that do not set one")
+    p.add_argument("--jobs", type=int, default=PREFLIGHT_JOBS, help="Hashing worker processes")
+    return p.parse_args()
+
+
+def main() -> int:
+    """CLI entry point.
+
+    Exit codes:
+      0: Every entry is valid and conflict-free (report printed).
+      1: Violations or conflicts found, or a generic error.
+      3: AWS client error (STS responded with an error).
+
+    Returns:
+      Process exit code: 0 on success, non-zero on failure.
+    """
+    hash_cache = None
+    try:
+        args = parse_args()
+        env_info = resolve_env_targets(dry_run=True)  # never touches S3
+        entries = load_manifest(Path(args.manifest)) if args.manifest else entries_from_tree(Path(args.dir))
+        # Digests land in the uploader's cache, so the publish that follows skips hashing
+        hash_cache = open_hash_cache()
+        report = preflight(
+            entries,
+            domain=env_info["domain"],
+            defaults={
+                "event": args.event,
+                "type": args.type_code,
+                "version_tag": args.version_tag,
+                "lang": args.lang,
+                "variant": args.variant,
+            },
+            jobs=args.jobs,
+            hash_cache=hash_cache,
+        )
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return 0 if report["ok"] else 1
+    except Exception as e:
+        print(json.dumps({"error": error_result("", e)["error"]}, ensure_ascii=False))
+        return 3 if is_client_error(e) else 1
+    finally:
+        if hash_cache is not None:
+            hash_cache.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
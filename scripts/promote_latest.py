@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Server-side promotion and rollback of "latest" aliases for the LIMIT.Lab CDN.
+
+``upload_static.py`` writes every published version as an immutable
+``{slug}_{version-tag}_{hash}{lang?}{variant?}.{ext}`` object and then copies
+it over ``{slug}_latest{lang?}{variant?}.{ext}``. This module re-points the
+aliases of a slug at any version that is already in the bucket, without
+uploading the source again. No object bytes pass through the runner:
+aliases are re-created with ``CopyObject`` (or multipart ``UploadPartCopy``
+above 5 GiB) inside S3.
+
+Commands:
+  list      Show the published versions of a slug and what each alias points to
+            (read from the alias ``points-to``/``version-tag`` metadata).
+  promote   Point every matching lang/variant alias at ``--version-tag``.
+  rollback  Point the aliases at the version published before the current one.
+
+Switching:
+  - The plan is fully resolved (listing + HEAD of sources and aliases) before
+    any write, so a missing lang/variant fails the command without changes.
+  - All aliases are copied concurrently. If any copy fails, aliases that were
+    already switched are restored to their previous target, keeping the set
+    of aliases consistent.
+  - Precompressed ``.br``/``.gz`` sidecars of the chosen version are switched
+    together with their alias.
+
+Examples:
+  $ python promote_latest.py list --event iccv2025 --type s --slug found-opening
+  $ python promote_latest.py promote --event iccv2025 --type s --slug found-opening \\
+        --version-tag v2025-10-19
+  $ python promote_latest.py rollback --event iccv2025 --type s --slug found-opening --lang ja
+"""
+
+import argparse
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Final
+
+from botocore.exceptions import ClientError
+
+from upload_static import (
+    CACHE_POLICIES,
+    ENCODING_SUFFIXES,
+    build_key,
+    cache_control_for,
+    copy_object_any_size,
+    head_object_or_none,
+    invalidate_latest,
+    list_prefix,
+    make_s3_client,
+    norm_suffix,
+    resolve_env_targets,
+)
+
+
+PROMOTE_JOBS: Final = 16
+
+
+# -------- Helpers --------
+
+def parse_versioned_name(filename: str, slug: str) -> dict | None:
+    """Split a versioned filename into its URL-design fields.
+
+    Args:
+      filename: Final key component (no directories).
+      slug: Expected slug.
+
+    Returns:
+      ``{"version_tag", "hash", "suffix"}`` where ``suffix`` is everything
+      after the hash (lang/variant suffixes plus extension), or ``None`` if
+      the name is not a versioned object of ``slug``.
+
+    Examples:
+      >>> parse_versioned_name("talk_v1.0.0_abcdef123456-ja.pdf", "talk")
+      {'version_tag': 'v1.0.0', 'hash': 'abcdef123456', 'suffix': '-ja.pdf'}
+      >>> parse_versioned_name("talk_latest-ja.pdf", "talk") is None
+      True
+    """
+    m = re.fullmatch(rf"{re.escape(slug)}_(v[^_]+)_([0-9a-f]{{12}})((?:-[^._]+)*\.[^_]+)", filename)
+    if not m or m.group(3).endswith(tuple(ENCODING_SUFFIXES.values())):
+        return None
+    return {"version_tag": m.group(1), "hash": m.group(2), "suffix": m.group(3)}
+
+
+def suffix_matches(suffix: str, *, lang: str | None = None, variant: str | None = None) -> bool:
+    """Tell whether a ``{lang?}{variant?}.{ext}`` suffix carries the requested tokens.
+
+    Examples:
+      >>> suffix_matches("-ja-w320.webp", variant="w320")
+      True
+      >>> suffix_matches(".pdf", lang="ja")
+      False
+    """
+    tokens = suffix.split(".", 1)[0].split("-")[1:]
+    return all(norm_suffix(t)[1:] in tokens for t in (lang, variant) if t)
+
+
+def is_alias_key(key: str) -> bool:
+    """Tell whether a key is a latest alias (sidecars excluded).
+
+    Examples:
+      >>> is_alias_key("e/s/talk_latest-ja.pdf"), is_alias_key("e/s/talk_latest.html.br")
+      (True, False)
+    """
+    return "_latest" in key.rsplit("/", 1)[-1] and not key.endswith(tuple(ENCODING_SUFFIXES.values()))
+
+
+def list_versions(s3, *, bucket: str, event: str, type_code: str, slug: str) -> tuple[list[dict], dict]:
+    """List the versioned objects of a slug, oldest first.
+
+    Args:
+      s3: A boto3 S3 client.
+      bucket: Bucket name.
+      event: Event identifier.
+      type_code: Asset type code.
+      slug: Asset slug.
+
+    Returns:
+      A tuple ``(versions, listing)``. ``versions`` holds one dictionary per
+      versioned key (``key``, ``version_tag``, ``hash``, ``suffix``, ``size``,
+      ``last_modified``) sorted by upload time; ``listing`` is the raw
+      ``list_prefix()`` result for the slug.
+    """
+    prefix = build_key(event, type_code, f"{slug}_")
+    listing = list_prefix(s3, bucket=bucket, prefix=prefix)
+    versions = []
+    for key, obj in listing.items():
+        parsed = parse_versioned_name(key.rsplit("/", 1)[-1], slug)
+        if parsed:
+            versions.append({"key": key, **parsed, "size": obj["size"], "last_modified": obj["last_modified"]})
+    versions.sort(key=lambda v: (v["last_modified"], v["key"]))
+    return versions, listing
+
+
+def current_aliases(s3, *, bucket: str, listing: dict, jobs: int = PROMOTE_JOBS) -> dict[str, dict]:
+    """Read the ``points-to``/``version-tag`` metadata of every alias in a listing.
+
+    Args:
+      s3: A boto3 S3 client.
+      bucket: Bucket name.
+      listing: ``list_prefix()`` result for the slug.
+      jobs: Number of concurrent HEAD requests.
+
+    Returns:
+      A mapping of alias key to ``{"points_to", "version_tag"}``.
+    """
+    aliases = [k for k in listing if is_alias_key(k)]
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(aliases) or 1))) as pool:
+        heads = list(pool.map(lambda k: head_object_or_none(s3, bucket=bucket, key=k), aliases))
+    return {
+        key: {"points_to": meta.get("points-to"), "version_tag": meta.get("version-tag")}
+        for key, head in zip(aliases, heads)
+        if head is not None
+        for meta in [head.get("Metadata", {})]
+    }
+
+
+def plan_promotion(
+    versions: list[dict],
+    *,
+    event: str,
+    type_code: str,
+    slug: str,
+    version_tag: str,
+    lang: str | None = None,
+    variant: str | None = None,
+) -> list[dict]:
+    """Choose the versioned source for every alias that should point at ``version_tag``.
+
+    Args:
+      versions: Output of ``list_versions()``.
+      event: Event identifier.
+      type_code: Asset type code.
+      slug: Asset slug.
+      version_tag: Version to promote.
+      lang: Optional language filter (only aliases with this suffix).
+      variant: Optional variant filter (only aliases with this suffix).
+
+    Returns:
+      A list of ``{"source", "alias", "size", "hash"}`` dictionaries. When a
+      tag was published several times for the same suffix, the most recent
+      upload wins.
+
+    Raises:
+      ValueError: If no versioned object matches the tag and filters.
+
+    Examples:
+      >>> vs = [{"key": "e/s/t_v1_aaaaaaaaaaaa-ja.pdf", "version_tag": "v1", "hash": "a" * 12,
+      ...        "suffix": "-ja.pdf", "size": 1, "last_modified": 0}]
+      >>> plan_promotion(vs, event="e", type_code="s", slug="t", version_tag="v1")[0]["alias"]
+      'e/s/t_latest-ja.pdf'
+    """
+    chosen = {}
+    for v in versions:  # oldest first, so later uploads overwrite earlier ones
+        if v["version_tag"] == version_tag and suffix_matches(v["suffix"], lang=lang, variant=variant):
+            chosen[v["suffix"]] = v
+    if not chosen:
+        wanted = norm_suffix(lang) + norm_suffix(variant)
+        raise ValueError(f"No published object for {slug} {version_tag}{' ' + wanted if wanted else ''}.")
+    return [
+        {
+            "source": v["key"],
+            "alias": build_key(event, type_code, f"{slug}_latest{suffix}"),
+            "size": v["size"],
+            "hash": v["hash"],
+        }
+        for suffix, v in sorted(chosen.items())
+    ]
+
+
+def switch_alias(
+    s3,
+    *,
+    bucket: str,
+    source: str,
+    alias: str,
+    size: int,
+    listing: dict,
+    cache_rules=CACHE_POLICIES["cdn"],
+) -> None:
+    """Re-create one alias (and its sidecars) as a server-side copy of ``source``.
+
+    Headers are taken from the source object; Cache-Control comes from the
+    rule table so aliases keep their short TTL. Alias sidecars in ``listing``
+    for encodings the source lacks are deleted, so they never serve the
+    previous target.
+
+    Args:
+      s3: A boto3 S3 client.
+      bucket: Bucket name.
+      source: Versioned key to point at.
+      alias: Alias key to overwrite.
+      size: Size of the source object (selects CopyObject vs UploadPartCopy).
+      listing: ``list_prefix()`` result, used to find precompressed sidecars
+        of the source and of the alias.
+      cache_rules: Cache-Control rule table.
+
+    Raises:
+      botocore.exceptions.ClientError: For S3 API errors.
+      RuntimeError: If the source object disappeared.
+    """
+    head = head_object_or_none(s3, bucket=bucket, key=source)
+    if head is None:
+        raise RuntimeError(f"Source object vanished: {source}")
+    meta = head.get("Metadata", {})
+    extra_args = {
+        "ContentType": head.get("ContentType", "application/octet-stream"),
+        "CacheControl": cache_control_for(alias, cache_rules),
+        "ServerSideEncryption": "AES256",
+        "Metadata": {**meta, "alias": "latest", "points-to": source},
+        **({"ContentDisposition": head["ContentDisposition"]} if head.get("ContentDisposition") else {}),
+    }
+    copy_object_any_size(s3, bucket=bucket, src_key=source, dst_key=alias, size=size, extra_args=extra_args)
+    stale = []
+    for enc, suffix in ENCODING_SUFFIXES.items():
+        if source + suffix in listing:
+            s3.copy_object(
+                Bucket=bucket,
+                Key=alias + suffix,
+                CopySource={"Bucket": bucket, "Key": source + suffix},
+                MetadataDirective="REPLACE",
+                ContentEncoding=enc,
+                **extra_args,
+            )
+        elif alias + suffix in listing:
+            # The previous target's sidecar would keep serving its bytes
+            stale.append({"Key": alias + suffix})
+    if stale:
+        resp = s3.delete_objects(Bucket=bucket, Delete={"Objects": stale, "Quiet": True})
+        if resp.get("Errors"):
+            err = resp["Errors"][0]
+            raise RuntimeError(f"Failed to delete stale sidecar {err['Key']}: {err.get('Code')}")
+
+
+def promote(
+    s3,
+    *,
+    bucket: str,
+    event: str,
+    type_code: str,
+    slug: str,
+    version_tag: str | None,
+    lang: str | None = None,
+    variant: str | None = None,
+    dry_run: bool = False,
+    jobs: int = PROMOTE_JOBS,
+) -> dict:
+    """Point every matching alias of a slug at a published version.
+
+    Args:
+      s3: A boto3 S3 client.
+      bucket: Bucket name.
+      event: Event identifier.
+      type_code: Asset type code.
+      slug: Asset slug.
+      version_tag: Version to promote; ``None`` means "the version published
+        before the one the aliases currently point to" (rollback).
+      lang: Optional language filter.
+      variant: Optional variant filter.
+      dry_run: If True, return the plan without writing.
+      jobs: Number of aliases switched concurrently.
+
+    Returns:
+      A JSON-serializable summary with the target version and, per alias, the
+      previous and new ``points-to`` key.
+
+    Raises:
+      ValueError: If the requested (or previous) version does not exist.
+      RuntimeError: If switching failed. Every alias with a known previous
+        target is restored, failed ones included; the message lists the
+        switch errors and any alias that could not be restored.
+    """
+    versions, listing = list_versions(s3, bucket=bucket, event=event, type_code=type_code, slug=slug)
+    aliases = current_aliases(s3, bucket=bucket, listing=listing, jobs=jobs)
+
+    if version_tag is None:
+        # Tags in first-publication order; roll back to the one before the newest current target
+        tags = list(dict.fromkeys(v["version_tag"] for v in versions))
+        current = [
+            tags.index(a["version_tag"])
+            for key, a in aliases.items()
+            if a["version_tag"] in tags and suffix_matches(key.rsplit("_latest", 1)[-1], lang=lang, variant=variant)
+        ]
+        if not current or max(current) == 0:
+            raise ValueError(f"No earlier version of {slug} to roll back to.")
+        version_tag = tags[max(current) - 1]
+
+    plan = plan_promotion(
+        versions, event=event, type_code=type_code, slug=slug, version_tag=version_tag, lang=lang, variant=variant
+    )
+    for step in plan:
+        step["previous"] = aliases.get(step["alias"], {}).get("points_to")
+        step["encodings"] = [enc for enc, suffix in ENCODING_SUFFIXES.items() if step["source"] + suffix in listing]
+        step["removed_encodings"] = [
+            enc
+            for enc, suffix in ENCODING_SUFFIXES.items()
+            if enc not in step["encodings"] and step["alias"] + suffix in listing
+        ]
+
+    summary = {"bucket": bucket, "slug": slug, "version_tag": version_tag}
+    if dry_run:
+        return {"dry_run": True, **summary, "aliases_preview": plan}
+
+    def run(step: dict) -> str | None:
+        try:
+            switch_alias(
+                s3, bucket=bucket, source=step["source"], alias=step["alias"], size=step["size"], listing=listing
+            )
+            return None
+        except Exception as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        failures = list(pool.map(run, plan))
+
+    if any(failures):
+        # A failed step may have switched its alias and part of its sidecars, so restore
+        # every alias with a known previous target; sidecars copied by the switch count as listed
+        restore = [step for step in plan if step["previous"] in listing]
+        restore_listing = {
+            **listing,
+            **{step["alias"] + ENCODING_SUFFIXES[enc]: {} for step in restore for enc in step["encodings"]},
+        }
+
+        def revert(step: dict) -> str | None:
+            try:
+                switch_alias(
+                    s3,
+                    bucket=bucket,
+                    source=step["previous"],
+                    alias=step["alias"],
+                    size=listing[step["previous"]]["size"],
+                    listing=restore_listing,
+                )
+                return None
+            except Exception as e:
+                return str(e)
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            restore_failures = dict(zip((step["alias"] for step in restore), pool.map(revert, restore)))
+        errors = {step["alias"]: failed for step, failed in zip(plan, failures) if failed}
+        not_restored = {alias: failed for alias, failed in restore_failures.items() if failed}
+        not_restored.update(
+            {step["alias"]: "no previous target" for step in plan if step["alias"] not in restore_failures}
+        )
+        if not_restored:
+            raise RuntimeError(f"Alias switch failed: {errors}; not reverted: {not_restored}")
+        raise RuntimeError(f"Alias switch failed and was reverted: {errors}")
+
+    return {**summary, "aliases": plan}
+
+
+# -------- CLI --------
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments for the promotion CLI.
+
+    Returns:
+      An ``argparse.Namespace`` with ``command``, ``event``, ``type_code``,
+      ``slug``, ``version_tag``, ``lang``, ``variant``, ``dry_run``, ``jobs``,
+      ``invalidate`` and ``invalidate_wait`` attributes.
+    """
+    p = argparse.ArgumentParser(description="Promote or roll back LIMIT.Lab CDN latest aliases (server-side)")
+    p.add_argument("command", choices=("list", "promote", "rollback"), help="Action to perform")
+    p.add_argument("--event", required=True, help="Event id (e.g., iccv2025)")
+    p.add_argument("--type", required=True, dest="type_code", help="Asset type code (s|p|r|a)")
+    p.add_argument("--slug", required=True, help="Slug (descriptive name)")
+    p.add_argument("--version-tag", default=None, help="Version to promote (required for promote)")
+    p.add_argument("--lang", default=None, help="Only switch aliases with this language suffix")
+    p.add_argument("--variant", default=None, help="Only switch aliases with this variant suffix")
+    p.add_argument("--dry-run", action="store_true", help="Print the plan without switching aliases")
+    p.add_argument("--jobs", type=int, default=PROMOTE_JOBS, help="Aliases switched concurrently")
+    p.add_argument("--invalidate", action="store_true", help="Invalidate the switched aliases on CloudFront")
+    p.add_argument(
+        "--invalidate-wait",
+        type=float,
+        default=0,
+        help="With --invalidate, poll up to this many seconds for the invalidation to complete",
+    )
+    args = p.parse_args()
+    if args.command == "promote" and not args.version_tag:
+        p.error("promote requires --version-tag")
+    return args
+
+
+def main() -> int:
+    """CLI entry point.
+
+    Exit codes:
+      0: Success.
+      1: Generic error (e.g., unknown version, switch reverted).
+      3: AWS client error (STS/S3 API responded with an error).
+
+    Returns:
+      Process exit code: 0 on success, non-zero on failure.
+    """
+    try:
+        args = parse_args()
+        env_info = resolve_env_targets(dry_run=args.dry_run or args.command == "list")
+        s3 = make_s3_client(args.jobs)
+        target = {"bucket": env_info["bucket"], "event": args.event, "type_code": args.type_code, "slug": args.slug}
+        if args.command == "list":
+            versions, listing = list_versions(s3, **target)
+            result = {
+                **target,
+                "versions": [{**v, "last_modified": str(v["last_modified"])} for v in versions],
+                "aliases": current_aliases(s3, bucket=env_info["bucket"], listing=listing, jobs=args.jobs),
+            }
+        else:
+            result = promote(
+                s3,
+                **target,
+                version_tag=args.version_tag if args.command == "promote" else None,
+                lang=args.lang,
+                variant=args.variant,
+                dry_run=args.dry_run,
+                jobs=args.jobs,
+            )
+            if args.invalidate and not args.dry_run:
+                switched = [
+                    {
+                        "key_latest": step["alias"],
+                        "skipped_latest": False,
+                        "encodings": step["encodings"],
+                        "removed_encodings": step["removed_encodings"],
+                    }
+                    for step in result["aliases"]
+                ]
+                result["invalidation"] = invalidate_latest(env_info, switched, wait=args.invalidate_wait)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        error = result.get("invalidation", {}).get("error")
+        if error:
+            return 3 if isinstance(error, dict) else 1
+        return 0
+    except ClientError as e:
+        msg = e.response.get("Error", {})
+        print(json.dumps({"error": {"code": msg.get("Code"), "message": msg.get("Message")}}, ensure_ascii=False))
+        return 3
+    except Exception as e:
+        print(json.dumps({"error": str(e)}, ensure_ascii=False))
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Content-hash aware replacement for ``aws s3 sync --delete`` for the static site.
+
+This module deploys the Next.js static export (``out/``) to the site bucket.
+Unlike ``aws s3 sync``, which compares size and mtime and therefore treats
+every freshly built file as changed, it compares each local file's MD5 with
+the ETag returned by ``ListObjectsV2`` and uploads only objects whose content
+actually differs. Deploy time scales with the size of the change rather than
+the size of the site.
+
+Workflow:
+  1) List the bucket (one paginated ``ListObjectsV2`` walk).
+  2) Hash every local file in a thread pool (MD5 for the ETag comparison and
+     SHA-256 for the S3 checksum, computed in the same read pass).
+  3) Upload new/changed files concurrently with ``put_object``.
+  4) With ``--precompress``, encode changed text-like files (HTML, JS, CSS,
+     SVG, JSON) with max-level Brotli/gzip in a process pool and upload
+     ``{key}.br``/``{key}.gz`` sidecars with the matching Content-Encoding.
+     Encodings that are not meaningfully smaller are skipped. Sidecars are
+     served only by a distribution with the edge handler enabled
+     (``precompressed_sidecars`` in ``terraform/modules/s3_cloudfront``),
+     which the site distribution does not enable by default.
+  5) With ``--delete``, remove remote keys that no longer exist locally using
+     ``DeleteObjects`` batches of 1000 keys.
+
+Conventions shared with ``upload_static.py``:
+  - Content-Type via ``content_type_for``.
+  - Cache-Control from the "site" profile of ``CACHE_POLICIES``:
+    content-hashed ``_next/static/`` assets are immutable, HTML and RSC
+    payloads revalidate, everything else gets a short TTL.
+  - Server-side encryption: SSE-S3 (AES256).
+  - Integrity: S3 ChecksumSHA256 (base64-encoded SHA-256) and a
+    ``content-hash`` metadata entry with the first 12 hex characters.
+
+Notes:
+  - Objects whose ETag is not a plain MD5 (e.g., multipart uploads made by
+    ``aws s3 sync``) are uploaded once and compare cleanly afterwards.
+  - Header-only changes cannot be seen in a listing; use ``--force`` to
+    re-upload everything after changing headers.
+
+Examples:
+  Deploy the build output and prune removed files:
+    $ python sync_site.py --dir out --bucket dev-limitlab-webpage --delete
+
+  Show what would change without writing:
+    $ python sync_site.py --dir out --bucket dev-limitlab-webpage --delete --dry-run
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Final
+
+from botocore.exceptions import ClientError
+
+from upload_static import (
+    CACHE_POLICIES,
+    ENCODING_SUFFIXES,
+    HASH_CHUNK_SIZE,
+    cache_control_for,
+    compress_variants,
+    content_type_for,
+    is_compressible,
+    list_prefix,
+    load_cache_policies,
+    make_s3_client,
+    upload_encoded_variants,
+)
+
+
+SYNC_JOBS: Final = 16
+DELETE_BATCH_SIZE: Final = 1000  # DeleteObjects accepts at most 1000 keys per call
+
+
+# -------- Helpers --------
+
+def local_files(root: Path, prefix: str = "") -> dict[str, Path]:
+    """Map every regular file under ``root`` to its S3 key.
+
+    Args:
+      root: Local directory to publish (e.g., ``out``).
+      prefix: Optional key prefix inside the bucket (no leading slash).
+
+    Returns:
+      A mapping of S3 key (POSIX relative path, prefixed) to local path.
+
+    Raises:
+      NotADirectoryError: If ``root`` is not a directory.
+    """
+    if not root.is_dir():
+        raise NotADirectoryError(str(root))
+    prefix = f"{prefix.strip('/')}/" if prefix.strip("/") else ""
+    return {f"{prefix}{p.relative_to(root).as_posix()}": p for p in sorted(root.rglob("*")) if p.is_file()}
+
+
+def file_md5_sha256(file_path: Path, chunk_size: int = HASH_CHUNK_SIZE) -> tuple[str, bytes]:
+    """Compute the MD5 hex digest and raw SHA-256 digest in one read pass.
+
+    Args:
+      file_path: Path to the file to hash.
+      chunk_size: Number of bytes read per iteration.
+
+    Returns:
+      A tuple ``(md5_hex, sha256_digest)``.
+
+    Examples:
+      >>> import tempfile
+      >>> p = Path(tempfile.gettempdir()) / "hello.txt"
+      >>> _ = p.write_bytes(b"hello")
+      >>> md5, sha = file_md5_sha256(p)
+      >>> md5, sha.hex()[:6]
+      ('5d41402abc4b2a76b9719d911017c592', '2cf24d')
+    """
+    md5 = hashlib.md5(usedforsecurity=False)
+    sha = hashlib.sha256()
+    with file_path.open("rb") as f:
+        while chunk := f.read(chunk_size):
+            md5.update(chunk)
+            sha.update(chunk)
+    return md5.hexdigest(), sha.digest()
+
+
+def plan_sync(
+    local: dict[str, Path],
+    remote: dict[str, dict],
+    digests: dict[str, tuple[str, bytes]],
+    *,
+    delete: bool,
+    force: bool = False,
+) -> tuple[list[str], list[str], list[str]]:
+    """Diff local files against a bucket listing by content hash.
+
+    Args:
+      local: Mapping of key to local path (see ``local_files``).
+      remote: Mapping of key to ``{"size", "etag"}`` (see ``list_prefix``).
+      digests: Mapping of key to ``(md5_hex, sha256_digest)`` for local files.
+      delete: If True, plan deletion of remote keys missing locally.
+      force: If True, upload every local file regardless of the remote state.
+
+    Returns:
+      A tuple ``(uploads, deletes, unchanged)`` of sorted key lists.
+
+    Examples:
+      >>> local = {"a.html": Path("a.html"), "b.js": Path("b.js")}
+      >>> remote = {"a.html": {"size": 1, "etag": '"aa"'}, "old.js": {"size": 1, "etag": '"cc"'}}
+      >>> digests = {"a.html": ("aa", b""), "b.js": ("bb", b"")}
+      >>> plan_sync(local, remote, digests, delete=True)
+      (['b.js'], ['old.js'], ['a.html'])
+    """
+    uploads, unchanged = [], []
+    for key in sorted(local):
+        obj = remote.get(key)
+        if not force and obj is not None and obj["etag"].strip('"') == digests[key][0]:
+            unchanged.append(key)
+        else:
+            uploads.append(key)
+    deletes = sorted(set(remote) - set(local)) if delete else []
+    return uploads, deletes, unchanged
+
+
+def sidecar_base(key: str) -> str | None:
+    """Return the key a precompressed sidecar belongs to, or ``None``.
+
+    Examples:
+      >>> sidecar_base("index.html.br"), sidecar_base("index.html")
+      ('index.html', None)
+    """
+    for suffix in ENCODING_SUFFIXES.values():
+        if key.endswith(suffix):
+            return key[: -len(suffix)]
+    return None
+
+
+def delete_keys(s3, *, bucket: str, keys: list[str], jobs: int = SYNC_JOBS) -> list[dict]:
+    """Delete keys with ``DeleteObjects`` in batches of 1000, batches in parallel.
+
+    Args:
+      s3: A boto3 S3 client.
+      bucket: Bucket name.
+      keys: Keys to delete.
+      jobs: Number of batches sent concurrently.
+
+    Returns:
+      The per-key errors reported by S3 (empty when everything was deleted).
+    """
+    batches = [keys[i : i + DELETE_BATCH_SIZE] for i in range(0, len(keys), DELETE_BATCH_SIZE)]
+
+    def send(batch: list[str]) -> list[dict]:
+        resp = s3.delete_objects(Bucket=bucket, Delete={"Objects": [{"Key": k} for k in batch], "Quiet": True})
+        return resp.get("Errors", [])
+
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(batches)))) as pool:
+        return [err for errors in pool.map(send, batches) for err in errors]
+
+
+# -------- Core --------
+
+def sync(
+    *,
+    root: Path,
+    bucket: str,
+    prefix: str = "",
+    delete: bool = False,
+    dry_run: bool = False,
+    force: bool = False,
+    jobs: int = SYNC_JOBS,
+    cache_rules=CACHE_POLICIES["site"],
+    precompress: bool = False,
+) -> dict:
+    """Synchronize a local directory to a bucket by content hash.
+
+    Args:
+      root: Local directory to publish.
+      bucket: Target S3 bucket name.
+      prefix: Optional key prefix inside the bucket.
+      delete: If True, delete remote objects that no longer exist locally.
+      dry_run: If True, only report the plan (the bucket is still listed).
+      force: If True, re-upload every local file.
+      jobs: Number of concurrent hashing/upload/delete workers.
+      cache_rules: Cache-Control rule table matched against each file's path
+        relative to ``root`` (so rules do not depend on ``prefix``).
+      precompress: If True, publish Brotli/gzip sidecars for changed
+        text-like files and keep existing sidecars of local files.
+
+    Returns:
+      A JSON-serializable summary with the uploaded, deleted and unchanged
+      keys (``*_preview`` in dry-run mode).
+
+    Raises:
+      NotADirectoryError: If ``root`` is not a directory.
+      RuntimeError: If S3 reports per-key delete errors.
+      botocore.exceptions.ClientError: For S3 API errors.
+    """
+    local = local_files(root, prefix)
+    s3 = make_s3_client(jobs)
+    remote = list_prefix(s3, bucket=bucket, prefix=f"{prefix.strip('/')}/" if prefix.strip("/") else "")
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        digests = dict(zip(local, pool.map(file_md5_sha256, local.values())))
+
+    uploads, deletes, unchanged = plan_sync(local, remote, digests, delete=delete, force=force)
+    if precompress:
+        # Sidecars are derived from local files; they are not stale remote keys
+        deletes = [k for k in deletes if sidecar_base(k) not in local]
+
+    compressible = [k for k in uploads if precompress and is_compressible(content_type_for(local[k].name))]
+    variants = {}
+    if compressible and not dry_run:
+        # Max-level Brotli is CPU bound; spread it over processes
+        with ProcessPoolExecutor() as pool:
+            variants = dict(zip(compressible, pool.map(compress_variants, [local[k] for k in compressible])))
+        # Drop sidecars that are no longer worth keeping for re-uploaded files
+        deletes += [
+            k + suffix
+            for k in compressible
+            for enc, suffix in ENCODING_SUFFIXES.items()
+            if enc not in variants[k] and k + suffix in remote
+        ]
+
+    summary = {"bucket": bucket, "prefix": prefix, "unchanged_count": len(unchanged)}
+    if dry_run:
+        return {"dry_run": True, **summary, "uploaded_preview": uploads, "deleted_preview": deletes}
+
+    def put(key: str) -> None:
+        file_path = local[key]
+        sha = digests[key][1]
+        extra_args = {
+            "ContentType": content_type_for(file_path.name),
+            "CacheControl": cache_control_for(file_path.relative_to(root).as_posix(), cache_rules),
+            "ServerSideEncryption": "AES256",
+            "Metadata": {"content-hash": sha.hex()[:12]},
+        }
+        with file_path.open("rb") as body:
+            s3.put_object(
+                Bucket=bucket,
+                Key=key,
+                Body=body,
+                ContentLength=file_path.stat().st_size,
+                ChecksumSHA256=base64.b64encode(sha).decode("ascii"),
+                **extra_args,
+            )
+        if variants.get(key):
+            upload_encoded_variants(s3, bucket=bucket, key=key, variants=variants[key], extra_args=extra_args)
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        list(pool.map(put, uploads))
+
+    errors = delete_keys(s3, bucket=bucket, keys=deletes, jobs=jobs) if deletes else []
+    if errors:
+        raise RuntimeError(f"Failed to delete {len(errors)} object(s): {errors[:5]}")
+
+    return {
+        **summary,
+        "uploaded": uploads,
+        "deleted": deletes,
+        "encoded": sorted(k + ENCODING_SUFFIXES[enc] for k, found in variants.items() for enc in found),
+    }
+
+
+# -------- CLI --------
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments for the site sync CLI.
+
+    Returns:
+      An ``argparse.Namespace`` with ``dir``, ``bucket``, ``prefix``,
+      ``delete``, ``dry_run``, ``force``, ``jobs``, ``cache_policy`` and
+      ``precompress`` attributes.
+    """
+    p = argparse.ArgumentParser(description="Content-hash aware static site sync to S3")
+    p.add_argument("--dir", required=True, help="Local directory to publish (e.g., out)")
+    p.add_argument("--bucket", required=True, help="Target S3 bucket name")
+    p.add_argument("--prefix", default="", help="Optional key prefix inside the bucket")
+    p.add_argument("--delete", action="store_true", help="Delete remote objects that no longer exist locally")
+    p.add_argument("--dry-run", action="store_true", help="Print the plan without writing (still lists the bucket)")
+    p.add_argument("--force", action="store_true", help="Re-upload every file regardless of content hash")
+    p.add_argument("--jobs", type=int, default=SYNC_JOBS, help="Concurrent hashing/upload workers")
+    p.add_argument("--cache-policy", default=None, help="JSON file overriding the Cache-Control rule table")
+    p.add_argument("--precompress", action="store_true", help="Also upload .br/.gz sidecars for text-like files")
+    return p.parse_args()
+
+
+def main() -> int:
+    """CLI entry point.
+
+    Exit codes:
+      0: Success (synchronized or dry-run plan printed).
+      1: Generic error (e.g., directory not found, delete errors).
+      3: AWS client error (S3 API responded with an error).
+
+    Returns:
+      Process exit code: 0 on success, non-zero on failure.
+    """
+    try:
+        args = parse_args()
+        policies = load_cache_policies(Path(args.cache_policy)) if args.cache_policy else CACHE_POLICIES
+        result = sync(
+            root=Path(args.dir),
+            bucket=args.bucket,
+            prefix=args.prefix,
+            delete=args.delete,
+            dry_run=args.dry_run,
+            force=args.force,
+            jobs=args.jobs,
+            cache_rules=policies["site"],
+            precompress=args.precompress,
+        )
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+    except ClientError as e:
+        msg = e.response.get("Error", {})
+        print(json.dumps({"error": {"code": msg.get("Code"), "message": msg.get("Message")}}, ensure_ascii=False))
+        return 3
+    except Exception as e:
+        print(json.dumps({"error": str(e)}, ensure_ascii=False))
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
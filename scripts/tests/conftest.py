@@ -0,0 +1,59 @@
+"""Shared fixtures for the end-to-end tests of the deploy scripts.
+
+Every test runs against moto's in-process S3/STS emulator, so nothing reaches
+AWS. Install the pinned test dependencies and run from the repository root:
+
+  $ pip install -r scripts/requirements-test.txt
+  $ python -m pytest scripts/tests
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+# Set before the scripts are imported: fake credentials for moto, and a private
+# cache directory so runs never read or write ~/.cache/limitlab.
+os.environ.update(
+    AWS_ACCESS_KEY_ID="testing",
+    AWS_SECRET_ACCESS_KEY="testing",
+    AWS_SESSION_TOKEN="testing",
+    AWS_DEFAULT_REGION="ap-northeast-1",
+    XDG_CACHE_HOME=tempfile.mkdtemp(prefix="limitlab-tests-"),
+)
+os.environ.pop("LIMITLAB_ENV", None)
+
+from moto import mock_aws  # noqa: E402
+
+
+@pytest.fixture
+def s3():
+    """A boto3 S3 client backed by moto, valid for the duration of one test."""
+    with mock_aws():
+        import boto3
+
+        yield boto3.client("s3")
+
+
+def run_main(module, argv: list[str], capsys) -> tuple[int, dict]:
+    """Run a script's ``main()`` with ``argv`` and parse the JSON it prints."""
+    import json
+
+    saved = sys.argv
+    sys.argv = [module.__name__, *argv]
+    try:
+        code = module.main()
+    finally:
+        sys.argv = saved
+    return code, json.loads(capsys.readouterr().out)
+
+
+def keys(s3, bucket: str) -> list[str]:
+    """All keys in a bucket, sorted."""
+    pages = s3.get_paginator("list_objects_v2").paginate(Bucket=bucket)
+    return sorted(obj["Key"] for page in pages for obj in page.get("Contents", []))
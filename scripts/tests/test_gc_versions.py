@@ -0,0 +1,66 @@
+"""``gc_versions.py`` planning and ``--apply`` end to end against moto."""
+
+import gc_versions
+import promote_latest
+import upload_static
+from conftest import keys, run_main
+
+BUCKET = upload_static.ENV_CONFIG["dev"]["bucket"]
+MOTO_ACCOUNT = "123456789012"  # what moto's STS GetCallerIdentity returns
+
+
+def publish(s3, tmp_path, version_tag: str, text: str) -> dict:
+    """Publish one HTML version of ev/s/talk with precompressed sidecars."""
+    file_path = tmp_path / f"{version_tag}.html"
+    file_path.write_text(text * 500)
+    return upload_static.upload(
+        s3=s3,
+        bucket=BUCKET,
+        domain="cdn.example",
+        file_path=file_path,
+        event="ev",
+        type_code="s",
+        slug="talk",
+        version_tag=version_tag,
+        lang=None,
+        variant=None,
+        dry_run=False,
+        env="dev",
+        account_id=MOTO_ACCOUNT,
+        precompress=True,
+    )
+
+
+def test_gc_keeps_alias_targets_sidecars_and_retention(s3, tmp_path, capsys, monkeypatch):
+    # Let --apply verify the moto account as the dev environment
+    monkeypatch.setitem(upload_static.ENV_CONFIG["dev"], "account_id", MOTO_ACCOUNT)
+    s3.create_bucket(Bucket=BUCKET, CreateBucketConfiguration={"LocationConstraint": "ap-northeast-1"})
+    results = [publish(s3, tmp_path, f"v{i}", f"<p>version {i}</p>") for i in range(1, 5)]
+    v1, v2, v3, v4 = (r["key_versioned"] for r in results)
+    # Roll the alias back to the oldest version: it must survive any retention policy
+    promote_latest.promote(s3, bucket=BUCKET, event="ev", type_code="s", slug="talk", version_tag="v1")
+    before = keys(s3, BUCKET)
+    assert {v1, v1 + ".gz", v2 + ".gz", v3 + ".gz"} <= set(before)
+    db = ["--db", str(tmp_path / "inventory.sqlite3")]
+
+    # Plan-only by default
+    code, plan = run_main(gc_versions, [*db, "--keep-last", "1", "--keep-days", "0"], capsys)
+    assert code == 0 and plan["dry_run"] is True
+    assert plan["delete"] == sorted([v2, v2 + ".gz", v3, v3 + ".gz"])
+    assert keys(s3, BUCKET) == before
+
+    # Everything was just published, so keep_days protects every version
+    code, young = run_main(gc_versions, [*db, "--keep-last", "1", "--keep-days", "30", "--apply"], capsys)
+    assert code == 0 and young["delete"] == [] and young["kept"] == 4
+    assert keys(s3, BUCKET) == before
+
+    # keep_last=2 keeps v4 and v3, the alias target keeps v1
+    code, result = run_main(gc_versions, [*db, "--keep-last", "2", "--keep-days", "0", "--apply"], capsys)
+    assert code == 0 and result["dry_run"] is False and not result["errors"]
+    assert result["delete"] == [v2, v2 + ".gz"] and result["deleted_count"] == 2
+    remaining = set(keys(s3, BUCKET))
+    assert {v1, v1 + ".gz", v3, v3 + ".gz", v4, v4 + ".gz"} <= remaining
+    assert "ev/s/talk_latest.html" in remaining and "ev/s/talk_latest.html.gz" in remaining
+    assert not {v2, v2 + ".gz"} & remaining
+    head = s3.head_object(Bucket=BUCKET, Key="ev/s/talk_latest.html")
+    assert head["Metadata"]["points-to"] == v1
@@ -0,0 +1,62 @@
+"""``sync_site.py --delete`` end to end against moto."""
+
+from pathlib import Path
+
+import sync_site
+from conftest import keys, run_main
+
+BUCKET = "site-bucket"
+
+
+def write(root: Path, files: dict[str, str]) -> None:
+    for name, text in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+def test_delete_removes_only_keys_missing_locally(s3, tmp_path, capsys):
+    s3.create_bucket(Bucket=BUCKET, CreateBucketConfiguration={"LocationConstraint": "ap-northeast-1"})
+    out = tmp_path / "out"
+    write(out, {"index.html": "<p>v1</p>", "about/index.html": "<p>about</p>", "_next/static/a.js": "a()"})
+    code, first = run_main(sync_site, ["--dir", str(out), "--bucket", BUCKET, "--prefix", "site"], capsys)
+    assert code == 0 and len(first["uploaded"]) == 3
+    # Outside the synced prefix: never touched, even with --delete
+    s3.put_object(Bucket=BUCKET, Key="other/keep.txt", Body=b"keep")
+
+    # The new build drops about/ and a.js, changes index.html and adds b.js
+    (out / "about" / "index.html").unlink()
+    (out / "_next" / "static" / "a.js").unlink()
+    write(out, {"index.html": "<p>v2</p>", "_next/static/b.js": "b()"})
+    argv = ["--dir", str(out), "--bucket", BUCKET, "--prefix", "site", "--delete"]
+
+    code, preview = run_main(sync_site, [*argv, "--dry-run"], capsys)
+    assert code == 0
+    assert preview["deleted_preview"] == ["site/_next/static/a.js", "site/about/index.html"]
+    assert "site/about/index.html" in keys(s3, BUCKET)  # a dry-run deletes nothing
+
+    code, result = run_main(sync_site, argv, capsys)
+    assert code == 0
+    assert result["deleted"] == ["site/_next/static/a.js", "site/about/index.html"]
+    assert result["uploaded"] == ["site/_next/static/b.js", "site/index.html"]
+    assert keys(s3, BUCKET) == ["other/keep.txt", "site/_next/static/b.js", "site/index.html"]
+    body = s3.get_object(Bucket=BUCKET, Key="site/index.html")["Body"].read()
+    assert body == b"<p>v2</p>"
+
+
+def test_delete_keeps_sidecars_of_local_files_with_precompress(s3, tmp_path, capsys):
+    s3.create_bucket(Bucket=BUCKET, CreateBucketConfiguration={"LocationConstraint": "ap-northeast-1"})
+    out = tmp_path / "out"
+    write(out, {"index.html": "<p>hello</p>" * 500, "gone.html": "<p>bye</p>" * 500})
+    argv = ["--dir", str(out), "--bucket", BUCKET, "--delete", "--precompress"]
+    code, first = run_main(sync_site, argv, capsys)
+    assert code == 0 and "index.html.gz" in first["encoded"] and "gone.html.gz" in first["encoded"]
+
+    (out / "gone.html").unlink()
+    code, result = run_main(sync_site, argv, capsys)
+    assert code == 0
+    remaining = keys(s3, BUCKET)
+    assert "gone.html" not in remaining
+    assert "index.html" in remaining and "index.html.gz" in remaining
+    # The sidecar of the deleted page has no local file left and goes too
+    assert "gone.html.gz" in result["deleted"] and "gone.html.gz" not in remaining
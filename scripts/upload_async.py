@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Asyncio upload backend for high fan-out publishes.
+
+``upload_static.upload_batch`` runs one blocking boto3 call per thread, so
+the number of requests in flight is bounded by the thread count. For batches
+of many small objects (thumbnails, JSON, HTML) per-request latency dominates
+bandwidth, and keeping hundreds of requests in flight over one shared
+connection pool is far cheaper with asyncio.
+
+This module implements the same contract as ``upload_static.upload()``:
+  - Planning (validation, hashing, keys, headers) is shared through
+    ``plan_upload()``; results use ``preview_result()``/``upload_result()``
+    so the JSON output is identical to the threaded backend.
+  - The versioned object is written with ``PutObject`` (ChecksumSHA256,
+    SSE-S3) and the latest alias with a server-side ``CopyObject``. Alias
+    sidecars the new version lacks are removed with the same rules
+    (``stale_alias_sidecars()``), and reported in ``removed_encodings``.
+  - ``skip_existing`` uses one ``ListObjectsV2`` walk per ``{event}/{type}/``
+    prefix, exactly like the threaded batch.
+  - Files above the multipart threshold are delegated to the threaded
+    ``upload()`` (parallel multipart engine) via ``asyncio.to_thread``, on
+    one pooled boto3 client shared by the whole batch.
+
+Concurrency is bounded by a single semaphore and the client's connection
+pool is sized to match. Small bodies are read into memory, so a ``ByteBudget``
+caps the bytes held at once (``ASYNC_MAX_BYTES_IN_FLIGHT`` by default):
+memory stays flat however many entries are in flight. Delegated multipart
+uploads stream from disk and are not counted.
+
+Bandwidth shaping (``UploadScheduler``) and ``--dedup`` are threads-backend
+features; ``upload_static.py`` rejects them with ``--backend asyncio``.
+
+Dependencies:
+  - ``aiobotocore`` (``pip install aiobotocore``). It is imported lazily;
+    ``upload_static.py --backend asyncio`` fails with a clear error without it.
+"""
+
+import asyncio
+import base64
+import contextlib
+import hashlib
+from pathlib import Path
+from typing import Final
+
+from botocore.exceptions import ClientError
+
+from upload_static import (
+    CACHE_POLICIES,
+    ENCODING_SUFFIXES,
+    MULTIPART_MAX_WORKERS,
+    MULTIPART_PART_SIZE,
+    MULTIPART_THRESHOLD,
+    HashCache,
+    PhaseTimer,
+    UploadJournal,
+    batch_prefixes,
+    check_sidecar_delete,
+    entry_upload_kwargs,
+    error_result,
+    make_s3_client,
+    plan_upload,
+    preview_result,
+    response_retries,
+    sidecar_delete_request,
+    stale_alias_sidecars,
+    upload,
+    upload_result,
+)
+
+
+ASYNC_CONCURRENCY: Final = 128
+ASYNC_MAX_BYTES_IN_FLIGHT: Final = 256 * 1024 * 1024
+
+
+class ByteBudget:
+    """Cap the total size of small-object bodies held in memory at once.
+
+    A body larger than the whole budget still runs, alone.
+
+    Examples:
+      >>> async def demo():
+      ...     budget = ByteBudget(10)
+      ...     async with budget.reserve(6):
+      ...         waiter = asyncio.ensure_future(budget.reserve(6).__aenter__())
+      ...         await asyncio.sleep(0)
+      ...         blocked = not waiter.done()
+      ...     await waiter
+      ...     return blocked, budget.in_flight
+      >>> asyncio.run(demo())
+      (True, 6)
+    """
+
+    def __init__(self, limit: int = ASYNC_MAX_BYTES_IN_FLIGHT):
+        self.limit = max(1, limit)
+        self.in_flight = 0
+        self._cond = asyncio.Condition()
+
+    @contextlib.asynccontextmanager
+    async def reserve(self, nbytes: int):
+        """Wait until ``nbytes`` fit in the budget and hold them for the block."""
+        nbytes = min(nbytes, self.limit)
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight + nbytes <= self.limit)
+            self.in_flight += nbytes
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self.in_flight -= nbytes
+                self._cond.notify_all()
+
+
+def _body_bytes(file: str, multipart_threshold: int) -> int:
+    """Bytes an entry reads into memory; multipart uploads stream and count as 0."""
+    try:
+        size = Path(file).stat().st_size
+    except OSError:
+        return 0  # planning reports the missing file
+    return size if size <= multipart_threshold else 0
+
+
+def _load_aiobotocore():
+    """Import aiobotocore lazily so the threaded backend never needs it."""
+    try:
+        from aiobotocore.config import AioConfig
+        from aiobotocore.session import get_session
+    except ImportError as e:
+        raise RuntimeError("The asyncio backend requires aiobotocore (pip install aiobotocore).") from e
+    return get_session, AioConfig
+
+
+async def _head_or_none(s3, *, bucket: str, key: str) -> dict | None:
+    """Async ``HeadObject`` returning ``None`` for a missing key."""
+    try:
+        return await s3.head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+
+
+async def _list_prefix(s3, *, bucket: str, prefix: str) -> dict[str, dict]:
+    """Async counterpart of ``upload_static.list_prefix``."""
+    listing = {}
+    async for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            listing[obj["Key"]] = {"size": obj["Size"], "etag": obj["ETag"], "last_modified": obj["LastModified"]}
+    return listing
+
+
+async def _alias_points_to(s3, *, bucket: str, l_key: str, v_key: str, existing: dict) -> bool:
+    """Tell whether the latest alias already points at ``v_key`` (listing first, HEAD on doubt)."""
+    alias, target = existing.get(l_key), existing.get(v_key)
+    if alias is None:
+        return False
+    if target is not None and alias["etag"] == target["etag"]:
+        return True
+    head = await _head_or_none(s3, bucket=bucket, key=l_key)
+    return head is not None and head.get("Metadata", {}).get("points-to") == v_key
+
+
+async def _remove_stale_alias_sidecars(s3, *, plan: dict, existing: dict | None) -> list[str]:
+    """Async counterpart of ``upload_static.remove_stale_alias_sidecars``."""
+    timer = plan["timer"]
+    present, unknown = stale_alias_sidecars(plan, existing)
+    for enc in unknown:
+        with timer.phase("head_sidecar"):
+            if await _head_or_none(s3, bucket=plan["bucket"], key=plan["l_key"] + ENCODING_SUFFIXES[enc]):
+                present.append(enc)
+    if not present:
+        return []
+    with timer.phase("delete_sidecar") as rec:
+        resp = await s3.delete_objects(**sidecar_delete_request(plan["bucket"], plan["l_key"], present))
+        rec["retries"] = response_retries(resp)
+    check_sidecar_delete(resp)
+    return present
+
+
+async def upload_async(
+    s3,
+    *,
+    dry_run: bool,
+    part_size: int = MULTIPART_PART_SIZE,
+    max_workers: int = MULTIPART_MAX_WORKERS,
+    multipart_threshold: int = MULTIPART_THRESHOLD,
+    skip_existing: bool = False,
+    existing: dict | None = None,
+    hash_cache: HashCache | None = None,
+    cache_rules=CACHE_POLICIES["cdn"],
+    precompress: bool = False,
+    journal: UploadJournal | None = None,
+    multipart_s3=None,
+    **target,
+) -> dict:
+    """Upload one object with an aiobotocore client; same contract as ``upload()``.
+
+    Args:
+      s3: An aiobotocore S3 client.
+      dry_run: If True, return the preview without writing.
+      part_size: Multipart part size in bytes (delegated uploads only).
+      max_workers: Concurrent parts for delegated multipart uploads.
+      multipart_threshold: Files larger than this are delegated to ``upload()``.
+      skip_existing: If True, skip writes whose result is already in place.
+      existing: Prefetched listing of the target prefix (required with
+        ``skip_existing``).
+      hash_cache: Optional ``HashCache``.
+      cache_rules: Cache-Control rule table.
+      precompress: If True, also publish Brotli/gzip sidecars.
+      journal: Optional ``UploadJournal`` for delegated multipart uploads.
+      multipart_s3: boto3 S3 client for delegated multipart uploads; a new
+        client is created per file when omitted.
+      **target: Naming/target arguments of ``upload()`` (bucket, domain,
+        file_path, event, type_code, slug, version_tag, lang, variant, env,
+        account_id); see ``entry_upload_kwargs()``.
+
+    Returns:
+      The same dictionary ``upload()`` returns.
+
+    Raises:
+      botocore.exceptions.ClientError: For S3 API errors.
+    """
+    options = {
+        "part_size": part_size,
+        "multipart_threshold": multipart_threshold,
+        "hash_cache": hash_cache,
+        "cache_rules": cache_rules,
+        "precompress": precompress,
+    }
+    # Hashing is blocking file I/O; keep it off the event loop
+    plan = await asyncio.to_thread(plan_upload, **target, **options)
+    if dry_run:
+        return preview_result(plan)
+    if plan["multipart"]:
+        return await asyncio.to_thread(
+            upload,
+            **target,
+            **options,
+            dry_run=False,
+            max_workers=max_workers,
+            skip_existing=skip_existing,
+            existing=existing,
+            timer=plan["timer"],
+            journal=journal,
+            s3=multipart_s3,
+        )
+
+    bucket, v_key, l_key, variants = plan["bucket"], plan["v_key"], plan["l_key"], plan["variants"]
+    timer = plan["timer"]
+    listing = existing or {}
+    current = listing.get(v_key)
+    skip_versioned = skip_existing and current is not None and current["size"] == plan["size"]
+    with timer.phase("check_existing"):
+        skip_latest = skip_versioned and await _alias_points_to(
+            s3, bucket=bucket, l_key=l_key, v_key=v_key, existing=listing
+        )
+
+    if not skip_versioned:
+        body = await asyncio.to_thread(plan["file_path"].read_bytes)
+        with timer.phase("put_object", nbytes=plan["size"]) as rec:
+            resp = await s3.put_object(
+                Bucket=bucket, Key=v_key, Body=body, ChecksumSHA256=plan["checksum_b64"], **plan["v_args"]
+            )
+            rec["retries"] = response_retries(resp)
+    for enc, body in sorted(variants.items()):
+        sidecar = v_key + ENCODING_SUFFIXES[enc]
+        if skip_versioned and sidecar in listing:
+            continue
+        with timer.phase("put_sidecar", nbytes=len(body)) as rec:
+            resp = await s3.put_object(
+                Bucket=bucket,
+                Key=sidecar,
+                Body=body,
+                ContentEncoding=enc,
+                ChecksumSHA256=base64.b64encode(hashlib.sha256(body).digest()).decode("ascii"),
+                **plan["v_args"],
+            )
+            rec["retries"] = response_retries(resp)
+
+    async def copy(src: str, dst: str, phase: str, nbytes: int, encoding: dict) -> None:
+        with timer.phase(phase, nbytes=nbytes) as rec:
+            resp = await s3.copy_object(
+                Bucket=bucket,
+                Key=dst,
+                CopySource={"Bucket": bucket, "Key": src},
+                MetadataDirective="REPLACE",
+                **encoding,
+                **plan["l_args"],
+            )
+            rec["retries"] = response_retries(resp)
+
+    if not skip_latest:
+        copies = [(v_key, l_key, "copy_object", plan["size"], {})] + [
+            (
+                v_key + ENCODING_SUFFIXES[enc],
+                l_key + ENCODING_SUFFIXES[enc],
+                "copy_sidecar",
+                len(variants[enc]),
+                {"ContentEncoding": enc},
+            )
+            for enc in sorted(variants)
+        ]
+        await asyncio.gather(*(copy(*c) for c in copies))
+        removed = await _remove_stale_alias_sidecars(s3, plan=plan, existing=existing)
+    else:
+        removed = []
+
+    return upload_result(plan, skipped_versioned=skip_versioned, skipped_latest=skip_latest, removed_encodings=removed)
+
+
+async def upload_batch_async(
+    entries: list[dict],
+    *,
+    env_info: dict,
+    dry_run: bool,
+    defaults: dict | None = None,
+    concurrency: int = ASYNC_CONCURRENCY,
+    part_size: int = MULTIPART_PART_SIZE,
+    max_workers: int = MULTIPART_MAX_WORKERS,
+    multipart_threshold: int = MULTIPART_THRESHOLD,
+    skip_existing: bool = False,
+    hash_cache: HashCache | None = None,
+    cache_rules=CACHE_POLICIES["cdn"],
+    precompress: bool = False,
+    timer: PhaseTimer | None = None,
+    journal: UploadJournal | None = None,
+    max_bytes_in_flight: int = ASYNC_MAX_BYTES_IN_FLIGHT,
+) -> list[dict]:
+    """Asyncio counterpart of ``upload_static.upload_batch``.
+
+    Args:
+      entries: Entry dictionaries (see ``upload_static.load_manifest``).
+      env_info: Result of ``resolve_env_targets()``.
+      dry_run: If True, only previews are produced (no client is created).
+      defaults: Field values applied to entries that do not set them.
+      concurrency: Maximum number of entries in flight.
+      part_size: Multipart part size in bytes.
+      max_workers: Concurrent part uploads per delegated multipart entry.
+      multipart_threshold: Files larger than this are delegated to ``upload()``.
+      skip_existing: If True, list each prefix once and skip published entries.
+      hash_cache: Optional ``HashCache`` shared by all tasks.
+      cache_rules: Cache-Control rule table applied to every entry.
+      precompress: If True, publish Brotli/gzip sidecars for text-like entries.
+      timer: Optional ``PhaseTimer`` for run-level work (prefix listings).
+      journal: Optional ``UploadJournal`` for delegated multipart uploads.
+      max_bytes_in_flight: Cap on the bodies of small entries held in memory.
+
+    Returns:
+      One result per entry, in input order, shaped like ``upload_batch()``.
+    """
+    timer = timer or PhaseTimer()
+    defaults = {k: v for k, v in (defaults or {}).items() if v is not None}
+    entries = [{**defaults, **entry} for entry in entries]
+    options = {
+        "dry_run": dry_run,
+        "part_size": part_size,
+        "max_workers": max_workers,
+        "multipart_threshold": multipart_threshold,
+        "skip_existing": skip_existing,
+        "hash_cache": hash_cache,
+        "cache_rules": cache_rules,
+        "precompress": precompress,
+        "journal": journal,
+    }
+    sem = asyncio.Semaphore(max(1, concurrency))
+    budget = ByteBudget(max_bytes_in_flight)
+
+    async def run(s3, e: dict, existing: dict | None) -> dict:
+        nbytes = 0 if dry_run else _body_bytes(e["file"], multipart_threshold)
+        async with sem, budget.reserve(nbytes):
+            try:
+                return await upload_async(s3, **entry_upload_kwargs(e, env_info), existing=existing, **options)
+            except Exception as exc:
+                return error_result(e["file"], exc)
+
+    if dry_run:
+        return list(await asyncio.gather(*(run(None, e, None) for e in entries)))
+
+    # Delegated multipart uploads share one pooled client; asyncio.to_thread
+    # runs at most 32 of them at once (the default executor's ceiling)
+    options["multipart_s3"] = make_s3_client(max_workers * min(concurrency, 32))
+    get_session, AioConfig = _load_aiobotocore()
+    config = AioConfig(max_pool_connections=max(10, concurrency))
+    async with get_session().create_client("s3", config=config) as s3:
+        existing = None
+        if skip_existing:
+            existing = {}
+            with timer.phase("list_objects_v2"):
+                listings = await asyncio.gather(
+                    *(_list_prefix(s3, bucket=env_info["bucket"], prefix=prefix) for prefix in batch_prefixes(entries))
+                )
+            for listing in listings:
+                existing.update(listing)
+        return list(await asyncio.gather(*(run(s3, e, existing) for e in entries)))
@@ -25,6 +25,12 @@ Environment auto-detection:
         - domain:     cdn.dev.limitlab.xyz
 
   - If the account is not recognized, the program fails fast with a clear error.
+  - The result is cached per credential identity (access key fingerprint and
+    expiry) in ``~/.cache/limitlab/env_targets.json`` for up to 12 hours, so
+    repeated runs skip the STS round trip. ``--no-env-cache`` forces a lookup.
+  - ``LIMITLAB_ENV=prod|dev`` selects the environment without any AWS call
+    for ``--dry-run`` only. A run that writes still verifies the account
+    (cache or STS) and fails if it does not match ``LIMITLAB_ENV``.
 
 URL design implemented:
 
@@ -47,19 +53,43 @@ Fields:
   - variant (optional): Variant suffix like resolution/format (normalized to "-{token}", e.g., "-w1200").
   - ext:   File extension inferred from the source filename.
 
-Caching policy (fixed best-practice defaults):
+Caching policy (rule table ``CACHE_POLICIES``, first matching glob wins):
   - Versioned object: "public, max-age=31536000, immutable"
   - Latest alias:     "public, max-age=300"
+  The same table holds the "site" profile used by ``sync_site.py``
+  (content-hashed ``_next/static/`` assets immutable, HTML revalidated).
+  ``--cache-policy FILE`` replaces the rules with a JSON file of the form
+  ``{"cdn": [["glob", "cache-control"], ...], "site": [...]}``.
 
 Security and integrity:
   - Server-side encryption: SSE-S3 (AES256)
   - Integrity: S3 ChecksumSHA256 (base64-encoded SHA-256)
+  - Files above the multipart threshold (64 MiB by default) are uploaded as
+    parallel multipart uploads with a ChecksumSHA256 on every part; S3 then
+    reports a composite checksum (SHA-256 over the part digests).
+  - With ``--dedup``, a bucket-side index (``_private/dedup/sha256.json.gz``,
+    a prefix the bucket policy never lets CloudFront serve) maps
+    full SHA-256 digests to published keys; content already in the bucket
+    under another event or slug is copied server-side instead of re-sent.
+    The index is updated with conditional writes, so concurrent publishers
+    merge instead of overwriting each other.
+  - Every PUT, part upload and copy passes through one scheduler: an optional
+    bytes-per-second cap (``--max-bandwidth-mb``, applied to request bodies
+    as they are sent) and an in-flight limit that
+    grows while throughput improves and halves on SlowDown/5xx responses
+    (``--no-adaptive`` disables it).
+  - With ``--resumable``, multipart uploads are journaled per part in
+    ``~/.cache/limitlab/upload_journal.sqlite3`` (keyed by the content
+    SHA-256); a rerun after a network failure sends only the missing parts.
+    Uploads abandoned for more than 7 days are aborted on the next run.
 
 AWS region and credentials:
   - No --region option. boto3 uses the default provider chain (env vars, AWS
     config/credentials files, SSO/IMDS/ECS, etc.).
-  - Dry-run mode performs **no S3 writes**, but *does* call STS to detect the
-    environment (read-only).
+  - Dry-run mode performs **no S3 writes**, but calls STS to detect the
+    environment (read-only) unless the result is cached or ``LIMITLAB_ENV``
+    is set. Without ``--dry-run``, ``LIMITLAB_ENV`` is checked against the
+    account instead of replacing the lookup.
 
 Examples:
   Upload to the environment determined by current AWS credentials:
@@ -71,7 +101,7 @@ Examples:
         --version-tag v2025-10-19 \\
         --lang ja
 
-  Dry-run (no upload; show keys/URLs/headers; still queries STS):
+  Dry-run (no upload; show keys/URLs/headers; fully offline with LIMITLAB_ENV):
     $ python upload_static.py \\
         --file ./slides/iccv2025-opening-ja.pdf \\
         --event iccv2025 \\
@@ -81,24 +111,452 @@ Examples:
         --lang ja \\
         --dry-run
 
+  Batch upload (one STS call, one pooled S3 client, entries in parallel):
+    $ python upload_static.py \\
+        --manifest ./iccv2025/manifest.csv \\
+        --event iccv2025 \\
+        --type s \\
+        --version-tag v2025-10-19
+
+    The manifest (.json, .yaml or .csv) lists ``file`` plus any of ``event``,
+    ``type``, ``slug``, ``version_tag``, ``lang`` and ``variant``; CLI flags
+    fill in fields an entry omits. ``--dir DIR`` uploads every file in DIR
+    using the file stem as slug. Batch mode prints a JSON array of results.
+    ``--preflight`` first checks every name against the URL design and looks
+    for entries sharing a latest alias or keys colliding by letter case
+    (``preflight.py``), and uploads nothing if it finds a problem.
+
 Notes:
   - The S3 bucket is assumed to be configured as a CloudFront origin behind an
     OAC (Origin Access Control). This script never sets object ACLs.
+  - File digests are cached in ``~/.cache/limitlab/upload_static_hashes.sqlite3``
+    keyed on (path, size, mtime_ns, inode), so unchanged files are not
+    re-hashed on later runs. Use ``--no-hash-cache`` to always re-hash.
   - Overwriting the "latest" key is expected and safe with the short cache TTL.
+    ``--invalidate`` additionally sends the overwritten aliases to CloudFront
+    as one deduplicated invalidation for the run (``--invalidate-wait N``
+    polls up to N seconds for completion), so live talks see new slides
+    immediately without shortening the TTL. Set
+    ``LIMITLAB_{PROD,DEV}_CDN_DISTRIBUTION_ID`` from the terraform output
+    ``cdn_cloudfront_distribution_id``; otherwise the distribution is looked
+    up by domain, which needs ``cloudfront:ListDistributions``.
+  - Every result reports ``timings`` per phase (hashing, each S3 call type,
+    STS, listings): call count, wall time, bytes, MB/s and botocore retries.
+    ``--metrics-file FILE`` also writes them as JSON lines (appended) or, with
+    ``--metrics-format openmetrics``, as an OpenMetrics text file.
+  - boto3/botocore are imported only when a network call is made. Naming,
+    validation and hashing helpers (``build_filename``, ``build_key``,
+    ``norm_suffix``, ``validate_inputs``, ``sha256_file``) and dry-runs with
+    ``LIMITLAB_ENV`` work without the AWS SDK installed.
   - The tool is designed for CI/CD pipelines where repeatable, low-variance
     behavior is preferred over configurability.
 """
 
 import argparse
 import base64
+import csv
+import fnmatch
+import gzip
 import hashlib
+import io
 import json
 import mimetypes
+import os
+import sqlite3
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Final
 
-import boto3
-from botocore.exceptions import ClientError
+
+# -------- AWS SDK (loaded on first use) --------
+
+def _boto3():
+    """Import boto3 on first use.
+
+    Validation, naming, hashing and ``LIMITLAB_ENV`` dry-runs never touch the
+    network, so they run without paying the SDK import (hundreds of ms and
+    tens of MB); pre-commit and lint steps start in milliseconds.
+    """
+    import boto3
+
+    return boto3
+
+
+def is_client_error(e: BaseException) -> bool:
+    """Tell whether ``e`` is a botocore ``ClientError`` without importing botocore.
+
+    If botocore was never imported, no call could have raised one.
+
+    Examples:
+      >>> is_client_error(ValueError("x"))
+      False
+    """
+    exceptions = sys.modules.get("botocore.exceptions")
+    return exceptions is not None and isinstance(e, exceptions.ClientError)
+
+
+# -------- Instrumentation --------
+
+class PhaseTimer:
+    """Thread-safe accumulator of wall time, bytes and retries per named phase.
+
+    Every S3 call, hash pass and STS lookup of an upload runs inside
+    ``phase()``; the totals end up in the result JSON (``timings``) and,
+    optionally, in a metrics file (see ``write_metrics()``), so a slow
+    publish can be explained from the logs alone.
+
+    Examples:
+      >>> t = PhaseTimer()
+      >>> with t.phase("put_object", nbytes=2 * 1024 * 1024) as rec:
+      ...     rec["retries"] = 1
+      >>> d = t.as_dict()["put_object"]
+      >>> d["count"], d["bytes"], d["retries"]
+      (1, 2097152, 1)
+    """
+
+    def __init__(self) -> None:
+        self.phases: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str, nbytes: int = 0):
+        """Time a block; the yielded dict accepts a ``retries`` count."""
+        rec = {"retries": 0}
+        start = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            self.add(name, time.perf_counter() - start, nbytes=nbytes, retries=rec["retries"])
+
+    def add(self, name: str, seconds: float, *, nbytes: int = 0, retries: int = 0, count: int = 1) -> None:
+        """Add one (or ``count``) observations to a phase."""
+        with self._lock:
+            p = self.phases.setdefault(name, {"count": 0, "seconds": 0.0, "bytes": 0, "retries": 0})
+            p["count"] += count
+            p["seconds"] += seconds
+            p["bytes"] += nbytes
+            p["retries"] += retries
+
+    def merge(self, other: "PhaseTimer") -> None:
+        """Fold the phases of another timer into this one."""
+        for name, p in other.phases.items():
+            self.add(name, p["seconds"], nbytes=p["bytes"], retries=p["retries"], count=p["count"])
+
+    def as_dict(self) -> dict[str, dict]:
+        """Render phases with rounded seconds and MB/s (``None`` for byte-less phases)."""
+        with self._lock:
+            return {
+                name: {
+                    "count": p["count"],
+                    "seconds": round(p["seconds"], 6),
+                    "bytes": p["bytes"],
+                    "mb_per_s": round(p["bytes"] / MIB / p["seconds"], 3) if p["bytes"] and p["seconds"] else None,
+                    "retries": p["retries"],
+                }
+                for name, p in sorted(self.phases.items())
+            }
+
+
+def response_retries(resp: dict | None) -> int:
+    """Return how many times botocore retried the call that produced ``resp``.
+
+    Examples:
+      >>> response_retries({"ResponseMetadata": {"RetryAttempts": 2}}), response_retries(None)
+      (2, 0)
+    """
+    return (resp or {}).get("ResponseMetadata", {}).get("RetryAttempts", 0)
+
+
+def metrics_scopes(run_timer: PhaseTimer, results: list[dict]) -> dict[str, dict]:
+    """Group run-level and per-object timings for ``write_metrics()``.
+
+    Examples:
+      >>> sorted(metrics_scopes(PhaseTimer(), [{"key_versioned": "e/s/a.pdf", "timings": {}}, {"error": "x"}]))
+      ['e/s/a.pdf', 'run']
+    """
+    scopes = {"run": run_timer.as_dict()}
+    for r in results:
+        if "timings" in r:
+            scopes[r.get("key_versioned") or r.get("key_versioned_preview")] = r["timings"]
+    return scopes
+
+
+def write_metrics(path: Path, scopes: dict[str, dict], fmt: str = "jsonl") -> None:
+    """Append phase timings to a JSON-lines file or write them as OpenMetrics text.
+
+    Args:
+      path: Output file.
+      scopes: Mapping of scope (``"run"`` or an object key) to
+        ``PhaseTimer.as_dict()`` output.
+      fmt: ``"jsonl"`` (one record per scope and phase, appended) or
+        ``"openmetrics"`` (file replaced with counters labeled by phase and
+        scope).
+    """
+    if fmt == "jsonl":
+        now = time.time()
+        with path.open("a", encoding="utf-8") as f:
+            for scope, phases in scopes.items():
+                for name, p in phases.items():
+                    f.write(json.dumps({"ts": now, "scope": scope, "phase": name, **p}, ensure_ascii=False) + "\n")
+        return
+    if fmt != "openmetrics":
+        raise ValueError(f"Unknown metrics format: {fmt}")
+
+    metrics = (
+        ("calls", "count", None, "S3/STS calls or passes per phase"),
+        ("duration_seconds", "seconds", "seconds", "Wall time spent per phase"),
+        ("bytes", "bytes", "bytes", "Bytes processed per phase"),
+        ("retries", "retries", None, "botocore retry attempts per phase"),
+    )
+    lines = []
+    for metric, field, unit, help_text in metrics:
+        name = f"upload_static_phase_{metric}"
+        lines += [f"# TYPE {name} counter", f"# HELP {name} {help_text}."]
+        lines += [f"# UNIT {name} {unit}"] if unit else []
+        for scope, phases in scopes.items():
+            for phase, p in phases.items():
+                scope_label = scope.replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(f'{name}_total{{phase="{phase}",scope="{scope_label}"}} {p[field]}')
+    path.write_text("\n".join(lines) + "\n# EOF\n", encoding="utf-8")
+
+
+# -------- Scheduling (bandwidth and concurrency) --------
+
+# Error codes S3 uses to ask clients to slow down
+THROTTLE_CODES: Final = frozenset(
+    {"SlowDown", "Throttling", "ThrottlingException", "RequestLimitExceeded", "RequestTimeout", "ServiceUnavailable"}
+)
+ADAPTIVE_INITIAL_CONCURRENCY: Final = 4
+ADAPTIVE_COOLDOWN: Final = 2.0  # seconds between two back-offs, so one burst halves the limit once
+THROTTLE_CHUNK: Final = 64 * 1024  # largest body read paid for at once; http.client sends 8-16 KiB blocks
+
+
+def is_throttle_error(e: BaseException) -> bool:
+    """Tell whether ``e`` is an S3 throttling or server-side (5xx) error.
+
+    Examples:
+      >>> is_throttle_error(ValueError("x"))
+      False
+    """
+    if not is_client_error(e):
+        return False
+    status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode") or 0
+    return e.response.get("Error", {}).get("Code") in THROTTLE_CODES or status >= 500
+
+
+class TokenBucket:
+    """Thread-safe bytes-per-second limiter shared by every upload of a run.
+
+    ``acquire(n)`` reserves ``n`` bytes and sleeps until the reservation is
+    covered, so the long-run rate never exceeds ``rate``. Request bodies draw
+    from it chunk by chunk through ``ThrottledReader``, so the cap holds on
+    the wire and not only on average.
+
+    Examples:
+      >>> b = TokenBucket(rate=1000, burst=1000)
+      >>> b.acquire(1000)
+      0.0
+      >>> 0.4 < b.acquire(500) <= 0.5
+      True
+    """
+
+    def __init__(self, rate: float, burst: float | None = None) -> None:
+        if rate <= 0:
+            raise ValueError("Rate must be positive.")
+        self.rate = rate
+        self.burst = burst or rate
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n: int) -> float:
+        """Reserve ``n`` bytes, sleeping as needed; return the seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= n
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class ThrottledReader:
+    """Read-only file wrapper that pays for every chunk it returns from a ``TokenBucket``.
+
+    botocore sends a file-like body by reading it in small blocks, so the
+    body leaves the host at the bucket's rate instead of at line rate after
+    one up-front reservation. ``seek``/``tell`` pass through, so botocore can
+    size the body and rewind it for retries.
+
+    Examples:
+      >>> waits = []
+      >>> r = ThrottledReader(io.BytesIO(b"abcdef"), TokenBucket(rate=1e9), on_wait=waits.append)
+      >>> r.read(4), r.read(), r.tell(), len(waits)
+      (b'abcd', b'ef', 6, 2)
+      >>> r.seek(0), r.read(1)
+      (0, b'a')
+    """
+
+    def __init__(self, raw, bucket: TokenBucket, on_wait=None) -> None:
+        self._raw = raw
+        self._bucket = bucket
+        self._on_wait = on_wait
+
+    def read(self, size: int = -1) -> bytes:
+        """Read like ``raw.read`` and wait for the bytes' share of the bandwidth."""
+        if size is None or size < 0:
+            chunks = []
+            while chunk := self.read(THROTTLE_CHUNK):
+                chunks.append(chunk)
+            return b"".join(chunks)
+        data = self._raw.read(min(size, THROTTLE_CHUNK))
+        if data:
+            waited = self._bucket.acquire(len(data))
+            if self._on_wait:
+                self._on_wait(waited)
+        return data
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._raw.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._raw.tell()
+
+
+class UploadScheduler:
+    """Gate S3 write requests with a bandwidth cap and an adaptive concurrency limit.
+
+    Every data-carrying request (PUT, part upload, server-side copy) runs
+    inside ``slot()``, and uploaded bodies go through ``throttle()``, which
+    paces them against the shared bandwidth cap while they are sent. The
+    in-flight limit follows additive-increase / multiplicative-decrease:
+
+      - Once per round (as many completions as the current limit), the
+        throughput of the round is compared with the previous one; the limit
+        grows by one while throughput improves by more than 5%.
+      - A throttling or 5xx error, or a response botocore only obtained after
+        retrying, halves the limit (at most once per ``ADAPTIVE_COOLDOWN``).
+
+    The limit never exceeds ``max_concurrency`` (the thread pools are sized to
+    it), so the scheduler only decides how much of that capacity is used.
+
+    Examples:
+      >>> s = UploadScheduler(max_concurrency=8)
+      >>> with s.slot(1024) as outcome:
+      ...     outcome["retries"] = 0
+      >>> s.as_dict()["requests"], s.as_dict()["limit"]
+      (1, 4)
+      >>> with s.slot() as outcome:
+      ...     outcome["retries"] = 2
+      >>> s.as_dict()["limit"], s.as_dict()["throttled"]
+      (2, 1)
+      >>> s.throttle(b"data")
+      b'data'
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int | None = None,
+        bytes_per_second: float | None = None,
+        adaptive: bool = True,
+        initial_concurrency: int = ADAPTIVE_INITIAL_CONCURRENCY,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.adaptive = adaptive and max_concurrency is not None
+        self.limit = min(initial_concurrency, max_concurrency) if self.adaptive else max_concurrency
+        self._bucket = TokenBucket(bytes_per_second) if bytes_per_second else None
+        self._cond = threading.Condition()
+        self._active = 0
+        self._round_start = time.monotonic()
+        self._round_bytes = self._round_done = 0
+        self._last_rate = 0.0
+        self._cooldown_until = 0.0
+        self._stats = {"requests": 0, "throttled": 0, "peak_limit": self.limit, "bandwidth_wait_seconds": 0.0}
+
+    @contextmanager
+    def slot(self, nbytes: int = 0):
+        """Wait for a free request slot, then run the request.
+
+        Args:
+          nbytes: Body size, counted towards the throughput of the round.
+
+        Yields:
+          A dict whose ``"retries"`` the caller sets from the response
+          (``response_retries()``); retried responses count as throttling.
+        """
+        with self._cond:
+            while self.limit is not None and self._active >= self.limit:
+                self._cond.wait()
+            self._active += 1
+        outcome = {"retries": 0}
+        try:
+            yield outcome
+        except BaseException as e:
+            self._release(0, throttled=is_throttle_error(e))
+            raise
+        self._release(nbytes, throttled=outcome["retries"] > 0)
+
+    def throttle(self, body):
+        """Wrap a request body (bytes or binary file) so it is sent within the bandwidth cap.
+
+        Returns ``body`` unchanged when no cap is set.
+        """
+        if not self._bucket:
+            return body
+        if isinstance(body, (bytes, bytearray)):
+            body = io.BytesIO(body)
+        return ThrottledReader(body, self._bucket, on_wait=self._add_wait)
+
+    def _add_wait(self, waited: float) -> None:
+        if waited:
+            with self._cond:
+                self._stats["bandwidth_wait_seconds"] += waited
+
+    def _release(self, nbytes: int, *, throttled: bool) -> None:
+        """Free a slot and adapt the limit to the outcome of the request."""
+        with self._cond:
+            self._active -= 1
+            self._stats["requests"] += 1
+            now = time.monotonic()
+            if throttled:
+                self._stats["throttled"] += 1
+                if self.adaptive and now >= self._cooldown_until:
+                    self.limit = max(1, self.limit // 2)
+                    self._cooldown_until = now + ADAPTIVE_COOLDOWN
+                    self._start_round(now, rate=0.0)
+            elif self.adaptive:
+                self._round_bytes += nbytes
+                self._round_done += 1
+                if self._round_done >= self.limit:
+                    # Byte rate for data rounds, request rate for copy-only rounds
+                    rate = (self._round_bytes or self._round_done) / max(now - self._round_start, 1e-6)
+                    improved = rate > self._last_rate * 1.05 and now >= self._cooldown_until
+                    if improved and self.limit < self.max_concurrency:
+                        self.limit += 1
+                        self._stats["peak_limit"] = max(self._stats["peak_limit"], self.limit)
+                    self._start_round(now, rate=rate)
+            self._cond.notify_all()
+
+    def _start_round(self, now: float, *, rate: float) -> None:
+        """Begin a new measurement round (caller holds the lock)."""
+        self._round_start, self._round_bytes, self._round_done, self._last_rate = now, 0, 0, rate
+
+    def as_dict(self) -> dict:
+        """Summarize the run: final and peak limit, requests, throttling, bandwidth waits."""
+        with self._cond:
+            return {
+                "limit": self.limit,
+                **self._stats,
+                "bandwidth_wait_seconds": round(self._stats["bandwidth_wait_seconds"], 6),
+            }
 
 
 # -------- Environment mapping (account -> bucket/domain) --------
@@ -108,16 +566,105 @@ ENV_CONFIG: Final = {
         "account_id": "664418960222",
         "bucket": "prod-limitlab-webpage-cdn-cloudfront-origin",
         "domain": "cdn.limitlab.xyz",
+        # `terraform -chdir=terraform/prod output -raw cdn_cloudfront_distribution_id`;
+        # unset = look up by domain (needs cloudfront:ListDistributions)
+        "distribution_id": os.environ.get("LIMITLAB_PROD_CDN_DISTRIBUTION_ID") or None,
     },
     "dev": {
         "account_id": "022731370203",
         "bucket": "dev-limitlab-webpage-cdn-cloudfront-origin",
         "domain": "cdn.dev.limitlab.xyz",
+        # `terraform -chdir=terraform/dev output -raw cdn_cloudfront_distribution_id`
+        "distribution_id": os.environ.get("LIMITLAB_DEV_CDN_DISTRIBUTION_ID") or None,
     },
 }
 
 
-def resolve_env_targets() -> dict:
+CACHE_DIR: Final = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "limitlab"
+ENV_CACHE_PATH: Final = CACHE_DIR / "env_targets.json"
+ENV_CACHE_TTL: Final = 12 * 3600  # seconds; also capped by the credential expiry
+ENV_OVERRIDE_VAR: Final = "LIMITLAB_ENV"  # "prod" or "dev": skip STS on dry-runs, assert the env otherwise
+
+
+def env_targets_for(env: str, account_id: str) -> dict:
+    """Build the environment targets dictionary for a known environment.
+
+    Examples:
+      >>> env_targets_for("dev", "022731370203")["bucket"]
+      'dev-limitlab-webpage-cdn-cloudfront-origin'
+    """
+    cfg = ENV_CONFIG[env]
+    return {
+        "env": env,
+        "account_id": account_id,
+        "bucket": cfg["bucket"],
+        "domain": cfg["domain"],
+        "distribution_id": cfg.get("distribution_id"),
+    }
+
+
+def credential_identity() -> tuple[str, float | None] | None:
+    """Identify the active credentials without a network call.
+
+    Returns:
+      ``(fingerprint, expiry_epoch)`` where the fingerprint is a SHA-256 of
+      the access key id (the key itself is never stored) and the expiry is
+      ``None`` for static credentials; ``None`` if no credentials are found.
+    """
+    creds = _boto3().Session().get_credentials()
+    if creds is None:
+        return None
+    access_key = creds.get_frozen_credentials().access_key
+    expiry = getattr(creds, "_expiry_time", None)  # RefreshableCredentials (SSO, assumed roles, IMDS)
+    return hashlib.sha256(access_key.encode()).hexdigest(), expiry.timestamp() if expiry else None
+
+
+def _read_env_cache(path: Path) -> dict:
+    """Load the env cache, keeping only well-formed entries; an unreadable or malformed file is a miss.
+
+    Examples:
+      >>> import tempfile
+      >>> p = Path(tempfile.mkdtemp()) / "env.json"
+      >>> _ = p.write_text('{"a": {"env": "dev", "account_id": "1", "expires": 9}, "b": {"env": "dev"}, "c": 1}')
+      >>> list(_read_env_cache(p))
+      ['a']
+      >>> _ = p.write_text("[1, 2]")
+      >>> _read_env_cache(p)
+      {}
+    """
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {
+        fingerprint: entry
+        for fingerprint, entry in data.items()
+        if isinstance(entry, dict)
+        and isinstance(entry.get("expires"), (int, float))
+        and isinstance(entry.get("env"), str)
+        and isinstance(entry.get("account_id"), str)
+    }
+
+
+def _write_env_cache(path: Path, cache: dict) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(cache), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        pass  # caching is best effort
+
+
+def resolve_env_targets(
+    timer: PhaseTimer | None = None,
+    *,
+    dry_run: bool = False,
+    cache_path: Path | None = ENV_CACHE_PATH,
+    ttl: float = ENV_CACHE_TTL,
+) -> dict:
     """Resolve environment targets (env, bucket, domain) from the current AWS account.
 
     This function calls STS ``GetCallerIdentity`` to obtain the AWS account ID
@@ -125,32 +672,83 @@ def resolve_env_targets() -> dict:
     The mapping determines the S3 bucket (CloudFront origin) and the public
     CloudFront domain.
 
+    Resolution order:
+      1) With ``dry_run``, ``LIMITLAB_ENV=prod|dev`` selects the environment
+         without any AWS call (offline dry-runs); ``account_id`` is taken
+         from ``ENV_CONFIG``.
+      2) A cached result for the same credential identity (access key
+         fingerprint + expiry), valid for ``ttl`` seconds and never beyond
+         the credential expiry.
+      3) STS ``GetCallerIdentity``; the result is cached.
+    Without ``dry_run``, a set ``LIMITLAB_ENV`` must match the account
+    resolved by 2) or 3), so a run that writes never trusts the variable alone.
+
+    Args:
+      timer: Optional ``PhaseTimer`` that records the STS call
+        (phase ``sts_get_caller_identity``).
+      dry_run: True when the caller will not write to the bucket; only then
+        is ``LIMITLAB_ENV`` honored without checking the credentials.
+      cache_path: JSON cache file; ``None`` disables the cache.
+      ttl: Cache lifetime in seconds.
+
     Returns:
       A dictionary with keys:
         - env (str): 'prod' or 'dev'.
         - account_id (str): The AWS account ID reported by STS.
         - bucket (str): Canonical S3 bucket name for the environment.
         - domain (str): Public CloudFront domain for the environment.
+        - distribution_id (str | None): CloudFront distribution serving the
+          domain, if pinned in ``ENV_CONFIG`` (see ``resolve_distribution_id()``).
 
     Raises:
       botocore.exceptions.ClientError: If STS returns an API error.
-      RuntimeError: If the account ID is not recognized by the mapping.
+      RuntimeError: If the account ID is not recognized by the mapping, or
+        ``LIMITLAB_ENV`` names an unknown environment or (without
+        ``dry_run``) one other than the credentials' account.
 
     Examples:
       >>> isinstance(resolve_env_targets(), dict)  # doctest: +SKIP
       True
     """
-    sts = boto3.client("sts")
-    account_id = sts.get_caller_identity()["Account"]
+    override = os.environ.get(ENV_OVERRIDE_VAR)
+    if override and override not in ENV_CONFIG:
+        raise RuntimeError(f"{ENV_OVERRIDE_VAR}={override} is not one of: {', '.join(ENV_CONFIG)}.")
+    if override and dry_run:
+        return env_targets_for(override, ENV_CONFIG[override]["account_id"])
+    targets = _account_env_targets(timer or PhaseTimer(), cache_path=cache_path, ttl=ttl)
+    if override and targets["env"] != override:
+        raise RuntimeError(
+            f"{ENV_OVERRIDE_VAR}={override}, but the active credentials belong to the {targets['env']} account "
+            f"({targets['account_id']}). Unset {ENV_OVERRIDE_VAR} or switch credentials."
+        )
+    return targets
+
+
+def _account_env_targets(timer: PhaseTimer, *, cache_path: Path | None, ttl: float) -> dict:
+    """Resolve the targets of the credentials' account (cache, then STS); see ``resolve_env_targets()``."""
+    identity = credential_identity() if cache_path else None
+    cache = _read_env_cache(cache_path) if identity else {}
+    now = time.time()
+    if identity:
+        fingerprint, expiry = identity
+        entry = cache.get(fingerprint)
+        if entry and entry["expires"] > now and entry["env"] in ENV_CONFIG:
+            if ENV_CONFIG[entry["env"]]["account_id"] == entry["account_id"]:
+                return env_targets_for(entry["env"], entry["account_id"])
+
+    with timer.phase("sts_get_caller_identity") as rec:
+        identity_doc = _boto3().client("sts").get_caller_identity()
+        rec["retries"] = response_retries(identity_doc)
+    account_id = identity_doc["Account"]
 
     for env, cfg in ENV_CONFIG.items():
         if cfg["account_id"] == account_id:
-            return {
-                "env": env,
-                "account_id": account_id,
-                "bucket": cfg["bucket"],
-                "domain": cfg["domain"],
-            }
+            if identity:
+                expires = min(now + ttl, expiry) if expiry else now + ttl
+                cache = {k: v for k, v in cache.items() if v.get("expires", 0) > now}
+                cache[fingerprint] = {"env": env, "account_id": account_id, "expires": expires}
+                _write_env_cache(cache_path, cache)
+            return env_targets_for(env, account_id)
     raise RuntimeError(
         f"Unsupported AWS account: {account_id}. "
         "This tool only supports prod/dev accounts defined in ENV_CONFIG."
@@ -159,6 +757,12 @@ def resolve_env_targets() -> dict:
 
 # -------- Helpers --------
 
+HASH_CHUNK_SIZE: Final = 8 * 1024 * 1024  # 8 MiB read size for streaming hashes
+HASH_JOBS: Final = os.cpu_count() or 4
+
+_hash_buffers = threading.local()  # one reusable read buffer per thread (and process)
+
+
 def sha256_short(data: bytes, length: int = 12) -> str:
     """Compute a short hex digest of the content.
 
@@ -196,6 +800,112 @@ def sha256_b64(data: bytes) -> str:
     return base64.b64encode(hashlib.sha256(data).digest()).decode("ascii")
 
 
+def sha256_file(file_path: Path, chunk_size: int = HASH_CHUNK_SIZE) -> bytes:
+    """Compute the raw SHA-256 digest of a file in a single streaming pass.
+
+    The file is read with ``readinto`` into a per-thread buffer that is reused
+    across chunks and calls, so memory usage stays flat regardless of the
+    file size and no chunk is allocated or copied twice. Both the short hex
+    hash and the base64 checksum can be derived from the returned digest
+    without re-reading the file.
+
+    Args:
+      file_path: Path to the file to hash.
+      chunk_size: Number of bytes read per iteration. Defaults to 8 MiB.
+
+    Returns:
+      The 32-byte SHA-256 digest.
+
+    Examples:
+      >>> import tempfile
+      >>> p = Path(tempfile.gettempdir()) / "hello.txt"
+      >>> _ = p.write_bytes(b"hello")
+      >>> sha256_file(p).hex()[:6]
+      '2cf24d'
+    """
+    buf = getattr(_hash_buffers, "buf", None)
+    if buf is None or len(buf) != chunk_size:
+        buf = _hash_buffers.buf = memoryview(bytearray(chunk_size))
+    h = hashlib.sha256()
+    with open(file_path, "rb", buffering=0) as f:
+        while n := f.readinto(buf):
+            h.update(buf if n == chunk_size else buf[:n])
+    return h.digest()
+
+
+def sha256_short_path(file_path: Path, length: int = 12) -> str:
+    """Like ``sha256_short()``, but streams the file at ``file_path``.
+
+    Examples:
+      >>> import tempfile
+      >>> p = Path(tempfile.gettempdir()) / "hello.txt"
+      >>> _ = p.write_bytes(b"hello")
+      >>> sha256_short_path(p) == sha256_short(b"hello")
+      True
+    """
+    return sha256_file(file_path).hex()[:length]
+
+
+def sha256_b64_path(file_path: Path) -> str:
+    """Like ``sha256_b64()``, but streams the file at ``file_path``.
+
+    Examples:
+      >>> import tempfile
+      >>> p = Path(tempfile.gettempdir()) / "hello.txt"
+      >>> _ = p.write_bytes(b"hello")
+      >>> sha256_b64_path(p) == sha256_b64(b"hello")
+      True
+    """
+    return base64.b64encode(sha256_file(file_path)).decode("ascii")
+
+
+def sha256_files(paths: list[Path], *, jobs: int = HASH_JOBS, processes: bool = False) -> list[bytes]:
+    """Hash many files concurrently with ``sha256_file()``.
+
+    hashlib releases the GIL while hashing large buffers, so a thread pool
+    already hashes files in parallel; ``processes=True`` uses a process pool
+    instead, which also parallelizes the per-chunk Python overhead and suits
+    trees with many small files.
+
+    Args:
+      paths: Files to hash.
+      jobs: Number of worker threads or processes.
+      processes: If True, hash in a ``ProcessPoolExecutor``.
+
+    Returns:
+      The 32-byte SHA-256 digests, in the order of ``paths``.
+
+    Raises:
+      OSError: If a file cannot be read.
+
+    Examples:
+      >>> import tempfile
+      >>> d = Path(tempfile.mkdtemp())
+      >>> files = [d / "a", d / "b"]
+      >>> _ = files[0].write_bytes(b"hello"), files[1].write_bytes(b"")
+      >>> [x.hex()[:6] for x in sha256_files(files)]
+      ['2cf24d', 'e3b0c4']
+    """
+    if not paths:
+        return []
+    workers = max(1, min(jobs, len(paths)))
+    if processes:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(sha256_file, paths, chunksize=max(1, len(paths) // (workers * 4))))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(sha256_file, paths))
+
+
+# Language codes recognized in the {lang?} key suffix (ISO-639-1). A fixed list rather than
+# "any 2-3 letters", so variant tokens such as "sm", "hd" or "lg" never parse as a language.
+LANG_CODES: Final = frozenset(
+    {
+        "ar", "bn", "cs", "da", "de", "el", "en", "es", "fa", "fi", "fr", "he", "hi", "hu", "id", "it",
+        "ja", "ko", "ms", "nl", "no", "pl", "pt", "ro", "ru", "sv", "th", "tr", "uk", "vi", "zh",
+    }
+)
+
+
 def norm_suffix(s: str | None) -> str:
     """Normalize an optional suffix into the '-token' form.
 
@@ -337,224 +1047,2321 @@ def validate_inputs(*, file_path: Path, version_tag: str) -> None:
         raise ValueError('--version-tag must start with "v" (e.g., v2025-10-19 or v1.2.3).')
 
 
-# -------- Core --------
+# -------- Cache policy --------
+
+CACHE_IMMUTABLE: Final = "public, max-age=31536000, immutable"
+CACHE_SHORT: Final = "public, max-age=300"
+CACHE_REVALIDATE: Final = "public, max-age=0, must-revalidate"
+
+# Ordered (glob, Cache-Control) rules per profile; the first match wins.
+# Globs are matched against the S3 key, so extensions are expressed as "*.ext".
+CACHE_POLICIES: Final = {
+    "cdn": (
+        ("*_latest*", CACHE_SHORT),  # stable alias, overwritten on publish
+        ("*", CACHE_IMMUTABLE),  # versioned keys embed the content hash
+    ),
+    "site": (
+        ("_next/static/*", CACHE_IMMUTABLE),  # Next.js fingerprinted assets
+        ("*.html", CACHE_REVALIDATE),
+        ("*.txt", CACHE_REVALIDATE),  # RSC payloads change with the HTML
+        ("*", CACHE_SHORT),  # public/ images, favicon and other unhashed files
+    ),
+}
 
-def upload(
-    *,
-    bucket: str,
-    domain: str,
-    file_path: Path,
-    event: str,
-    type_code: str,
-    slug: str,
-    version_tag: str,
-    lang: str | None,
-    variant: str | None,
-    dry_run: bool,
-    env: str,
-    account_id: str,
-) -> dict:
-    """Upload a versioned object and create the 'latest' alias (or preview).
 
-    Workflow:
-      1) Validate inputs (file existence, extension, version tag format).
-      2) Compute short content hash (first 12 hex chars of SHA-256).
-      3) Build versioned and 'latest' filenames & keys.
-      4) Prepare deterministic headers:
-         - Versioned: Cache-Control 'public, max-age=31536000, immutable'
-         - Latest:    Cache-Control 'public, max-age=300'
-         - Content-Type via ``mimetypes.guess_type``
-         - Content-Disposition 'inline' for PDFs only
-         - SSE-S3 (AES256), ChecksumSHA256 (base64 of SHA-256)
-      5) If ``dry_run`` is True, return a preview dictionary (no S3 writes).
-         STS may be called earlier during env detection.
+def cache_control_for(key: str, rules=CACHE_POLICIES["cdn"]) -> str:
+    """Resolve the Cache-Control header for a key from an ordered rule table.
 
     Args:
-      bucket: Target S3 bucket name (resolved from the current account).
-      domain: Public CloudFront domain (resolved from the current account).
-      file_path: Path to the file that will be uploaded.
-      event: Event identifier, used as the first directory level.
-      type_code: Asset type code, used as the second directory level.
-      slug: Descriptive slug for the object name.
-      version_tag: Version tag, must start with 'v' (e.g., 'v2025-10-19').
-      lang: Optional language code (e.g., 'ja' or '-ja').
-      variant: Optional variant token (e.g., 'w1200' or '-w1200').
-      dry_run: If True, do not write to S3; return a full preview instead.
-      env: Resolved environment label ('prod' or 'dev').
-      account_id: Resolved AWS account ID.
+      key: S3 object key (no leading slash).
+      rules: Sequence of ``(glob, cache_control)`` pairs; the first glob that
+        matches ``key`` wins. Defaults to the "cdn" profile.
 
     Returns:
-      A JSON-serializable dictionary. In dry-run mode, fields include
-      ``*_preview`` keys and planned headers. In upload mode, fields include the
-      final S3 keys and CloudFront URLs.
+      The Cache-Control value. Falls back to the short TTL when nothing matches.
+
+    Examples:
+      >>> cache_control_for("iccv2025/s/talk_v1_abcdef123456.pdf")
+      'public, max-age=31536000, immutable'
+      >>> cache_control_for("iccv2025/s/talk_latest-ja.pdf")
+      'public, max-age=300'
+      >>> cache_control_for("_next/static/chunks/app.js", CACHE_POLICIES["site"])
+      'public, max-age=31536000, immutable'
+      >>> cache_control_for("publications/index.html", CACHE_POLICIES["site"])
+      'public, max-age=0, must-revalidate'
+    """
+    for pattern, value in rules:
+        if fnmatch.fnmatchcase(key, pattern):
+            return value
+    return CACHE_SHORT
+
+
+def load_cache_policies(policy_path: Path) -> dict:
+    """Load a Cache-Control rule table from JSON, overriding the built-in profiles.
+
+    Args:
+      policy_path: JSON file mapping profile names to lists of
+        ``[glob, cache_control]`` pairs. Profiles not present keep their
+        built-in rules.
+
+    Returns:
+      A profile-to-rules mapping with the same shape as ``CACHE_POLICIES``.
 
     Raises:
-      FileNotFoundError: If the source file does not exist.
-      ValueError: If the source file has no extension or version_tag is invalid.
-      botocore.exceptions.ClientError: For S3 API errors during upload/copy.
+      ValueError: If the file does not have the expected shape.
     """
-    validate_inputs(file_path=file_path, version_tag=version_tag)
+    raw = json.loads(policy_path.read_text(encoding="utf-8"))
+    if not isinstance(raw, dict):
+        raise ValueError("Cache policy file must map profile names to rule lists.")
+    policies = dict(CACHE_POLICIES)
+    for profile, rules in raw.items():
+        if not isinstance(rules, list) or not all(isinstance(r, list) and len(r) == 2 for r in rules):
+            raise ValueError(f"Cache policy {profile!r} must be a list of [glob, cache_control] pairs.")
+        policies[profile] = tuple((str(glob), str(value)) for glob, value in rules)
+    return policies
+
+
+# -------- Precompression --------
+
+# Keep in sync with the extension list of terraform/modules/s3_cloudfront/edge/precompressed_sidecars.mjs
+COMPRESSIBLE_TYPES: Final = (
+    "text/",
+    "application/javascript",
+    "application/json",
+    "application/manifest+json",
+    "application/xml",
+    "image/svg+xml",
+)
+ENCODING_SUFFIXES: Final = {"br": ".br", "gzip": ".gz"}
+PRECOMPRESS_MIN_SIZE: Final = 1024  # below this, headers outweigh the saving
+PRECOMPRESS_MIN_SAVING: Final = 0.10  # keep an encoding only if >= 10% smaller
+
+
+def is_compressible(ctype: str) -> bool:
+    """Tell whether a Content-Type benefits from precompression.
 
-    data = file_path.read_bytes()
-    content_hash = sha256_short(data)
+    Examples:
+      >>> is_compressible("text/html"), is_compressible("image/svg+xml"), is_compressible("application/pdf")
+      (True, True, False)
+    """
+    return ctype.startswith(COMPRESSIBLE_TYPES)
 
-    # Build names
-    ext = file_path.suffix  # validated non-empty
-    lang_sfx = norm_suffix(lang)
-    variant_sfx = norm_suffix(variant)
 
-    v_filename = build_filename(slug, version_tag, content_hash, lang_sfx, variant_sfx, ext, latest=False)
-    l_filename = build_filename(slug, version_tag, content_hash, lang_sfx, variant_sfx, ext, latest=True)
+def compress_variants(file_path: Path) -> dict[str, bytes]:
+    """Produce max-level Brotli and gzip encodings of a file.
 
-    v_key = build_key(event, type_code, v_filename)
-    l_key = build_key(event, type_code, l_filename)
+    Output is deterministic (gzip header mtime is zeroed) so unchanged inputs
+    produce byte-identical objects and compare equal on the next sync.
+    Brotli is used only when the optional ``brotli`` package is installed.
+    Encodings that are not meaningfully smaller than the source are dropped.
 
-    # Headers
-    ctype = content_type_for(file_path.name)
-    cdisp = content_disposition_for(ctype, file_path.name)
+    This is a module-level function so it can run in a process pool.
 
-    v_cache = "public, max-age=31536000, immutable"
-    l_cache = "public, max-age=300"
-    checksum_b64 = sha256_b64(data)
+    Args:
+      file_path: Path to a text-like asset (HTML, JS, CSS, SVG, JSON, ...).
 
-    if dry_run:
-        # No S3 writes; show a full preview along with env/account context
-        return {
-            "dry_run": True,
-            "env": env,
-            "aws_account_id": account_id,
-            "bucket": bucket,
-            "domain": domain,
-            "source_file": str(file_path),
-            "event": event,
-            "type": type_code,
-            "slug": slug,
-            "version_tag": version_tag,
-            "content_hash": content_hash,
-            "key_versioned_preview": v_key,
-            "s3_uri_versioned_preview": f"s3://{bucket}/{v_key}",
-            "cloudfront_url_versioned_preview": f"https://{domain}/{v_key}",
-            "key_latest_preview": l_key,
-            "s3_uri_latest_preview": f"s3://{bucket}/{l_key}",
-            "cloudfront_url_latest_preview": f"https://{domain}/{l_key}",
-            "headers": {
-                "content_type": ctype,
-                "content_disposition": cdisp,
-                "versioned_cache_control": v_cache,
-                "latest_cache_control": l_cache,
-                "server_side_encryption": "AES256",
-                "checksum_sha256_b64": checksum_b64,
-            },
-        }
+    Returns:
+      A mapping of Content-Encoding token ("br", "gzip") to encoded bytes.
 
-    # Actual upload path (region/credentials resolved by the default provider chain)
-    s3 = boto3.client("s3")
+    Examples:
+      >>> import tempfile
+      >>> p = Path(tempfile.gettempdir()) / "page.html"
+      >>> _ = p.write_text("<p>hello</p>" * 500)
+      >>> "gzip" in compress_variants(p)
+      True
+      >>> _ = p.write_text("tiny")
+      >>> compress_variants(p)
+      {}
+    """
+    data = file_path.read_bytes()
+    if len(data) < PRECOMPRESS_MIN_SIZE:
+        return {}
 
-    # Versioned object: long-lived cache with immutable
-    s3.put_object(
-        Bucket=bucket,
-        Key=v_key,
-        Body=data,
-        ContentType=ctype,
-        CacheControl=v_cache,
-        ServerSideEncryption="AES256",
-        ChecksumSHA256=checksum_b64,
-        Metadata={
-            "original-filename": file_path.name,
-            "version-tag": version_tag,
-            "content-hash": content_hash,
-        },
-        **({"ContentDisposition": cdisp} if cdisp else {}),
-    )
+    variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        variants["br"] = brotli.compress(data, quality=11)
 
-    # Latest alias: short-lived cache (no immutable)
-    s3.copy_object(
-        Bucket=bucket,
-        Key=l_key,
-        CopySource={"Bucket": bucket, "Key": v_key},
-        MetadataDirective="REPLACE",
-        ContentType=ctype,
-        CacheControl=l_cache,
-        ServerSideEncryption="AES256",
-        Metadata={
-            "alias": "latest",
-            "points-to": v_key,
-            "original-filename": file_path.name,
-            "version-tag": version_tag,
-            "content-hash": content_hash,
-        },
-        **({"ContentDisposition": cdisp} if cdisp else {}),
-    )
+    limit = len(data) * (1 - PRECOMPRESS_MIN_SAVING)
+    return {enc: body for enc, body in variants.items() if len(body) <= limit}
 
-    return {
-        "env": env,
-        "aws_account_id": account_id,
-        "bucket": bucket,
-        "domain": domain,
-        "key_versioned": v_key,
-        "s3_uri_versioned": f"s3://{bucket}/{v_key}",
-        "cloudfront_url_versioned": f"https://{domain}/{v_key}",
-        "key_latest": l_key,
-        "s3_uri_latest": f"s3://{bucket}/{l_key}",
-        "cloudfront_url_latest": f"https://{domain}/{l_key}",
-    }
 
+def upload_encoded_variants(
+    s3,
+    *,
+    bucket: str,
+    key: str,
+    variants: dict[str, bytes],
+    extra_args: dict,
+    timer: PhaseTimer | None = None,
+    scheduler: UploadScheduler | None = None,
+) -> list[str]:
+    """Upload precompressed sidecars next to ``key`` (``{key}.br``, ``{key}.gz``).
+
+    Each sidecar keeps the source Content-Type and Cache-Control and sets the
+    matching Content-Encoding. The distribution serves them through the
+    origin-request handler in ``terraform/modules/s3_cloudfront/edge/``: it
+    picks the sidecar the viewer's ``Accept-Encoding`` allows, the cache
+    policy keys on that header, and a response headers policy adds
+    ``Vary: Accept-Encoding`` (S3 cannot store one).
 
-# -------- CLI --------
+    Args:
+      s3: A boto3 S3 client.
+      bucket: Bucket name.
+      key: Key of the uncompressed object.
+      variants: Result of ``compress_variants()``.
+      extra_args: Headers shared with the source object (ContentType,
+        CacheControl, ServerSideEncryption, Metadata, ...).
+      timer: Optional ``PhaseTimer`` (phase ``put_sidecar``).
+      scheduler: Optional ``UploadScheduler`` gating every PUT.
 
-def parse_args() -> argparse.Namespace:
-    """Parse command-line arguments for the uploader CLI.
+    Returns:
+      The sidecar keys written.
+    """
+    timer = timer or PhaseTimer()
+    scheduler = scheduler or UploadScheduler()
+    written = []
+    for encoding, body in sorted(variants.items()):
+        sidecar = f"{key}{ENCODING_SUFFIXES[encoding]}"
+        with scheduler.slot(len(body)) as outcome, timer.phase("put_sidecar", nbytes=len(body)) as rec:
+            resp = s3.put_object(
+                Bucket=bucket,
+                Key=sidecar,
+                Body=scheduler.throttle(body),
+                ContentEncoding=encoding,
+                ChecksumSHA256=base64.b64encode(hashlib.sha256(body).digest()).decode("ascii"),
+                **extra_args,
+            )
+            rec["retries"] = outcome["retries"] = response_retries(resp)
+        written.append(sidecar)
+    return written
+
+
+def stale_alias_sidecars(plan: dict, existing: dict | None) -> tuple[list[str], list[str]]:
+    """Find the alias sidecars a new version lacks, split by how their existence is known.
+
+    Sidecars are only ever written for compressible types, so other types
+    have none to remove. With a prefix listing, the listing decides; without
+    one, each candidate must be checked with HEAD before it is deleted.
+
+    Args:
+      plan: Result of ``plan_upload()`` (``l_key``, ``ctype``, ``variants``).
+      existing: Prefetched listing of the alias prefix, or ``None``.
 
     Returns:
-      An ``argparse.Namespace`` with the following attributes:
+      ``(present, unknown)`` encodings: sidecars known to exist, and sidecars
+      to probe with HEAD.
 
-      - file (str): Path to the source file to upload.
-      - event (str): Event identifier (first directory level).
-      - type_code (str): Asset type code (second directory level).
-      - slug (str): Descriptive slug for the file name.
-      - version_tag (str): Required version tag (must start with 'v').
+    Examples:
+      >>> plan = {"l_key": "e/s/a_latest.html", "ctype": "text/html", "variants": {"gzip": b""}}
+      >>> stale_alias_sidecars(plan, None)
+      ([], ['br'])
+      >>> stale_alias_sidecars({**plan, "variants": {}}, {"e/s/a_latest.html.gz": {}})
+      (['gzip'], [])
+      >>> stale_alias_sidecars({**plan, "l_key": "e/s/a_latest.pdf", "ctype": "application/pdf"}, None)
+      ([], [])
+    """
+    if not is_compressible(plan["ctype"]):
+        return [], []
+    candidates = [enc for enc in sorted(ENCODING_SUFFIXES) if enc not in plan["variants"]]
+    if existing is None:
+        return [], candidates
+    return [enc for enc in candidates if plan["l_key"] + ENCODING_SUFFIXES[enc] in existing], []
+
+
+def sidecar_delete_request(bucket: str, l_key: str, encodings: list[str]) -> dict:
+    """Build the quiet ``DeleteObjects`` arguments for the alias sidecars of ``encodings``.
+
+    Examples:
+      >>> sidecar_delete_request("b", "k", ["br"])["Delete"]
+      {'Objects': [{'Key': 'k.br'}], 'Quiet': True}
+    """
+    objects = [{"Key": l_key + ENCODING_SUFFIXES[enc]} for enc in encodings]
+    return {"Bucket": bucket, "Delete": {"Objects": objects, "Quiet": True}}
+
+
+def check_sidecar_delete(resp: dict) -> None:
+    """Raise if a quiet ``DeleteObjects`` of alias sidecars reported an error.
+
+    Examples:
+      >>> check_sidecar_delete({})
+      >>> check_sidecar_delete({"Errors": [{"Key": "k.br", "Code": "AccessDenied"}]})
+      Traceback (most recent call last):
+      ...
+      RuntimeError: failed to delete stale sidecar k.br: AccessDenied
+    """
+    if resp.get("Errors"):
+        err = resp["Errors"][0]
+        raise RuntimeError(f"failed to delete stale sidecar {err['Key']}: {err.get('Code')}")
+
+
+def remove_stale_alias_sidecars(
+    s3,
+    *,
+    plan: dict,
+    existing: dict | None,
+    timer: PhaseTimer | None = None,
+    scheduler: UploadScheduler | None = None,
+) -> list[str]:
+    """Delete the alias sidecars a new version lacks, so they stop serving the previous bytes.
+
+    Only sidecars known to exist are deleted (see ``stale_alias_sidecars()``).
+
+    Args:
+      s3: A boto3 S3 client.
+      plan: Result of ``plan_upload()``.
+      existing: Prefetched listing of the alias prefix, or ``None``.
+      timer: Optional ``PhaseTimer`` (phases ``head_sidecar``, ``delete_sidecar``).
+      scheduler: Optional ``UploadScheduler`` gating the delete.
+
+    Returns:
+      The encodings whose alias sidecar was deleted.
+
+    Raises:
+      botocore.exceptions.ClientError: For S3 API errors.
+      RuntimeError: If S3 could not delete a sidecar.
+    """
+    timer = timer or PhaseTimer()
+    scheduler = scheduler or UploadScheduler()
+    present, unknown = stale_alias_sidecars(plan, existing)
+    for enc in unknown:
+        with timer.phase("head_sidecar"):
+            if head_object_or_none(s3, bucket=plan["bucket"], key=plan["l_key"] + ENCODING_SUFFIXES[enc]):
+                present.append(enc)
+    if not present:
+        return []
+    with scheduler.slot() as outcome, timer.phase("delete_sidecar") as rec:
+        resp = s3.delete_objects(**sidecar_delete_request(plan["bucket"], plan["l_key"], present))
+        rec["retries"] = outcome["retries"] = response_retries(resp)
+    check_sidecar_delete(resp)
+    return present
+
+
+# -------- Hash cache --------
+
+HASH_CACHE_PATH: Final = CACHE_DIR / "upload_static_hashes.sqlite3"
+HASH_CACHE_MAX_ENTRIES: Final = 100_000
+
+
+class HashCache:
+    """Persistent SQLite cache of file digests keyed on (path, size, mtime_ns, inode).
+
+    A cached digest is only returned when the file's current ``stat`` matches
+    the recorded one, so unchanged files skip hashing entirely while any
+    modification (or replacement by a different inode) forces a re-hash.
+    Entries are evicted least-recently-used once the cache exceeds
+    ``max_entries``. The cache is safe to share across threads.
+
+    Examples:
+      >>> import tempfile
+      >>> d = Path(tempfile.mkdtemp())
+      >>> _ = (d / "a.txt").write_bytes(b"hello")
+      >>> cache = HashCache(d / "cache.sqlite3")
+      >>> cache.digest(d / "a.txt").hex()[:6]
+      '2cf24d'
+      >>> cache.hits, cache.misses
+      (0, 1)
+      >>> _ = cache.digest(d / "a.txt")
+      >>> cache.hits
+      1
+      >>> cache.close()
+    """
+
+    def __init__(self, path: Path = HASH_CACHE_PATH, max_entries: int = HASH_CACHE_MAX_ENTRIES) -> None:
+        """Open (or create) the cache database.
+
+        Args:
+          path: Location of the SQLite database file.
+          max_entries: Maximum number of entries kept after eviction.
+
+        Raises:
+          sqlite3.Error: If the database cannot be opened.
+          OSError: If the parent directory cannot be created.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS digests ("
+            " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+            " inode INTEGER NOT NULL, sha256 BLOB NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS digests_last_used ON digests (last_used)")
+        self._db.commit()
+
+    def lookup(self, file_path: Path) -> tuple[bytes | None, os.stat_result]:
+        """Return the cached digest of a file (``None`` on a miss) and the ``stat`` it was checked against.
+
+        Hits and misses are counted; pass the returned ``stat`` to ``store()``
+        after hashing a miss.
+        """
+        key = str(file_path.resolve())
+        st = file_path.stat()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT sha256 FROM digests WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?",
+                (key, st.st_size, st.st_mtime_ns, st.st_ino),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None, st
+            self.hits += 1
+            self._db.execute("UPDATE digests SET last_used = ? WHERE path = ?", (time.time_ns(), key))
+        return bytes(row[0]), st
+
+    def store(self, file_path: Path, digest: bytes, st: os.stat_result) -> None:
+        """Record a digest hashed from the file as it was at ``st``, unless it changed since."""
+        after = file_path.stat()
+        if (after.st_size, after.st_mtime_ns, after.st_ino) != (st.st_size, st.st_mtime_ns, st.st_ino):
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?, ?)",
+                (str(file_path.resolve()), st.st_size, st.st_mtime_ns, st.st_ino, digest, time.time_ns()),
+            )
+
+    def digest(self, file_path: Path, timer: PhaseTimer | None = None) -> bytes:
+        """Return the SHA-256 digest of a file, hashing only on a cache miss.
+
+        Args:
+          file_path: Path to the file.
+          timer: Optional ``PhaseTimer``; records ``hash`` on a miss and
+            ``hash_cache_hit`` otherwise.
+
+        Returns:
+          The 32-byte SHA-256 digest.
+        """
+        timer = timer or PhaseTimer()
+        start = time.perf_counter()
+        digest, st = self.lookup(file_path)
+        if digest is not None:
+            timer.add("hash_cache_hit", time.perf_counter() - start)
+            return digest
+        with timer.phase("hash", nbytes=st.st_size):
+            digest = sha256_file(file_path)
+        self.store(file_path, digest, st)
+        return digest
+
+    def close(self) -> None:
+        """Evict least-recently-used entries beyond the cap, commit and close."""
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM digests WHERE path IN ("
+                " SELECT path FROM digests ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+            self._db.close()
+
+
+def open_hash_cache(path: Path | None = HASH_CACHE_PATH) -> HashCache | None:
+    """Open the hash cache, degrading to no cache when it is unavailable.
+
+    Read-only home directories (common in CI containers) must not break
+    uploads, so failures to open the cache are swallowed.
+
+    Args:
+      path: Location of the cache database, or ``None`` to disable caching.
+
+    Returns:
+      A ``HashCache`` instance, or ``None`` if disabled or unavailable.
+    """
+    if path is None:
+        return None
+    try:
+        return HashCache(path)
+    except (OSError, sqlite3.Error):
+        return None
+
+
+# -------- Upload journal --------
+
+UPLOAD_JOURNAL_PATH: Final = CACHE_DIR / "upload_journal.sqlite3"
+UPLOAD_JOURNAL_MAX_AGE: Final = 7 * 24 * 3600  # seconds before an unfinished upload is aborted
+
+
+class UploadJournal:
+    """Persistent SQLite journal of in-flight multipart uploads for resuming.
+
+    An upload is keyed by (bucket, key, content id) where the content id is
+    the full base64 SHA-256 of the source, so a resumed upload can never mix
+    parts of different content. Every completed part (number, ETag, SHA-256
+    checksum) is committed as soon as S3 acknowledges it. The journal is safe
+    to share across threads.
+
+    Examples:
+      >>> import tempfile
+      >>> j = UploadJournal(Path(tempfile.mkdtemp()) / "journal.sqlite3")
+      >>> j.start("b", "k", "sha", "u1", 5 * MIB)
+      >>> j.record_part("u1", 2, '"e2"', "c2")
+      >>> r = j.find("b", "k", "sha")
+      >>> r["upload_id"], r["parts"]
+      ('u1', {2: ('"e2"', 'c2')})
+      >>> j.finish("u1"); j.find("b", "k", "sha") is None
+      True
+      >>> j.close()
+    """
+
+    def __init__(self, path: Path = UPLOAD_JOURNAL_PATH) -> None:
+        """Open (or create) the journal database.
+
+        Raises:
+          sqlite3.Error: If the database cannot be opened.
+          OSError: If the parent directory cannot be created.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS uploads ("
+            " upload_id TEXT PRIMARY KEY, bucket TEXT NOT NULL, key TEXT NOT NULL, content_id TEXT NOT NULL,"
+            " part_size INTEGER NOT NULL, created REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS uploads_target ON uploads (bucket, key, content_id);"
+            "CREATE TABLE IF NOT EXISTS parts ("
+            " upload_id TEXT NOT NULL, part_number INTEGER NOT NULL, etag TEXT NOT NULL, checksum TEXT NOT NULL,"
+            " PRIMARY KEY (upload_id, part_number));"
+        )
+        self._db.commit()
+
+    def find(self, bucket: str, key: str, content_id: str) -> dict | None:
+        """Return the newest unfinished upload of this content, if any.
+
+        Returns:
+          ``{"upload_id", "part_size", "created", "parts"}`` with ``parts``
+          mapping part number to ``(etag, checksum_b64)``, or ``None``.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT upload_id, part_size, created FROM uploads WHERE bucket = ? AND key = ? AND content_id = ?"
+                " ORDER BY created DESC LIMIT 1",
+                (bucket, key, content_id),
+            ).fetchone()
+            if row is None:
+                return None
+            parts = self._db.execute(
+                "SELECT part_number, etag, checksum FROM parts WHERE upload_id = ?", (row[0],)
+            ).fetchall()
+        return {
+            "upload_id": row[0],
+            "part_size": row[1],
+            "created": row[2],
+            "parts": {n: (etag, checksum) for n, etag, checksum in parts},
+        }
+
+    def start(self, bucket: str, key: str, content_id: str, upload_id: str, part_size: int) -> None:
+        """Record a newly created multipart upload."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?, ?)",
+                (upload_id, bucket, key, content_id, part_size, time.time()),
+            )
+            self._db.commit()
+
+    def record_part(self, upload_id: str, part_number: int, etag: str, checksum: str) -> None:
+        """Record a part S3 has acknowledged; committed immediately."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO parts VALUES (?, ?, ?, ?)", (upload_id, part_number, etag, checksum)
+            )
+            self._db.commit()
+
+    def finish(self, upload_id: str) -> None:
+        """Forget an upload (completed, aborted or gone)."""
+        with self._lock:
+            self._db.execute("DELETE FROM parts WHERE upload_id = ?", (upload_id,))
+            self._db.execute("DELETE FROM uploads WHERE upload_id = ?", (upload_id,))
+            self._db.commit()
+
+    def stale(self, max_age: float = UPLOAD_JOURNAL_MAX_AGE) -> list[tuple[str, str, str]]:
+        """List ``(bucket, key, upload_id)`` of uploads started more than ``max_age`` seconds ago."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT bucket, key, upload_id FROM uploads WHERE created < ?", (time.time() - max_age,)
+            ).fetchall()
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+
+def open_upload_journal(path: Path | None = UPLOAD_JOURNAL_PATH) -> UploadJournal | None:
+    """Open the upload journal, degrading to non-resumable uploads when unavailable.
+
+    Args:
+      path: Location of the journal database, or ``None`` to disable resuming.
+
+    Returns:
+      An ``UploadJournal`` instance, or ``None`` if disabled or unavailable.
+    """
+    if path is None:
+        return None
+    try:
+        return UploadJournal(path)
+    except (OSError, sqlite3.Error):
+        return None
+
+
+def abort_stale_uploads(s3, journal: UploadJournal, max_age: float = UPLOAD_JOURNAL_MAX_AGE) -> list[str]:
+    """Abort journaled multipart uploads abandoned for longer than ``max_age``.
+
+    Incomplete uploads are billed for their stored parts until aborted.
+
+    Args:
+      s3: A boto3 S3 client.
+      journal: The upload journal.
+      max_age: Age in seconds after which an unfinished upload is abandoned.
+
+    Returns:
+      The keys whose uploads were aborted.
+    """
+    aborted = []
+    for bucket, key, upload_id in journal.stale(max_age):
+        try:
+            s3.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        except Exception as e:
+            if not is_client_error(e):
+                raise
+            # NoSuchUpload: already completed, aborted or expired by a lifecycle rule
+        journal.finish(upload_id)
+        aborted.append(key)
+    return aborted
+
+
+# -------- Multipart --------
+
+MIB: Final = 1024 * 1024
+MULTIPART_THRESHOLD: Final = 64 * MIB  # switch to multipart above this size
+MULTIPART_PART_SIZE: Final = 16 * MIB
+MULTIPART_MAX_WORKERS: Final = 8
+MIN_PART_SIZE: Final = 5 * MIB  # S3 minimum for every part except the last
+MAX_PARTS: Final = 10_000  # S3 hard limit on parts per upload
+MAX_COPY_OBJECT_SIZE: Final = 5 * 1024 * MIB  # CopyObject single-request limit
+
+
+def plan_parts(size: int, part_size: int = MULTIPART_PART_SIZE) -> list[tuple[int, int, int]]:
+    """Split an object into S3 multipart ranges.
+
+    The part size is doubled until the object fits in ``MAX_PARTS`` parts, so
+    callers never have to reason about the S3 part-count limit.
+
+    Args:
+      size: Total object size in bytes.
+      part_size: Requested part size in bytes; must be at least 5 MiB.
+
+    Returns:
+      A list of ``(part_number, offset, length)`` tuples; part numbers start at 1.
+
+    Raises:
+      ValueError: If ``part_size`` is below the S3 minimum part size.
+
+    Examples:
+      >>> plan_parts(12 * MIB, 5 * MIB)
+      [(1, 0, 5242880), (2, 5242880, 5242880), (3, 10485760, 2097152)]
+      >>> plan_parts(0)
+      [(1, 0, 0)]
+    """
+    if part_size < MIN_PART_SIZE:
+        raise ValueError(f"Part size must be at least {MIN_PART_SIZE // MIB} MiB.")
+    while size > part_size * MAX_PARTS:
+        part_size *= 2
+    if size == 0:
+        return [(1, 0, 0)]
+    return [
+        (i + 1, offset, min(part_size, size - offset))
+        for i, offset in enumerate(range(0, size, part_size))
+    ]
+
+
+def _read_range(file_path: Path, offset: int, length: int) -> bytes:
+    """Read ``length`` bytes starting at ``offset`` with a private file handle."""
+    with file_path.open("rb") as f:
+        f.seek(offset)
+        return f.read(length)
+
+
+def _resume_multipart(
+    s3, journal: UploadJournal | None, *, bucket: str, key: str, content_id: str | None, part_size: int
+) -> tuple[str, dict[int, tuple[str, str]]] | None:
+    """Find a journaled upload of this content and the parts S3 still holds.
+
+    Only parts present both in the journal and in ``ListParts`` with the same
+    ETag are reused; the journal alone is never trusted. An upload planned
+    with a different part size, or no longer known to S3, is dropped.
+
+    Returns:
+      ``(upload_id, {part_number: (etag, checksum_b64)})`` or ``None`` when a
+      new upload has to be created.
+    """
+    entry = journal.find(bucket, key, content_id) if journal else None
+    if entry is None:
+        return None
+    upload_id = entry["upload_id"]
+    if entry["part_size"] != part_size:
+        try:
+            s3.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        except Exception as e:
+            if not is_client_error(e):
+                raise
+        journal.finish(upload_id)
+        return None
+    listed = {}
+    try:
+        for page in s3.get_paginator("list_parts").paginate(Bucket=bucket, Key=key, UploadId=upload_id):
+            for part in page.get("Parts", []):
+                listed[part["PartNumber"]] = part["ETag"]
+    except Exception as e:
+        if not is_client_error(e):
+            raise
+        journal.finish(upload_id)  # NoSuchUpload: completed, aborted or expired
+        return None
+    return upload_id, {n: (etag, c) for n, (etag, c) in entry["parts"].items() if listed.get(n) == etag}
+
+
+def multipart_upload(
+    s3,
+    *,
+    bucket: str,
+    key: str,
+    file_path: Path,
+    size: int,
+    extra_args: dict,
+    part_size: int = MULTIPART_PART_SIZE,
+    max_workers: int = MULTIPART_MAX_WORKERS,
+    timer: PhaseTimer | None = None,
+    journal: UploadJournal | None = None,
+    content_id: str | None = None,
+    scheduler: UploadScheduler | None = None,
+) -> dict:
+    """Upload a file as an S3 multipart upload with parts sent concurrently.
+
+    Every part carries its own ``ChecksumSHA256`` so S3 verifies each part on
+    receipt. After completion the composite checksum returned by S3
+    (SHA-256 over the concatenated part digests) is compared with the locally
+    computed one. Memory is bounded by ``part_size * max_workers``.
+
+    Without a journal, any failure aborts the upload so no orphaned parts are
+    billed. With a journal (and ``content_id``), each acknowledged part is
+    recorded and a failed upload is left open: the next run for the same
+    content reconciles the journal with ``ListParts`` and sends only the
+    missing parts. Abandoned uploads are reaped by ``abort_stale_uploads()``.
+
+    Args:
+      s3: A boto3 S3 client.
+      bucket: Target bucket name.
+      key: Target object key.
+      file_path: Path to the source file.
+      size: Size of the source file in bytes.
+      extra_args: Object headers passed to ``CreateMultipartUpload`` (e.g.,
+        ContentType, CacheControl, ServerSideEncryption, Metadata).
+      part_size: Part size in bytes (at least 5 MiB).
+      max_workers: Number of parts uploaded in parallel.
+      timer: Optional ``PhaseTimer``; every part is recorded as ``upload_part``.
+      journal: Optional ``UploadJournal`` enabling resumption.
+      content_id: Identity of the source content (full base64 SHA-256);
+        required for the journal to be used.
+      scheduler: Optional ``UploadScheduler`` gating every part upload.
+
+    Returns:
+      A dictionary with ``upload_id``, ``part_count``, ``part_size``, the
+      composite ``checksum_sha256`` reported by S3 and ``resumed_parts``
+      (parts reused from an earlier attempt).
+
+    Raises:
+      botocore.exceptions.ClientError: For S3 API errors.
+      RuntimeError: If the composite checksum reported by S3 does not match.
+    """
+    timer = timer or PhaseTimer()
+    scheduler = scheduler or UploadScheduler()
+    parts = plan_parts(size, part_size)
+    if content_id is None:
+        journal = None
+    resumed = _resume_multipart(s3, journal, bucket=bucket, key=key, content_id=content_id, part_size=parts[0][2])
+    if resumed:
+        upload_id, acked = resumed
+    else:
+        with timer.phase("create_multipart_upload") as rec:
+            mpu = s3.create_multipart_upload(Bucket=bucket, Key=key, ChecksumAlgorithm="SHA256", **extra_args)
+            rec["retries"] = response_retries(mpu)
+        upload_id, acked = mpu["UploadId"], {}
+        if journal:
+            journal.start(bucket, key, content_id, upload_id, parts[0][2])
+
+    def send(part: tuple[int, int, int]) -> tuple[dict, bytes]:
+        number, offset, length = part
+        with timer.phase("read_part", nbytes=length):
+            data = _read_range(file_path, offset, length)
+        with timer.phase("hash_part", nbytes=length):
+            digest = hashlib.sha256(data).digest()
+        checksum = base64.b64encode(digest).decode("ascii")
+        with scheduler.slot(length) as outcome, timer.phase("upload_part", nbytes=length) as rec:
+            resp = s3.upload_part(
+                Bucket=bucket,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=number,
+                Body=scheduler.throttle(data),
+                ChecksumSHA256=checksum,
+            )
+            rec["retries"] = outcome["retries"] = response_retries(resp)
+        if journal:
+            journal.record_part(upload_id, number, resp["ETag"], checksum)
+        return {"PartNumber": number, "ETag": resp["ETag"], "ChecksumSHA256": checksum}, digest
+
+    def reuse(number: int) -> tuple[dict, bytes]:
+        etag, checksum = acked[number]
+        return {"PartNumber": number, "ETag": etag, "ChecksumSHA256": checksum}, base64.b64decode(checksum)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            sent = pool.map(send, [p for p in parts if p[0] not in acked])
+            done = sorted([*map(reuse, acked), *sent], key=lambda d: d[0]["PartNumber"])
+        with timer.phase("complete_multipart_upload") as rec:
+            resp = s3.complete_multipart_upload(
+                Bucket=bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": [p for p, _ in done]},
+            )
+            rec["retries"] = response_retries(resp)
+    except BaseException:
+        if not journal:
+            s3.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+    if journal:
+        journal.finish(upload_id)
+
+    composite = hashlib.sha256(b"".join(d for _, d in done)).digest()
+    expected = f"{base64.b64encode(composite).decode('ascii')}-{len(done)}"
+    reported = resp.get("ChecksumSHA256")
+    if reported and reported != expected:
+        raise RuntimeError(f"Composite checksum mismatch for {key}: expected {expected}, got {reported}.")
+
+    return {
+        "upload_id": upload_id,
+        "part_count": len(done),
+        "part_size": parts[0][2],
+        "checksum_sha256": reported or expected,
+        "resumed_parts": len(acked),
+    }
+
+
+def copy_object_any_size(
+    s3,
+    *,
+    bucket: str,
+    src_key: str,
+    dst_key: str,
+    size: int,
+    extra_args: dict,
+    part_size: int = MULTIPART_PART_SIZE,
+    max_workers: int = MULTIPART_MAX_WORKERS,
+    timer: PhaseTimer | None = None,
+    scheduler: UploadScheduler | None = None,
+) -> None:
+    """Server-side copy that falls back to ``UploadPartCopy`` above 5 GiB.
+
+    ``CopyObject`` is limited to 5 GiB per request. Larger objects are copied
+    as a multipart upload whose parts are ranges of the source object, so no
+    bytes pass through the caller in either case.
+
+    Args:
+      s3: A boto3 S3 client.
+      bucket: Bucket holding both source and destination.
+      src_key: Source object key.
+      dst_key: Destination object key.
+      size: Size of the source object in bytes.
+      extra_args: Headers for the destination object (ContentType,
+        CacheControl, ServerSideEncryption, Metadata, ...).
+      part_size: Part size in bytes for the multipart copy.
+      max_workers: Number of ranges copied in parallel.
+      timer: Optional ``PhaseTimer`` (``copy_object`` or ``upload_part_copy``).
+      scheduler: Optional ``UploadScheduler``; copies take a request slot but
+        no bandwidth (no bytes leave the caller).
+
+    Raises:
+      botocore.exceptions.ClientError: For S3 API errors.
+    """
+    timer = timer or PhaseTimer()
+    scheduler = scheduler or UploadScheduler()
+    source = {"Bucket": bucket, "Key": src_key}
+    if size <= MAX_COPY_OBJECT_SIZE:
+        with scheduler.slot() as outcome, timer.phase("copy_object", nbytes=size) as rec:
+            resp = s3.copy_object(
+                Bucket=bucket, Key=dst_key, CopySource=source, MetadataDirective="REPLACE", **extra_args
+            )
+            rec["retries"] = outcome["retries"] = response_retries(resp)
+        return
+
+    # Large copies use bigger ranges; S3 accepts up to 5 GiB per copied part.
+    parts = plan_parts(size, max(part_size, 512 * MIB))
+    with timer.phase("create_multipart_upload") as rec:
+        mpu = s3.create_multipart_upload(Bucket=bucket, Key=dst_key, **extra_args)
+        rec["retries"] = response_retries(mpu)
+    upload_id = mpu["UploadId"]
+
+    def copy(part: tuple[int, int, int]) -> dict:
+        number, offset, length = part
+        with scheduler.slot() as outcome, timer.phase("upload_part_copy", nbytes=length) as rec:
+            resp = s3.upload_part_copy(
+                Bucket=bucket,
+                Key=dst_key,
+                UploadId=upload_id,
+                PartNumber=number,
+                CopySource=source,
+                CopySourceRange=f"bytes={offset}-{offset + length - 1}",
+            )
+            rec["retries"] = outcome["retries"] = response_retries(resp)
+        return {"PartNumber": number, "ETag": resp["CopyPartResult"]["ETag"]}
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            done = list(pool.map(copy, parts))
+        with timer.phase("complete_multipart_upload") as rec:
+            resp = s3.complete_multipart_upload(
+                Bucket=bucket,
+                Key=dst_key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": done},
+            )
+            rec["retries"] = response_retries(resp)
+    except BaseException:
+        s3.abort_multipart_upload(Bucket=bucket, Key=dst_key, UploadId=upload_id)
+        raise
+
+
+# -------- Existing objects --------
+
+def head_object_or_none(s3, *, bucket: str, key: str) -> dict | None:
+    """Return the ``HeadObject`` response for a key, or ``None`` if it is absent.
+
+    Args:
+      s3: A boto3 S3 client.
+      bucket: Bucket name.
+      key: Object key.
+
+    Returns:
+      The HeadObject response dictionary, or ``None`` on 404.
+
+    Raises:
+      botocore.exceptions.ClientError: For errors other than a missing key.
+    """
+    try:
+        return s3.head_object(Bucket=bucket, Key=key)
+    except Exception as e:
+        if is_client_error(e) and e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+
+
+def list_prefix(s3, *, bucket: str, prefix: str) -> dict[str, dict]:
+    """List every object under a prefix with one paginated ``ListObjectsV2`` walk.
+
+    Versioned keys embed the content hash, so a listing is enough to tell
+    whether a versioned object is already published without a HEAD per file.
+
+    Args:
+      s3: A boto3 S3 client.
+      bucket: Bucket name.
+      prefix: Key prefix, typically ``{event}/{type}/``.
+
+    Returns:
+      A mapping of key to ``{"size": int, "etag": str, "last_modified": datetime}``.
+    """
+    listing = {}
+    for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            listing[obj["Key"]] = {"size": obj["Size"], "etag": obj["ETag"], "last_modified": obj["LastModified"]}
+    return listing
+
+
+def _is_published(s3, *, bucket: str, v_key: str, content_hash: str, size: int, existing: dict | None) -> bool:
+    """Tell whether the versioned object already holds this exact content."""
+    if existing is not None:
+        # The key embeds the content hash; a size match guards against truncation
+        obj = existing.get(v_key)
+        return obj is not None and obj["size"] == size
+    head = head_object_or_none(s3, bucket=bucket, key=v_key)
+    return (
+        head is not None
+        and head.get("Metadata", {}).get("content-hash") == content_hash
+        and head.get("ContentLength") == size
+    )
+
+
+def _key_exists(s3, *, bucket: str, key: str, existing: dict | None) -> bool:
+    """Tell whether a key exists, using the prefetched listing when available."""
+    if existing is not None:
+        return key in existing
+    return head_object_or_none(s3, bucket=bucket, key=key) is not None
+
+
+def _alias_points_to(s3, *, bucket: str, l_key: str, v_key: str, existing: dict | None) -> bool:
+    """Tell whether the latest alias already points at the versioned key."""
+    if existing is not None:
+        alias, target = existing.get(l_key), existing.get(v_key)
+        if alias is None:
+            return False
+        if target is not None and alias["etag"] == target["etag"]:
+            return True
+        # ETags differ for multipart sources even when the alias is current
+    head = head_object_or_none(s3, bucket=bucket, key=l_key)
+    return head is not None and head.get("Metadata", {}).get("points-to") == v_key
+
+
+# -------- Deduplication index --------
+
+# Keys under this prefix are never served: the CDN bucket policy denies them to CloudFront
+# (private_prefixes in terraform/{prod,dev}/cdn.tf). "_" never starts an event id.
+PRIVATE_PREFIX: Final = "_private/"
+DEDUP_INDEX_KEY: Final = f"{PRIVATE_PREFIX}dedup/sha256.json.gz"
+DEDUP_FLUSH_ATTEMPTS: Final = 5
+CONDITIONAL_WRITE_CONFLICTS: Final = ("PreconditionFailed", "ConditionalRequestConflict")
+
+
+class DedupIndex:
+    """Bucket-side index mapping full SHA-256 digests to a key holding that content.
+
+    The index is one gzipped JSON object (``{"version": 1, "sha256":
+    {checksum_b64: key}}``) stored at ``DEDUP_INDEX_KEY``
+    (``_private/dedup/sha256.json.gz`` in the CDN bucket). It lists every
+    published digest, including versions that are not released yet, so it
+    lives under ``PRIVATE_PREFIX``: the bucket policy denies that prefix to
+    CloudFront, and only the publisher's own credentials can read it.
+
+    The index is loaded once, consulted before every versioned write, and
+    extended in memory. ``flush()``
+    publishes the additions with a conditional ``PutObject`` (``If-Match`` on
+    the ETag that was read, ``If-None-Match: *`` for the first writer). When a
+    concurrent writer got there first, the index is re-read, the additions are
+    merged again and the write is retried, so no writer loses entries.
+
+    Entries are hints, not truth: ``source_for()`` checks the source with a
+    HEAD before it is used, and stale entries (deleted or replaced objects)
+    are dropped on the next flush. The index is safe to share across threads.
+    """
+
+    def __init__(self, bucket: str, key: str = DEDUP_INDEX_KEY) -> None:
+        self.bucket = bucket
+        self.key = key
+        self._lock = threading.Lock()
+        self._entries: dict[str, str] | None = None
+        self._etag: str | None = None
+        self._added: dict[str, str] = {}
+        self._dropped: dict[str, str] = {}
+
+    def _fetch(self, s3) -> tuple[dict[str, str], str | None]:
+        """Read the published index and its ETag (empty and ``None`` when absent)."""
+        try:
+            resp = s3.get_object(Bucket=self.bucket, Key=self.key)
+        except Exception as e:
+            if is_client_error(e) and e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return {}, None
+            raise
+        return json.loads(gzip.decompress(resp["Body"].read()))["sha256"], resp["ETag"]
+
+    def lookup(self, s3, checksum_b64: str) -> str | None:
+        """Return the key recorded for a digest (including unflushed additions), if any."""
+        with self._lock:
+            if self._entries is None:
+                self._entries, self._etag = self._fetch(s3)
+            return self._added.get(checksum_b64) or self._entries.get(checksum_b64)
+
+    def source_for(self, s3, checksum_b64: str, *, size: int, content_hash: str, exclude: str) -> str | None:
+        """Find a verified key already holding this content, other than ``exclude``.
+
+        Args:
+          s3: A boto3 S3 client.
+          checksum_b64: Base64 SHA-256 of the content.
+          size: Content size in bytes.
+          content_hash: Short content hash recorded in the object metadata.
+          exclude: Key being written (never its own source).
+
+        Returns:
+          The source key, or ``None`` when the content is not published or the
+          recorded object no longer matches (the entry is then dropped).
+        """
+        key = self.lookup(s3, checksum_b64)
+        if key is None or key == exclude:
+            return None
+        head = head_object_or_none(s3, bucket=self.bucket, key=key)
+        recorded = (head or {}).get("Metadata", {}).get("content-hash", content_hash)
+        if head is None or head["ContentLength"] != size or recorded != content_hash:
+            with self._lock:
+                self._added.pop(checksum_b64, None)
+                self._dropped[checksum_b64] = key
+            return None
+        return key
+
+    def add(self, s3, checksum_b64: str, key: str) -> None:
+        """Record that ``key`` holds this content unless another key already does."""
+        if self.lookup(s3, checksum_b64) is None:
+            with self._lock:
+                self._added.setdefault(checksum_b64, key)
+
+    def _merge(self, entries: dict[str, str]) -> dict[str, str]:
+        """Apply pending drops and additions to a copy of ``entries`` (caller holds the lock)."""
+        merged = dict(entries)
+        for checksum, key in self._dropped.items():
+            if merged.get(checksum) == key:
+                del merged[checksum]
+        for checksum, key in self._added.items():
+            merged.setdefault(checksum, key)
+        return merged
+
+    def flush(self, s3) -> int:
+        """Publish pending changes with a conditional write, merging concurrent updates.
+
+        Returns:
+          The number of entries in the published index (unchanged indexes are
+          not rewritten).
+
+        Raises:
+          RuntimeError: If concurrent writers win ``DEDUP_FLUSH_ATTEMPTS`` times in a row.
+          botocore.exceptions.ClientError: For other S3 API errors.
+        """
+        with self._lock:
+            if not self._added and not self._dropped:
+                return len(self._entries or {})
+            if self._entries is None:
+                self._entries, self._etag = self._fetch(s3)
+            for attempt in range(DEDUP_FLUSH_ATTEMPTS):
+                if attempt:
+                    time.sleep(0.1 * 2**attempt)
+                    self._entries, self._etag = self._fetch(s3)
+                merged = self._merge(self._entries)
+                if merged != self._entries:
+                    body = json.dumps({"version": 1, "sha256": merged}, sort_keys=True, separators=(",", ":"))
+                    condition = {"IfMatch": self._etag} if self._etag else {"IfNoneMatch": "*"}
+                    try:
+                        resp = s3.put_object(
+                            Bucket=self.bucket,
+                            Key=self.key,
+                            Body=gzip.compress(body.encode("utf-8"), mtime=0),
+                            ContentType="application/gzip",
+                            CacheControl="no-store",
+                            ServerSideEncryption="AES256",
+                            **condition,
+                        )
+                    except Exception as e:
+                        code = e.response.get("Error", {}).get("Code") if is_client_error(e) else None
+                        if code in CONDITIONAL_WRITE_CONFLICTS:
+                            continue  # another writer updated the index; re-read and merge
+                        raise
+                    self._etag = resp["ETag"]
+                self._entries = merged
+                self._added.clear()
+                self._dropped.clear()
+                return len(merged)
+        raise RuntimeError(f"Could not update s3://{self.bucket}/{self.key}: concurrent writers kept winning.")
+
+
+# -------- Core --------
+
+def upload(
+    *,
+    bucket: str,
+    domain: str,
+    file_path: Path,
+    event: str,
+    type_code: str,
+    slug: str,
+    version_tag: str,
+    lang: str | None,
+    variant: str | None,
+    dry_run: bool,
+    env: str,
+    account_id: str,
+    part_size: int = MULTIPART_PART_SIZE,
+    max_workers: int = MULTIPART_MAX_WORKERS,
+    multipart_threshold: int = MULTIPART_THRESHOLD,
+    s3=None,
+    skip_existing: bool = False,
+    existing: dict | None = None,
+    hash_cache: HashCache | None = None,
+    cache_rules=CACHE_POLICIES["cdn"],
+    precompress: bool = False,
+    timer: PhaseTimer | None = None,
+    journal: UploadJournal | None = None,
+    scheduler: UploadScheduler | None = None,
+    dedup: DedupIndex | None = None,
+) -> dict:
+    """Upload a versioned object and create the 'latest' alias (or preview).
+
+    Workflow:
+      1) Validate inputs (file existence, extension, version tag format).
+      2) Hash the file in one streaming pass; derive the short content hash
+         (first 12 hex chars of SHA-256) and the base64 checksum from it.
+      3) Build versioned and 'latest' filenames & keys.
+      4) Prepare deterministic headers:
+         - Cache-Control from ``cache_rules`` (by default versioned:
+           'public, max-age=31536000, immutable', latest: 'public, max-age=300')
+         - Content-Type via ``mimetypes.guess_type``
+         - Content-Disposition 'inline' for PDFs only
+         - SSE-S3 (AES256), ChecksumSHA256 (base64 of SHA-256)
+      5) If ``dry_run`` is True, return a preview dictionary (no S3 writes).
+         STS may be called earlier during env detection.
+      6) Upload the versioned object with a single PUT, or as a parallel
+         multipart upload when the file is larger than ``multipart_threshold``.
+         With ``skip_existing``, the PUT is skipped when the versioned key
+         already holds this content, and the alias copy is skipped when the
+         alias already points to it.
+         With ``dedup``, content already published under another key (e.g.,
+         the same deck under a second event) is copied server-side instead.
+      7) With ``precompress``, upload Brotli/gzip sidecars for text-like
+         assets and copy them next to the latest alias. When the alias is
+         rewritten, its sidecars for encodings this version lacks are deleted.
+
+    Args:
+      bucket: Target S3 bucket name (resolved from the current account).
+      domain: Public CloudFront domain (resolved from the current account).
+      file_path: Path to the file that will be uploaded.
+      event: Event identifier, used as the first directory level.
+      type_code: Asset type code, used as the second directory level.
+      slug: Descriptive slug for the object name.
+      version_tag: Version tag, must start with 'v' (e.g., 'v2025-10-19').
+      lang: Optional language code (e.g., 'ja' or '-ja').
+      variant: Optional variant token (e.g., 'w1200' or '-w1200').
+      dry_run: If True, do not write to S3; return a full preview instead.
+      env: Resolved environment label ('prod' or 'dev').
+      account_id: Resolved AWS account ID.
+      part_size: Multipart part size in bytes (at least 5 MiB).
+      max_workers: Number of parts uploaded concurrently in multipart mode.
+      multipart_threshold: Files larger than this many bytes use multipart.
+      s3: Optional boto3 S3 client to reuse (e.g., a pooled client shared by a
+        batch run). A new client is created when omitted.
+      skip_existing: If True, skip writes whose result is already in place.
+      existing: Optional prefetched listing from ``list_prefix()`` covering the
+        target prefix. When given, existence checks use it instead of HEAD.
+      hash_cache: Optional ``HashCache``; unchanged files are not re-hashed.
+      cache_rules: Cache-Control rule table applied to both keys.
+      precompress: If True and the asset is text-like, also publish Brotli and
+        gzip sidecars (``.br``/``.gz``) for the versioned and latest keys.
+      timer: Optional ``PhaseTimer``; a fresh one is used when omitted.
+      journal: Optional ``UploadJournal``; multipart uploads interrupted by a
+        previous run are resumed instead of restarted.
+      scheduler: Optional ``UploadScheduler`` shaping bandwidth and request
+        concurrency; shared by all uploads of a batch.
+      dedup: Optional ``DedupIndex``. New content is added to it in memory;
+        the caller publishes the additions with ``dedup.flush(s3)``.
+
+    Returns:
+      A JSON-serializable dictionary. In dry-run mode, fields include
+      ``*_preview`` keys and planned headers. In upload mode, fields include the
+      final S3 keys and CloudFront URLs (and ``deduplicated_from``, the
+      source key of a server-side copy, or ``None``; ``removed_encodings``,
+      the stale alias sidecars deleted). Both include ``timings``: wall time,
+      bytes, MB/s and botocore retries per phase (hash, each S3 call type).
+
+    Raises:
+      FileNotFoundError: If the source file does not exist.
+      ValueError: If the source file has no extension or version_tag is invalid.
+      botocore.exceptions.ClientError: For S3 API errors during upload/copy.
+    """
+    plan = plan_upload(
+        bucket=bucket,
+        domain=domain,
+        file_path=file_path,
+        event=event,
+        type_code=type_code,
+        slug=slug,
+        version_tag=version_tag,
+        lang=lang,
+        variant=variant,
+        env=env,
+        account_id=account_id,
+        part_size=part_size,
+        multipart_threshold=multipart_threshold,
+        hash_cache=hash_cache,
+        cache_rules=cache_rules,
+        precompress=precompress,
+        timer=timer,
+    )
+    if dry_run:
+        # No S3 writes; show a full preview along with env/account context
+        return preview_result(plan)
+
+    # Actual upload path (region/credentials resolved by the default provider chain)
+    if s3 is None:
+        s3 = make_s3_client(max_workers)
+
+    v_key, l_key, size, variants = plan["v_key"], plan["l_key"], plan["size"], plan["variants"]
+    timer = plan["timer"]
+    scheduler = scheduler or UploadScheduler()
+
+    with timer.phase("check_existing"):
+        skip_versioned = skip_existing and _is_published(
+            s3, bucket=bucket, v_key=v_key, content_hash=plan["content_hash"], size=size, existing=existing
+        )
+        skip_latest = skip_versioned and _alias_points_to(
+            s3, bucket=bucket, l_key=l_key, v_key=v_key, existing=existing
+        )
+
+    source = None
+    if dedup is not None and not skip_versioned:
+        with timer.phase("dedup_lookup"):
+            source = dedup.source_for(
+                s3, plan["checksum_b64"], size=size, content_hash=plan["content_hash"], exclude=v_key
+            )
+
+    # Versioned object: long-lived cache with immutable
+    if skip_versioned:
+        pass  # already published; the key embeds the content hash
+    elif source:
+        # Identical bytes are already in the bucket; no data leaves this host
+        copy_object_any_size(
+            s3,
+            bucket=bucket,
+            src_key=source,
+            dst_key=v_key,
+            size=size,
+            extra_args={**plan["v_args"], "ChecksumAlgorithm": "SHA256"},
+            part_size=part_size,
+            max_workers=max_workers,
+            timer=timer,
+            scheduler=scheduler,
+        )
+    elif plan["multipart"]:
+        # Per-part ChecksumSHA256 keeps the integrity guarantee for large files
+        multipart_upload(
+            s3,
+            bucket=bucket,
+            key=v_key,
+            file_path=file_path,
+            size=size,
+            extra_args=plan["v_args"],
+            part_size=part_size,
+            max_workers=max_workers,
+            timer=timer,
+            journal=journal,
+            content_id=plan["checksum_b64"],
+            scheduler=scheduler,
+        )
+    else:
+        # The body is streamed from the file handle so botocore never buffers
+        # the whole file.
+        with (
+            file_path.open("rb") as body,
+            scheduler.slot(size) as outcome,
+            timer.phase("put_object", nbytes=size) as rec,
+        ):
+            resp = s3.put_object(
+                Bucket=bucket,
+                Key=v_key,
+                Body=scheduler.throttle(body),
+                ContentLength=size,
+                ChecksumSHA256=plan["checksum_b64"],
+                **plan["v_args"],
+            )
+            rec["retries"] = outcome["retries"] = response_retries(resp)
+    if dedup is not None and not source:
+        dedup.add(s3, plan["checksum_b64"], v_key)
+
+    if variants:
+        # Sidecars of an already published version only need to be filled in
+        pending = {
+            enc: body
+            for enc, body in variants.items()
+            if not skip_versioned
+            or not _key_exists(s3, bucket=bucket, key=v_key + ENCODING_SUFFIXES[enc], existing=existing)
+        }
+        upload_encoded_variants(
+            s3,
+            bucket=bucket,
+            key=v_key,
+            variants=pending,
+            extra_args=plan["v_args"],
+            timer=timer,
+            scheduler=scheduler,
+        )
+
+    # Latest alias: short-lived cache (no immutable)
+    if not skip_latest:
+        copy_object_any_size(
+            s3,
+            bucket=bucket,
+            src_key=v_key,
+            dst_key=l_key,
+            size=size,
+            extra_args=plan["l_args"],
+            part_size=part_size,
+            max_workers=max_workers,
+            timer=timer,
+            scheduler=scheduler,
+        )
+        for enc in sorted(variants):
+            suffix = ENCODING_SUFFIXES[enc]
+            with scheduler.slot() as outcome, timer.phase("copy_sidecar", nbytes=len(variants[enc])) as rec:
+                resp = s3.copy_object(
+                    Bucket=bucket,
+                    Key=l_key + suffix,
+                    CopySource={"Bucket": bucket, "Key": v_key + suffix},
+                    MetadataDirective="REPLACE",
+                    ContentEncoding=enc,
+                    **plan["l_args"],
+                )
+                rec["retries"] = outcome["retries"] = response_retries(resp)
+        # Sidecars left by a previous version would keep serving its bytes
+        removed = remove_stale_alias_sidecars(s3, plan=plan, existing=existing, timer=timer, scheduler=scheduler)
+    else:
+        removed = []
+
+    return upload_result(
+        plan,
+        skipped_versioned=skip_versioned,
+        skipped_latest=skip_latest,
+        deduplicated_from=source,
+        removed_encodings=removed,
+    )
+
+
+def plan_upload(
+    *,
+    bucket: str,
+    domain: str,
+    file_path: Path,
+    event: str,
+    type_code: str,
+    slug: str,
+    version_tag: str,
+    lang: str | None,
+    variant: str | None,
+    env: str,
+    account_id: str,
+    part_size: int = MULTIPART_PART_SIZE,
+    multipart_threshold: int = MULTIPART_THRESHOLD,
+    hash_cache: HashCache | None = None,
+    cache_rules=CACHE_POLICIES["cdn"],
+    precompress: bool = False,
+    timer: PhaseTimer | None = None,
+) -> dict:
+    """Compute everything an upload needs without touching S3.
+
+    This is the shared front half of ``upload()`` and of alternative
+    backends: validation, hashing, key names and object headers.
+
+    Args:
+      See ``upload()``; the arguments have the same meaning.
+
+    Returns:
+      A plan dictionary with the input context plus ``content_hash``,
+      ``checksum_b64``, ``size``, ``v_key``, ``l_key``, ``ctype``, ``cdisp``,
+      ``v_cache``, ``l_cache``, ``multipart``, ``parts``, ``variants``,
+      ``v_args`` (versioned object headers), ``l_args`` (alias headers) and
+      ``timer`` (the ``PhaseTimer`` later steps keep recording into).
+
+    Raises:
+      FileNotFoundError: If the source file does not exist.
+      ValueError: If the source file has no extension or version_tag is invalid.
+    """
+    timer = timer or PhaseTimer()
+    validate_inputs(file_path=file_path, version_tag=version_tag)
+    size = file_path.stat().st_size
+
+    # Single streaming pass (or a cache hit); the file is never held in memory
+    if hash_cache:
+        digest = hash_cache.digest(file_path, timer)
+    else:
+        with timer.phase("hash", nbytes=size):
+            digest = sha256_file(file_path)
+    content_hash = digest.hex()[:12]
+
+    # Build names
+    ext = file_path.suffix  # validated non-empty
+    lang_sfx = norm_suffix(lang)
+    variant_sfx = norm_suffix(variant)
+
+    v_filename = build_filename(slug, version_tag, content_hash, lang_sfx, variant_sfx, ext, latest=False)
+    l_filename = build_filename(slug, version_tag, content_hash, lang_sfx, variant_sfx, ext, latest=True)
+
+    v_key = build_key(event, type_code, v_filename)
+    l_key = build_key(event, type_code, l_filename)
+
+    # Headers
+    ctype = content_type_for(file_path.name)
+    cdisp = content_disposition_for(ctype, file_path.name)
+
+    v_cache = cache_control_for(v_key, cache_rules)
+    l_cache = cache_control_for(l_key, cache_rules)
+
+    multipart = size > multipart_threshold
+    variants = {}
+    if precompress and is_compressible(ctype):
+        with timer.phase("compress", nbytes=size):
+            variants = compress_variants(file_path)
+    metadata = {
+        "original-filename": file_path.name,
+        "version-tag": version_tag,
+        "content-hash": content_hash,
+    }
+    return {
+        "env": env,
+        "account_id": account_id,
+        "bucket": bucket,
+        "domain": domain,
+        "file_path": file_path,
+        "event": event,
+        "type_code": type_code,
+        "slug": slug,
+        "version_tag": version_tag,
+        "content_hash": content_hash,
+        "checksum_b64": base64.b64encode(digest).decode("ascii"),
+        "size": size,
+        "v_key": v_key,
+        "l_key": l_key,
+        "ctype": ctype,
+        "cdisp": cdisp,
+        "v_cache": v_cache,
+        "l_cache": l_cache,
+        "multipart": multipart,
+        "parts": plan_parts(size, part_size) if multipart else [],
+        "variants": variants,
+        "v_args": {
+            "ContentType": ctype,
+            "CacheControl": v_cache,
+            "ServerSideEncryption": "AES256",
+            "Metadata": metadata,
+            **({"ContentDisposition": cdisp} if cdisp else {}),
+        },
+        "l_args": {
+            "ContentType": ctype,
+            "CacheControl": l_cache,
+            "ServerSideEncryption": "AES256",
+            "Metadata": {"alias": "latest", "points-to": v_key, **metadata},
+            **({"ContentDisposition": cdisp} if cdisp else {}),
+        },
+        "timer": timer,
+    }
+
+
+def preview_result(plan: dict) -> dict:
+    """Render the dry-run preview for a plan from ``plan_upload()``."""
+    bucket, domain, v_key, l_key = plan["bucket"], plan["domain"], plan["v_key"], plan["l_key"]
+    return {
+        "dry_run": True,
+        "env": plan["env"],
+        "aws_account_id": plan["account_id"],
+        "bucket": bucket,
+        "domain": domain,
+        "source_file": str(plan["file_path"]),
+        "event": plan["event"],
+        "type": plan["type_code"],
+        "slug": plan["slug"],
+        "version_tag": plan["version_tag"],
+        "content_hash": plan["content_hash"],
+        "key_versioned_preview": v_key,
+        "s3_uri_versioned_preview": f"s3://{bucket}/{v_key}",
+        "cloudfront_url_versioned_preview": f"https://{domain}/{v_key}",
+        "key_latest_preview": l_key,
+        "s3_uri_latest_preview": f"s3://{bucket}/{l_key}",
+        "cloudfront_url_latest_preview": f"https://{domain}/{l_key}",
+        "headers": {
+            "content_type": plan["ctype"],
+            "content_disposition": plan["cdisp"],
+            "versioned_cache_control": plan["v_cache"],
+            "latest_cache_control": plan["l_cache"],
+            "server_side_encryption": "AES256",
+            "checksum_sha256_b64": plan["checksum_b64"],
+        },
+        "size": plan["size"],
+        "upload_mode": "multipart" if plan["multipart"] else "single",
+        "part_count_preview": len(plan["parts"]) if plan["multipart"] else 1,
+        "encodings_preview": {enc: len(body) for enc, body in sorted(plan["variants"].items())},
+        "timings": plan["timer"].as_dict(),
+    }
+
+
+def upload_result(
+    plan: dict,
+    *,
+    skipped_versioned: bool,
+    skipped_latest: bool,
+    deduplicated_from: str | None = None,
+    removed_encodings: list[str] | None = None,
+) -> dict:
+    """Render the result of a completed upload for a plan from ``plan_upload()``."""
+    bucket, domain, v_key, l_key = plan["bucket"], plan["domain"], plan["v_key"], plan["l_key"]
+    return {
+        "env": plan["env"],
+        "aws_account_id": plan["account_id"],
+        "bucket": bucket,
+        "domain": domain,
+        "content_hash": plan["content_hash"],
+        "size": plan["size"],
+        "key_versioned": v_key,
+        "s3_uri_versioned": f"s3://{bucket}/{v_key}",
+        "cloudfront_url_versioned": f"https://{domain}/{v_key}",
+        "key_latest": l_key,
+        "s3_uri_latest": f"s3://{bucket}/{l_key}",
+        "cloudfront_url_latest": f"https://{domain}/{l_key}",
+        "upload_mode": "multipart" if plan["multipart"] else "single",
+        "skipped_versioned": skipped_versioned,
+        "skipped_latest": skipped_latest,
+        "deduplicated_from": deduplicated_from,
+        "encodings": sorted(plan["variants"]),
+        "removed_encodings": removed_encodings or [],
+        "timings": plan["timer"].as_dict(),
+    }
+
+
+# -------- Batch --------
+
+BATCH_JOBS: Final = 8
+MANIFEST_FIELDS: Final = ("file", "event", "type", "slug", "version_tag", "lang", "variant")
+
+
+def make_s3_client(max_pool_connections: int = 10):
+    """Create an S3 client whose connection pool fits the planned concurrency.
+
+    botocore keeps 10 connections per client by default; concurrent batch and
+    multipart uploads beyond that would block on the pool or re-handshake.
+
+    Payload signing is off: botocore would otherwise read every body once
+    more to SHA-256 it for the signature (and, under ``--max-bandwidth-mb``,
+    pay bandwidth tokens for that local read). Uploads carry their own
+    ``ChecksumSHA256`` and S3 only accepts unsigned payloads over TLS.
+
+    Args:
+      max_pool_connections: Size of the HTTP connection pool.
+
+    Returns:
+      A boto3 S3 client safe to share across threads.
+    """
+    from botocore.config import Config
+
+    config = Config(max_pool_connections=max(10, max_pool_connections), s3={"payload_signing_enabled": False})
+    return _boto3().client("s3", config=config)
+
+
+def load_manifest(manifest_path: Path) -> list[dict]:
+    """Load batch upload entries from a JSON, YAML or CSV manifest.
+
+    JSON and YAML manifests contain a list of mappings; CSV manifests have a
+    header row. Recognized fields are ``file``, ``event``, ``type``, ``slug``,
+    ``version_tag``, ``lang`` and ``variant`` (``type_code`` and
+    ``version-tag`` are accepted as aliases). Relative ``file`` paths are
+    resolved against the manifest's directory. Missing fields are left out so
+    that CLI defaults can fill them in.
+
+    Args:
+      manifest_path: Path to a ``.json``, ``.yaml``/``.yml`` or ``.csv`` file.
+
+    Returns:
+      A list of entry dictionaries in manifest order.
+
+    Raises:
+      FileNotFoundError: If the manifest does not exist.
+      ValueError: If the format is unsupported or the content is malformed.
+      RuntimeError: If a YAML manifest is given but PyYAML is not installed.
+
+    Examples:
+      >>> import tempfile
+      >>> m = Path(tempfile.gettempdir()) / "manifest.csv"
+      >>> _ = m.write_text("file,slug,version-tag\\nx.pdf,talk,v1\\n")
+      >>> load_manifest(m)[0]["slug"]
+      'talk'
+    """
+    suffix = manifest_path.suffix.lower()
+    text = manifest_path.read_text(encoding="utf-8")
+    if suffix == ".json":
+        raw = json.loads(text)
+    elif suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise RuntimeError("YAML manifests require PyYAML (pip install pyyaml).") from e
+        raw = yaml.safe_load(text)
+    elif suffix == ".csv":
+        raw = list(csv.DictReader(text.splitlines()))
+    else:
+        raise ValueError(f"Unsupported manifest format: {manifest_path.name} (use .json, .yaml or .csv).")
+
+    if not isinstance(raw, list) or not all(isinstance(r, dict) for r in raw):
+        raise ValueError("Manifest must be a list of entries.")
+
+    entries = []
+    for row in raw:
+        entry = {}
+        for name, value in row.items():
+            field = str(name).strip().replace("-", "_")
+            field = "type" if field == "type_code" else field
+            if field not in MANIFEST_FIELDS:
+                raise ValueError(f"Unknown manifest field: {name!r}")
+            if value not in (None, ""):
+                entry[field] = str(value)
+        if "file" not in entry:
+            raise ValueError(f"Manifest entry without 'file': {row}")
+        entry["file"] = str(manifest_path.parent / entry["file"])
+        entries.append(entry)
+    return entries
+
+
+def entries_from_dir(dir_path: Path) -> list[dict]:
+    """Build batch entries for every regular file directly under a directory.
+
+    The slug of each entry is the file stem; event, type and version tag are
+    expected to come from CLI defaults. Hidden files are skipped.
+
+    Args:
+      dir_path: Directory containing the files to publish.
+
+    Returns:
+      A list of entry dictionaries sorted by file name.
+
+    Raises:
+      NotADirectoryError: If ``dir_path`` is not a directory.
+    """
+    if not dir_path.is_dir():
+        raise NotADirectoryError(str(dir_path))
+    return [
+        {"file": str(f), "slug": f.stem}
+        for f in sorted(dir_path.iterdir())
+        if f.is_file() and not f.name.startswith(".")
+    ]
+
+
+def error_result(source_file: str, e: Exception) -> dict:
+    """Render an exception in the same JSON shape ``main()`` prints."""
+    if is_client_error(e):
+        msg = e.response.get("Error", {})
+        return {"source_file": source_file, "error": {"code": msg.get("Code"), "message": msg.get("Message")}}
+    return {"source_file": source_file, "error": str(e)}
+
+
+def entry_upload_kwargs(entry: dict, env_info: dict) -> dict:
+    """Translate a batch entry into the entry-specific keyword arguments of ``upload()``.
+
+    Args:
+      entry: Entry dictionary with defaults already applied.
+      env_info: Result of ``resolve_env_targets()``.
+
+    Returns:
+      Keyword arguments for ``upload()`` covering target and naming fields.
+
+    Raises:
+      ValueError: If a required naming field is missing.
+
+    Examples:
+      >>> env = {"env": "dev", "account_id": "1", "bucket": "b", "domain": "d"}
+      >>> kw = entry_upload_kwargs({"file": "x.pdf", "event": "e", "type": "s", "slug": "x", "version_tag": "v1"}, env)
+      >>> kw["type_code"], kw["lang"]
+      ('s', None)
+    """
+    missing = [f for f in ("event", "type", "slug", "version_tag") if not entry.get(f)]
+    if missing:
+        raise ValueError(f"Missing required field(s): {', '.join(missing)}")
+    return {
+        "bucket": env_info["bucket"],
+        "domain": env_info["domain"],
+        "file_path": Path(entry["file"]),
+        "event": entry["event"],
+        "type_code": entry["type"],
+        "slug": entry["slug"],
+        "version_tag": entry["version_tag"],
+        "lang": entry.get("lang"),
+        "variant": entry.get("variant"),
+        "env": env_info["env"],
+        "account_id": env_info["account_id"],
+    }
+
+
+def batch_prefixes(entries: list[dict]) -> list[str]:
+    """Return the distinct ``{event}/{type}/`` prefixes touched by a batch.
+
+    Examples:
+      >>> batch_prefixes([{"event": "e", "type": "s"}, {"event": "e", "type": "s"}, {"event": "e", "type": "p"}])
+      ['e/p/', 'e/s/']
+    """
+    return sorted({build_key(e["event"], e["type"], "") for e in entries if e.get("event") and e.get("type")})
+
+
+def upload_batch(
+    entries: list[dict],
+    *,
+    env_info: dict,
+    dry_run: bool,
+    defaults: dict | None = None,
+    jobs: int = BATCH_JOBS,
+    part_size: int = MULTIPART_PART_SIZE,
+    max_workers: int = MULTIPART_MAX_WORKERS,
+    multipart_threshold: int = MULTIPART_THRESHOLD,
+    skip_existing: bool = False,
+    hash_cache: HashCache | None = None,
+    cache_rules=CACHE_POLICIES["cdn"],
+    precompress: bool = False,
+    timer: PhaseTimer | None = None,
+    journal: UploadJournal | None = None,
+    scheduler: UploadScheduler | None = None,
+    dedup: DedupIndex | None = None,
+) -> list[dict]:
+    """Upload many entries concurrently with one resolved environment and client.
+
+    The environment is resolved once by the caller and a single pooled S3
+    client is shared by all workers, so a batch pays one STS round trip and
+    reuses TLS connections across objects.
+
+    Args:
+      entries: Entry dictionaries (see ``load_manifest``).
+      env_info: Result of ``resolve_env_targets()``.
+      dry_run: If True, only previews are produced.
+      defaults: Field values applied to entries that do not set them.
+      jobs: Number of entries processed concurrently.
+      part_size: Multipart part size in bytes.
+      max_workers: Concurrent part uploads per multipart entry.
+      multipart_threshold: Files larger than this many bytes use multipart.
+      skip_existing: If True, list each ``{event}/{type}/`` prefix once and skip
+        entries whose versioned object (and alias) are already in place.
+      hash_cache: Optional ``HashCache`` shared by all workers.
+      cache_rules: Cache-Control rule table applied to every entry.
+      precompress: If True, publish Brotli/gzip sidecars for text-like entries.
+      timer: Optional ``PhaseTimer`` for run-level work (prefix listings);
+        every entry reports its own ``timings``.
+      journal: Optional ``UploadJournal`` shared by all workers.
+      scheduler: Optional ``UploadScheduler`` shared by all workers; the
+        thread pools are sized for ``jobs * max_workers`` requests and the
+        scheduler decides how many of them are actually in flight.
+      dedup: Optional ``DedupIndex`` shared by all workers; it is flushed once
+        after the batch (one conditional write for all new content).
+
+    Returns:
+      One result per entry, in input order. Successful entries have the same
+      shape as ``upload()``; failed entries have ``source_file`` and ``error``.
+
+    Raises:
+      botocore.exceptions.ClientError: If the prefix listing or the dedup
+        index update fails (per-entry errors are reported in the results).
+      RuntimeError: If the dedup index could not be updated (concurrent writers).
+    """
+    timer = timer or PhaseTimer()
+    defaults = {k: v for k, v in (defaults or {}).items() if v is not None}
+    entries = [{**defaults, **entry} for entry in entries]
+    s3 = None if dry_run else make_s3_client(jobs * max_workers)
+
+    existing = None
+    if skip_existing and not dry_run:
+        # One ListObjectsV2 walk per prefix instead of a HEAD per entry
+        prefixes = batch_prefixes(entries)
+        existing = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(prefixes)))) as pool, timer.phase("list_objects_v2"):
+            for listing in pool.map(lambda prefix: list_prefix(s3, bucket=env_info["bucket"], prefix=prefix), prefixes):
+                existing.update(listing)
+
+    def run(e: dict) -> dict:
+        try:
+            return upload(
+                **entry_upload_kwargs(e, env_info),
+                dry_run=dry_run,
+                part_size=part_size,
+                max_workers=max_workers,
+                multipart_threshold=multipart_threshold,
+                s3=s3,
+                skip_existing=skip_existing,
+                existing=existing,
+                hash_cache=hash_cache,
+                cache_rules=cache_rules,
+                precompress=precompress,
+                journal=journal,
+                scheduler=scheduler,
+                dedup=dedup,
+            )
+        except Exception as exc:
+            return error_result(e["file"], exc)
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        results = list(pool.map(run, entries))
+    if dedup is not None and s3 is not None:
+        with timer.phase("dedup_index_flush"):
+            dedup.flush(s3)
+    return results
+
+
+# -------- CloudFront invalidation --------
+
+INVALIDATION_MAX_PATHS: Final = 3000  # CloudFront limit on file paths in flight per distribution, across requests
+INVALIDATION_POLL_INTERVAL: Final = 10  # seconds between GetInvalidation calls
+INVALIDATION_BATCH_TIMEOUT: Final = 15 * 60  # seconds to wait for a batch before sending the next one
+
+
+def invalidation_paths(results: list[dict]) -> list[str]:
+    """Collect the CloudFront paths of every latest alias a run overwrote.
+
+    Skipped aliases, previews and failed entries are ignored; precompressed
+    sidecars of an overwritten alias are included. Paths are deduplicated,
+    sorted and URL-encoded as CloudFront expects.
+
+    Args:
+      results: ``upload()`` results (single or batch).
+
+    Returns:
+      Sorted, unique invalidation paths (leading ``/``).
+
+    Examples:
+      >>> invalidation_paths([
+      ...     {"key_latest": "e/s/a_latest.html", "skipped_latest": False, "encodings": ["gzip"]},
+      ...     {"key_latest": "e/s/b_latest.pdf", "skipped_latest": True, "encodings": []},
+      ...     {"key_latest": "e/s/c_latest.css", "skipped_latest": False, "encodings": [], "removed_encodings": ["br"]},
+      ...     {"key_latest": "e/s/a_latest.html", "skipped_latest": False, "encodings": []},
+      ... ])
+      ['/e/s/a_latest.html', '/e/s/a_latest.html.gz', '/e/s/c_latest.css', '/e/s/c_latest.css.br']
+    """
+    keys = set()
+    for r in results:
+        if "error" in r or r.get("dry_run") or r.get("skipped_latest", True):
+            continue
+        keys.add(r["key_latest"])
+        encodings = [*r.get("encodings", []), *r.get("removed_encodings", [])]
+        keys.update(r["key_latest"] + ENCODING_SUFFIXES[enc] for enc in encodings)
+    return sorted("/" + urllib.parse.quote(key, safe="/-_.~") for key in keys)
+
+
+def resolve_distribution_id(cf, env_info: dict) -> str:
+    """Return the CloudFront distribution ID serving the environment's CDN domain.
+
+    Uses ``distribution_id`` from ``ENV_CONFIG`` when pinned (the
+    ``LIMITLAB_{PROD,DEV}_CDN_DISTRIBUTION_ID`` variables); otherwise finds
+    the distribution whose aliases include the environment domain, which
+    needs ``cloudfront:ListDistributions``.
+
+    Args:
+      cf: A boto3 CloudFront client.
+      env_info: Result of ``resolve_env_targets()``.
+
+    Returns:
+      The distribution ID.
+
+    Raises:
+      botocore.exceptions.ClientError: If CloudFront returns an API error.
+      RuntimeError: If no distribution serves the domain.
+    """
+    if env_info.get("distribution_id"):
+        return env_info["distribution_id"]
+    for page in cf.get_paginator("list_distributions").paginate():
+        for dist in page.get("DistributionList", {}).get("Items", []):
+            if env_info["domain"] in dist.get("Aliases", {}).get("Items", []):
+                return dist["Id"]
+    raise RuntimeError(
+        f"No CloudFront distribution serves {env_info['domain']}; "
+        f"set LIMITLAB_{env_info['env'].upper()}_CDN_DISTRIBUTION_ID."
+    )
+
+
+def wait_invalidation(cf, *, distribution_id: str, invalidation_id: str, timeout: float, poll_interval: float) -> bool:
+    """Poll an invalidation until it completes or ``timeout`` seconds pass; return whether it completed.
+
+    Examples:
+      >>> class CF:
+      ...     def get_invalidation(self, **kw):
+      ...         return {"Invalidation": {"Status": "Completed"}}
+      >>> wait_invalidation(CF(), distribution_id="D", invalidation_id="I", timeout=0, poll_interval=1)
+      True
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        resp = cf.get_invalidation(DistributionId=distribution_id, Id=invalidation_id)
+        if resp["Invalidation"]["Status"] == "Completed":
+            return True
+        if time.monotonic() + poll_interval > deadline:
+            return False
+        time.sleep(poll_interval)
+
+
+def invalidate_paths(
+    cf,
+    *,
+    distribution_id: str,
+    paths: list[str],
+    wait: float = 0,
+    poll_interval: float = INVALIDATION_POLL_INTERVAL,
+) -> dict:
+    """Submit paths as CloudFront invalidation batches and optionally wait for them.
+
+    All paths go into one ``CreateInvalidation`` request. CloudFront caps the
+    paths in flight per distribution at ``INVALIDATION_MAX_PATHS``, so larger
+    runs are split into batches sent one at a time: each batch must complete
+    (up to ``INVALIDATION_BATCH_TIMEOUT``) before the next is created, and
+    only the last batch honors ``wait``. If a batch does not complete in
+    time, the remaining paths are not sent and are counted in
+    ``unsent_paths``.
+
+    Args:
+      cf: A boto3 CloudFront client.
+      distribution_id: Target distribution.
+      paths: Invalidation paths (see ``invalidation_paths()``).
+      wait: Maximum seconds to poll for completion; 0 returns immediately.
+      poll_interval: Seconds between status polls.
+
+    Returns:
+      ``{"distribution_id", "paths", "invalidation_ids", "status"}`` (plus
+      ``unsent_paths`` if batching stopped early) where ``status`` is
+      ``"Completed"``, ``"InProgress"`` (not waited for or the wait timed
+      out) or ``"Skipped"`` (nothing to invalidate).
+
+    Raises:
+      botocore.exceptions.ClientError: If CloudFront returns an API error.
+    """
+    summary = {"distribution_id": distribution_id, "paths": len(paths), "invalidation_ids": []}
+    if not paths:
+        return {**summary, "status": "Skipped"}
+    for start in range(0, len(paths), INVALIDATION_MAX_PATHS):
+        batch = paths[start : start + INVALIDATION_MAX_PATHS]
+        resp = cf.create_invalidation(
+            DistributionId=distribution_id,
+            InvalidationBatch={
+                "Paths": {"Quantity": len(batch), "Items": batch},
+                "CallerReference": f"upload-static-{time.time_ns()}-{start}",
+            },
+        )
+        inv_id = resp["Invalidation"]["Id"]
+        summary["invalidation_ids"].append(inv_id)
+        last = start + INVALIDATION_MAX_PATHS >= len(paths)
+        if last and wait <= 0:
+            return {**summary, "status": "InProgress"}
+        completed = wait_invalidation(
+            cf,
+            distribution_id=distribution_id,
+            invalidation_id=inv_id,
+            timeout=wait if last else INVALIDATION_BATCH_TIMEOUT,
+            poll_interval=poll_interval,
+        )
+        if not completed:
+            unsent = len(paths) - start - len(batch)
+            return {**summary, **({"unsent_paths": unsent} if unsent else {}), "status": "InProgress"}
+    return {**summary, "status": "Completed"}
+
+
+def invalidate_latest(env_info: dict, results: list[dict], *, wait: float = 0) -> dict:
+    """Invalidate the latest aliases overwritten by a run; errors are reported, not raised.
+
+    Args:
+      env_info: Result of ``resolve_env_targets()``.
+      results: ``upload()`` results of the run.
+      wait: Maximum seconds to wait for completion.
+
+    Returns:
+      The ``invalidate_paths()`` summary, or ``{"error": ...}`` shaped like
+      ``error_result()`` if CloudFront could not be reached.
+    """
+    paths = invalidation_paths(results)
+    if not paths:
+        return {"paths": 0, "invalidation_ids": [], "status": "Skipped"}
+    try:
+        cf = _boto3().client("cloudfront")
+        distribution_id = resolve_distribution_id(cf, env_info)
+        return invalidate_paths(cf, distribution_id=distribution_id, paths=paths, wait=wait)
+    except Exception as e:
+        return {"paths": len(paths), "error": error_result("", e)["error"]}
+
+
+# -------- CLI --------
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments for the uploader CLI.
+
+    Returns:
+      An ``argparse.Namespace`` with the following attributes:
+
+      - file (str | None): Path to the source file to upload.
+      - manifest (str | None): Path to a JSON/YAML/CSV batch manifest.
+      - dir (str | None): Directory whose files are uploaded as a batch.
+      - event (str | None): Event identifier (first directory level).
+      - type_code (str | None): Asset type code (second directory level).
+      - slug (str | None): Descriptive slug for the file name.
+      - version_tag (str | None): Version tag (must start with 'v').
       - lang (str | None): Optional language suffix.
       - variant (str | None): Optional variant suffix.
       - dry_run (bool): Whether to print a preview instead of uploading.
+      - part_size_mb (int): Multipart part size in MiB.
+      - max_workers (int): Concurrent part uploads in multipart mode.
+      - multipart_threshold_mb (int): Size in MiB above which multipart is used.
+      - jobs (int | None): Entries uploaded concurrently in batch mode.
+      - backend (str): Batch backend, "threads" or "asyncio".
+      - skip_existing (bool): Whether to skip objects that are already published.
+      - hash_cache (str): Path of the persistent digest cache.
+      - no_hash_cache (bool): Whether to disable the digest cache.
+      - max_bandwidth_mb (float | None): Upload rate cap in MiB/s.
+      - no_adaptive (bool): Whether to keep concurrency fixed at its maximum.
+      - dedup (bool): Whether to copy already-published content server-side.
+      - resumable (bool): Whether to journal multipart uploads for resuming.
+      - journal (str): Path of the upload journal.
+      - preflight (bool): Whether to validate the whole batch before uploading.
+      - cache_policy (str | None): JSON file overriding the Cache-Control rules.
+      - precompress (bool): Whether to publish Brotli/gzip sidecars.
+      - invalidate (bool): Whether to invalidate overwritten latest aliases.
+      - invalidate_wait (float): Seconds to wait for the invalidation to complete.
+      - no_env_cache (bool): Whether to bypass the cached environment resolution.
+      - metrics_file (str | None): File receiving per-phase timings.
+      - metrics_format (str): "jsonl" or "openmetrics".
 
     Notes:
       - Bucket and domain are resolved automatically from the active AWS
-        account via STS; no corresponding flags are provided.
+        account (``LIMITLAB_ENV``, cache or STS); no corresponding flags are
+        provided.
+      - Exactly one of ``--file``, ``--manifest`` or ``--dir`` is required.
+        ``--file`` needs event/type/slug/version-tag; ``--dir`` needs all but
+        the slug (taken from each file stem). With ``--manifest`` the flags
+        act as defaults for entries that omit them.
       - The function performs no validation beyond argument presence. Semantics
         (e.g., file existence and version tag shape) are validated in ``upload()``.
     """
     p = argparse.ArgumentParser(description="Minimal LIMIT.Lab CDN uploader (auto env detection)")
-    p.add_argument("--file", required=True, help="Path to source file")
-    p.add_argument("--event", required=True, help="Event id (e.g., iccv2025)")
-    p.add_argument("--type", required=True, dest="type_code", help="Asset type code (s|p|r|a)")
-    p.add_argument("--slug", required=True, help="Slug (descriptive name)")
-    p.add_argument("--version-tag", required=True, help='Version tag (e.g., "v2025-10-19" or "v1.2.3")')
+    src = p.add_mutually_exclusive_group(required=True)
+    src.add_argument("--file", help="Path to source file")
+    src.add_argument("--manifest", help="Batch manifest (.json, .yaml or .csv) listing files to upload")
+    src.add_argument("--dir", help="Upload every file in this directory (slug = file stem)")
+    p.add_argument("--event", help="Event id (e.g., iccv2025)")
+    p.add_argument("--type", dest="type_code", help="Asset type code (s|p|r|a)")
+    p.add_argument("--slug", help="Slug (descriptive name)")
+    p.add_argument("--version-tag", help='Version tag (e.g., "v2025-10-19" or "v1.2.3")')
     p.add_argument("--lang", default=None, help='Optional language suffix (e.g., "ja" or "-ja")')
     p.add_argument("--variant", default=None, help='Optional variant suffix (e.g., "w1200" or "-w1200")')
-    p.add_argument("--dry-run", action="store_true", help="Print a preview without uploading (still calls STS)")
-    return p.parse_args()
+    p.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print a preview without uploading (set LIMITLAB_ENV=prod|dev to skip STS)",
+    )
+    p.add_argument(
+        "--part-size-mb", type=int, default=MULTIPART_PART_SIZE // MIB, help="Multipart part size in MiB (min 5)"
+    )
+    p.add_argument(
+        "--max-workers", type=int, default=MULTIPART_MAX_WORKERS, help="Concurrent part uploads in multipart mode"
+    )
+    p.add_argument(
+        "--multipart-threshold-mb",
+        type=int,
+        default=MULTIPART_THRESHOLD // MIB,
+        help="Use multipart upload for files larger than this many MiB",
+    )
+    p.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help=f"Entries in flight in batch mode (default: {BATCH_JOBS} threads, 128 with --backend asyncio)",
+    )
+    p.add_argument(
+        "--backend",
+        choices=("threads", "asyncio"),
+        default="threads",
+        help="Batch backend; asyncio (requires aiobotocore) suits many small files",
+    )
+    p.add_argument(
+        "--max-bandwidth-mb",
+        type=float,
+        default=None,
+        help="Cap the total upload rate at this many MiB/s across all workers (threads backend)",
+    )
+    p.add_argument(
+        "--no-adaptive",
+        action="store_true",
+        help="Keep all jobs x max-workers requests in flight instead of adapting to throughput and throttling "
+        "(threads backend)",
+    )
+    p.add_argument(
+        "--skip-existing",
+        action="store_true",
+        help="Skip the upload when the versioned key already holds this content (and the alias points to it)",
+    )
+    p.add_argument("--hash-cache", default=str(HASH_CACHE_PATH), help="Path of the persistent digest cache")
+    p.add_argument(
+        "--no-hash-cache", action="store_true", help="Do not reuse digests from earlier runs (re-hash source files)"
+    )
+    p.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Copy server-side instead of uploading when identical content is already in the bucket "
+        f"(SHA-256 index at {DEDUP_INDEX_KEY}; threads backend)",
+    )
+    p.add_argument(
+        "--resumable",
+        action="store_true",
+        help="Journal multipart uploads so a rerun after a failure only sends the missing parts",
+    )
+    p.add_argument("--journal", default=str(UPLOAD_JOURNAL_PATH), help="Path of the upload journal (--resumable)")
+    p.add_argument(
+        "--preflight",
+        action="store_true",
+        help="Batch mode: validate every name and check for key conflicts (see preflight.py) before uploading; "
+        "on problems print the report and upload nothing",
+    )
+    p.add_argument("--cache-policy", default=None, help="JSON file overriding the Cache-Control rule table")
+    p.add_argument(
+        "--precompress",
+        action="store_true",
+        help="Also publish .br/.gz sidecars (Content-Encoding set) for text-like assets; "
+        "CloudFront serves them by Accept-Encoding",
+    )
+    p.add_argument(
+        "--invalidate",
+        action="store_true",
+        help="Invalidate overwritten latest aliases on CloudFront in one batch (batch output becomes "
+        '{"results": [...], "invalidation": {...}})',
+    )
+    p.add_argument(
+        "--invalidate-wait",
+        type=float,
+        default=0,
+        help="With --invalidate, poll up to this many seconds for the invalidation to complete",
+    )
+    p.add_argument("--no-env-cache", action="store_true", help="Always resolve the environment via STS")
+    p.add_argument("--metrics-file", default=None, help="Also write per-phase timings to this file")
+    p.add_argument(
+        "--metrics-format",
+        choices=("jsonl", "openmetrics"),
+        default="jsonl",
+        help="Format of --metrics-file (jsonl appends one record per phase; openmetrics rewrites the file)",
+    )
+    args = p.parse_args()
+
+    if args.backend == "asyncio":
+        # Bandwidth shaping and the dedup index live in the threaded engine
+        threads_only = {
+            "--dedup": args.dedup,
+            "--max-bandwidth-mb": args.max_bandwidth_mb is not None,
+            "--no-adaptive": args.no_adaptive,
+        }
+        unsupported = [flag for flag, value in threads_only.items() if value]
+        if unsupported:
+            p.error(f"--backend asyncio does not support {', '.join(unsupported)}")
+
+    required = {"--event": args.event, "--type": args.type_code, "--version-tag": args.version_tag}
+    if args.file:
+        required["--slug"] = args.slug
+    if not args.manifest:
+        missing = [flag for flag, value in required.items() if not value]
+        if missing:
+            p.error(f"the following arguments are required: {', '.join(missing)}")
+    return args
 
 
 def main() -> int:
     """CLI entry point.
 
     Steps:
-      1) Resolve environment/bucket/domain via STS (read-only).
-      2) Parse CLI args and call ``upload()``.
-      3) Print a JSON result to stdout.
+      1) Parse CLI args (``--help`` needs no AWS access), then resolve
+         environment/bucket/domain (override, cache or STS; read-only).
+         With ``--resumable``, abort journaled uploads abandoned for more
+         than ``UPLOAD_JOURNAL_MAX_AGE`` (reported on stderr).
+      2) With ``--preflight`` (batch mode), validate every entry and check
+         for key conflicts first; on problems print the report and stop.
+      3) Call ``upload()`` (single file) or
+         ``upload_batch()`` (``--manifest``/``--dir``; ``upload_async``'s
+         ``upload_batch_async()`` with ``--backend asyncio``). Threaded
+         uploads share one ``UploadScheduler`` (bandwidth cap, adaptive
+         concurrency); its summary is reported as ``scheduler``.
+      4) With ``--invalidate``, submit the overwritten latest aliases to
+         CloudFront as one invalidation (optionally waiting for it).
+      5) Print a JSON result to stdout; batch mode prints a JSON array with
+         one result per entry. Every result carries per-phase ``timings``;
+         run-level phases (STS, listings, invalidation) are in
+         ``run_timings`` (single file) or a JSON line on stderr (batch).
+      6) With ``--metrics-file``, write all timings as JSON lines or
+         OpenMetrics.
 
     Exit codes:
-      0: Success (either uploaded or dry-run preview printed).
-      1: Generic error (e.g., file not found, invalid arguments).
+      0: Success (either uploaded or dry-run preview printed). In batch mode,
+         every entry must succeed; otherwise the code of the worst failure
+         is returned.
+      1: Generic error (e.g., file not found, invalid arguments) or a failed
+         ``--preflight`` check.
       3: AWS client error (STS/S3 API responded with an error).
 
     Returns:
       Process exit code: 0 on success, non-zero on failure.
     """
+    hash_cache = journal = None
+    run_timer = PhaseTimer()
+    started = time.perf_counter()
     try:
-        env_info = resolve_env_targets()
         args = parse_args()
+        env_info = resolve_env_targets(
+            run_timer, dry_run=args.dry_run, cache_path=None if args.no_env_cache else ENV_CACHE_PATH
+        )
+        hash_cache = open_hash_cache(None if args.no_hash_cache else Path(args.hash_cache))
+        journal = open_upload_journal(Path(args.journal) if args.resumable else None)
+        if journal and not args.dry_run and journal.stale():
+            with run_timer.phase("abort_stale_uploads"):
+                aborted = abort_stale_uploads(_boto3().client("s3"), journal)
+            print(json.dumps({"aborted_stale_uploads": aborted}, ensure_ascii=False), file=sys.stderr)
+        policies = load_cache_policies(Path(args.cache_policy)) if args.cache_policy else CACHE_POLICIES
+        batch = bool(args.manifest or args.dir)
+        scheduler = UploadScheduler(
+            max_concurrency=(args.jobs or BATCH_JOBS) * args.max_workers if batch else args.max_workers,
+            bytes_per_second=args.max_bandwidth_mb * MIB if args.max_bandwidth_mb else None,
+            adaptive=not args.no_adaptive,
+        )
+        dedup = DedupIndex(env_info["bucket"]) if args.dedup and args.backend == "threads" else None
+        if batch:
+            entries = load_manifest(Path(args.manifest)) if args.manifest else entries_from_dir(Path(args.dir))
+            defaults = {
+                "event": args.event,
+                "type": args.type_code,
+                "slug": args.slug if args.manifest else None,
+                "version_tag": args.version_tag,
+                "lang": args.lang,
+                "variant": args.variant,
+            }
+            if args.preflight:
+                from preflight import preflight
+
+                # The upload reuses every digest the check computes (in memory without a persistent cache)
+                hash_cache = hash_cache or HashCache(Path(":memory:"))
+                with run_timer.phase("preflight"):
+                    report = preflight(entries, domain=env_info["domain"], defaults=defaults, hash_cache=hash_cache)
+                if not report["ok"]:
+                    print(json.dumps(report, ensure_ascii=False, indent=2))
+                    return 1
+            options = {
+                "env_info": env_info,
+                "dry_run": args.dry_run,
+                "defaults": defaults,
+                "part_size": args.part_size_mb * MIB,
+                "max_workers": args.max_workers,
+                "multipart_threshold": args.multipart_threshold_mb * MIB,
+                "skip_existing": args.skip_existing,
+                "hash_cache": hash_cache,
+                "cache_rules": policies["cdn"],
+                "precompress": args.precompress,
+                "timer": run_timer,
+                "journal": journal,
+            }
+            if args.backend == "asyncio":
+                import asyncio
+
+                from upload_async import ASYNC_CONCURRENCY, upload_batch_async
+
+                results = asyncio.run(
+                    upload_batch_async(entries, concurrency=args.jobs or ASYNC_CONCURRENCY, **options)
+                )
+            else:
+                results = upload_batch(
+                    entries, jobs=args.jobs or BATCH_JOBS, scheduler=scheduler, dedup=dedup, **options
+                )
+            errors = [r["error"] for r in results if "error" in r]
+            if args.invalidate and not args.dry_run:
+                with run_timer.phase("cloudfront_invalidation"):
+                    invalidation = invalidate_latest(env_info, results, wait=args.invalidate_wait)
+                errors += [invalidation["error"]] if "error" in invalidation else []
+                print(json.dumps({"results": results, "invalidation": invalidation}, ensure_ascii=False, indent=2))
+            else:
+                print(json.dumps(results, ensure_ascii=False, indent=2))
+            summary = {"run_timings": run_timer.as_dict(), "total_seconds": round(time.perf_counter() - started, 6)}
+            if args.backend == "threads" and not args.dry_run:
+                summary["scheduler"] = scheduler.as_dict()
+            print(json.dumps(summary, ensure_ascii=False), file=sys.stderr)
+            if args.metrics_file:
+                write_metrics(Path(args.metrics_file), metrics_scopes(run_timer, results), args.metrics_format)
+            if any(isinstance(err, dict) for err in errors):
+                return 3
+            return 1 if errors else 0
+
+        s3 = None if args.dry_run else make_s3_client(args.max_workers)
         result = upload(
+            s3=s3,
             bucket=env_info["bucket"],
             domain=env_info["domain"],
             file_path=Path(args.file),
@@ -567,16 +3374,43 @@ def main() -> int:
             dry_run=args.dry_run,
             env=env_info["env"],
             account_id=env_info["account_id"],
+            part_size=args.part_size_mb * MIB,
+            max_workers=args.max_workers,
+            multipart_threshold=args.multipart_threshold_mb * MIB,
+            skip_existing=args.skip_existing,
+            hash_cache=hash_cache,
+            cache_rules=policies["cdn"],
+            precompress=args.precompress,
+            journal=journal,
+            scheduler=scheduler,
+            dedup=dedup,
         )
+        if not args.dry_run:
+            result["scheduler"] = scheduler.as_dict()
+            if dedup is not None:
+                with run_timer.phase("dedup_index_flush"):
+                    dedup.flush(s3)
+        if args.invalidate and not args.dry_run:
+            with run_timer.phase("cloudfront_invalidation"):
+                result["invalidation"] = invalidate_latest(env_info, [result], wait=args.invalidate_wait)
+        result["run_timings"] = run_timer.as_dict()
+        result["total_seconds"] = round(time.perf_counter() - started, 6)
         print(json.dumps(result, ensure_ascii=False, indent=2))
+        if args.metrics_file:
+            write_metrics(Path(args.metrics_file), metrics_scopes(run_timer, [result]), args.metrics_format)
+        error = result.get("invalidation", {}).get("error")
+        if error:
+            return 3 if isinstance(error, dict) else 1
         return 0
-    except ClientError as e:
-        msg = e.response.get("Error", {})
-        print(json.dumps({"error": {"code": msg.get("Code"), "message": msg.get("Message")}}, ensure_ascii=False))
-        return 3
     except Exception as e:
-        print(json.dumps({"error": str(e)}, ensure_ascii=False))
-        return 1
+        # ClientError (STS/S3 API) maps to 3; botocore is only checked if it was ever loaded
+        print(json.dumps({"error": error_result("", e)["error"]}, ensure_ascii=False))
+        return 3 if is_client_error(e) else 1
+    finally:
+        if hash_cache is not None:
+            hash_cache.close()
+        if journal is not None:
+            journal.close()
 
 
 if __name__ == "__main__":
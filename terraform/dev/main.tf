@@ -47,6 +47,11 @@ resource "aws_acm_certificate_validation" "subdomain" {
 module "s3_cloudfront" {
   source = "../modules/s3_cloudfront"
 
+  providers = {
+    aws          = aws
+    aws.virginia = aws.virginia
+  }
+
   bucket_name                = local.bucket_name
   origin_access_control_name = local.origin_access_control_name
 
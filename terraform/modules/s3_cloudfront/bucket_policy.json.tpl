@@ -2,6 +2,17 @@
   "Version": "2008-10-17",
   "Id": "PolicyForCloudFrontPrivateContent",
   "Statement": [
+%{ if length(private_prefixes) > 0 ~}
+    {
+      "Sid": "DenyCloudFrontPrivatePrefixes",
+      "Effect": "Deny",
+      "Principal": {
+        "Service": "cloudfront.amazonaws.com"
+      },
+      "Action": "s3:GetObject",
+      "Resource": ${jsonencode([for prefix in private_prefixes : "arn:aws:s3:::${bucket_name}/${prefix}*"])}
+    },
+%{ endif ~}
     {
       "Sid": "AllowCloudFrontServicePrincipal",
       "Effect": "Allow",
@@ -0,0 +1,63 @@
+// Lambda@Edge origin-request handler that serves precompressed sidecars.
+//
+// scripts/upload_static.py and scripts/sync_site.py (--precompress) store
+// Brotli/gzip encodings of text-like objects next to them as {key}.br and
+// {key}.gz, with the matching Content-Encoding. On a cache miss this handler
+// rewrites the origin request to the best sidecar the viewer accepts, if it
+// exists. The cache policy keys on the normalized Accept-Encoding header and
+// the response headers policy adds "Vary: Accept-Encoding", so each encoding
+// is cached separately at the edge and by downstream caches.
+import { HeadObjectCommand, S3Client } from '@aws-sdk/client-s3'
+
+// Extensions of the Content-Types in COMPRESSIBLE_TYPES (scripts/upload_static.py)
+const COMPRESSIBLE = /\.(?:html?|css|m?js|json|webmanifest|xml|svg|txt|csv|md)$/
+const ENCODINGS = [
+  ['br', '.br'],
+  ['gzip', '.gz'],
+]
+const EXISTS_TTL_MS = 60 * 1000 // matches the distribution's 60 s TTL
+
+const clients = new Map()
+const known = new Map()
+
+async function exists(bucket, region, key) {
+  const id = `${bucket}/${key}`
+  const cached = known.get(id)
+  if (cached && cached.expires > Date.now()) {
+    return cached.exists
+  }
+  if (!clients.has(region)) {
+    clients.set(region, new S3Client({ region }))
+  }
+  let found = true
+  try {
+    await clients.get(region).send(new HeadObjectCommand({ Bucket: bucket, Key: key }))
+  } catch {
+    found = false // 403 without s3:ListBucket, 404 with it
+  }
+  known.set(id, { exists: found, expires: Date.now() + EXISTS_TTL_MS })
+  return found
+}
+
+export const handler = async (event) => {
+  const request = event.Records[0].cf.request
+  const s3 = request.origin && request.origin.s3
+  if (!s3 || !COMPRESSIBLE.test(request.uri)) {
+    return request
+  }
+  const header = request.headers['accept-encoding']
+  const accepted = new Set(
+    (header ? header[0].value : '').split(',').map((token) => token.split(';')[0].trim())
+  )
+  // {bucket}.s3.{region}.amazonaws.com
+  const [bucket, rest] = s3.domainName.split('.s3.')
+  const region = s3.region || (rest.startsWith('amazonaws.') ? 'us-east-1' : rest.split('.')[0])
+  const key = decodeURIComponent(request.uri.slice(1))
+  for (const [encoding, suffix] of ENCODINGS) {
+    if (accepted.has(encoding) && (await exists(bucket, region, key + suffix))) {
+      request.uri += suffix
+      break
+    }
+  }
+  return request
+}
@@ -1,8 +1,9 @@
 terraform {
   required_providers {
     aws = {
-      source  = "hashicorp/aws"
-      version = "5.82.2"
+      source                = "hashicorp/aws"
+      version               = "5.82.2"
+      configuration_aliases = [aws.virginia]
     }
   }
 
@@ -36,8 +37,9 @@ resource "aws_cloudfront_origin_access_control" "cloudfront_origin" {
 resource "aws_s3_bucket_policy" "cloudfront_origin" {
   bucket = aws_s3_bucket.cloudfront_origin.id
   policy = templatefile("${path.module}/bucket_policy.json.tpl", {
-    bucket_name    = aws_s3_bucket.cloudfront_origin.id
-    cloudfront_arn = aws_cloudfront_distribution.s3_distribution.arn
+    bucket_name      = aws_s3_bucket.cloudfront_origin.id
+    cloudfront_arn   = aws_cloudfront_distribution.s3_distribution.arn
+    private_prefixes = var.private_prefixes
   })
 }
 
@@ -71,21 +73,22 @@ resource "aws_cloudfront_distribution" "s3_distribution" {
   }
 
   default_cache_behavior {
-    allowed_methods        = ["GET", "HEAD"]
-    cached_methods         = ["GET", "HEAD"]
-    compress               = "true"
-    default_ttl            = "60"
-    max_ttl                = "60"
-    min_ttl                = "60"
-    smooth_streaming       = "false"
-    target_origin_id       = aws_s3_bucket.cloudfront_origin.id
-    viewer_protocol_policy = "redirect-to-https"
-
-    forwarded_values {
-      query_string = false
-
-      cookies {
-        forward = "none"
+    allowed_methods            = ["GET", "HEAD"]
+    cached_methods             = ["GET", "HEAD"]
+    compress                   = "true"
+    smooth_streaming           = "false"
+    target_origin_id           = aws_s3_bucket.cloudfront_origin.id
+    viewer_protocol_policy     = "redirect-to-https"
+    cache_policy_id            = aws_cloudfront_cache_policy.s3_distribution.id
+    response_headers_policy_id = aws_cloudfront_response_headers_policy.s3_distribution.id
+
+    # Serve {key}.br / {key}.gz sidecars published with --precompress.
+    dynamic "lambda_function_association" {
+      for_each = aws_lambda_function.precompressed_sidecars
+      content {
+        event_type   = "origin-request"
+        lambda_arn   = lambda_function_association.value.qualified_arn
+        include_body = false
       }
     }
   }
@@ -104,3 +107,117 @@ resource "aws_cloudfront_distribution" "s3_distribution" {
     }
   }
 }
+
+# Same fixed 60 s TTL as before. The normalized Accept-Encoding header is part of the
+# cache key and is forwarded to the origin request handler below, so identity, gzip
+# and Brotli responses are cached separately.
+resource "aws_cloudfront_cache_policy" "s3_distribution" {
+  name        = "${var.bucket_name}-cache"
+  min_ttl     = 60
+  default_ttl = 60
+  max_ttl     = 60
+
+  parameters_in_cache_key_and_forwarded_to_origin {
+    enable_accept_encoding_brotli = true
+    enable_accept_encoding_gzip   = true
+
+    cookies_config {
+      cookie_behavior = "none"
+    }
+
+    headers_config {
+      header_behavior = "none"
+    }
+
+    query_strings_config {
+      query_string_behavior = "none"
+    }
+  }
+}
+
+# S3 cannot store a Vary header, so it is added at the edge for every response.
+resource "aws_cloudfront_response_headers_policy" "s3_distribution" {
+  name = "${var.bucket_name}-vary"
+
+  custom_headers_config {
+    items {
+      header   = "Vary"
+      value    = "Accept-Encoding"
+      override = true
+    }
+  }
+}
+
+# Lambda@Edge origin-request handler: on a cache miss, rewrite the request to the
+# {key}.br or {key}.gz sidecar the viewer accepts when that object exists.
+# Only created with var.precompressed_sidecars. The bundle is committed; rebuild it
+# with scripts/build_edge_bundle.py after editing edge/precompressed_sidecars.mjs.
+resource "aws_iam_role" "precompressed_sidecars" {
+  count = var.precompressed_sidecars ? 1 : 0
+
+  name = "${var.bucket_name}-sidecars-edge"
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [{
+      Effect    = "Allow"
+      Principal = { Service = ["lambda.amazonaws.com", "edgelambda.amazonaws.com"] }
+      Action    = "sts:AssumeRole"
+    }]
+  })
+}
+
+resource "aws_iam_role_policy" "precompressed_sidecars" {
+  count = var.precompressed_sidecars ? 1 : 0
+
+  name = "head-sidecars"
+  role = aws_iam_role.precompressed_sidecars[0].id
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        # HeadObject is authorized by s3:GetObject
+        Effect   = "Allow"
+        Action   = ["s3:GetObject"]
+        Resource = ["${aws_s3_bucket.cloudfront_origin.arn}/*"]
+      },
+      {
+        # Lambda@Edge writes its logs in the region that ran it
+        Effect   = "Allow"
+        Action   = ["logs:CreateLogGroup", "logs:CreateLogStream", "logs:PutLogEvents"]
+        Resource = ["arn:aws:logs:*:*:*"]
+      }
+    ]
+  })
+}
+
+resource "aws_lambda_function" "precompressed_sidecars" {
+  count = var.precompressed_sidecars ? 1 : 0
+
+  # Lambda@Edge functions must be created in us-east-1.
+  provider = aws.virginia
+
+  function_name    = "${var.bucket_name}-sidecars"
+  role             = aws_iam_role.precompressed_sidecars[0].arn
+  runtime          = "nodejs20.x"
+  handler          = "precompressed_sidecars.handler"
+  filename         = "${path.module}/edge/precompressed_sidecars.zip"
+  source_code_hash = filebase64sha256("${path.module}/edge/precompressed_sidecars.zip")
+  memory_size      = 128
+  timeout          = 5
+  publish          = true
+}
+
+moved {
+  from = aws_iam_role.precompressed_sidecars
+  to   = aws_iam_role.precompressed_sidecars[0]
+}
+
+moved {
+  from = aws_iam_role_policy.precompressed_sidecars
+  to   = aws_iam_role_policy.precompressed_sidecars[0]
+}
+
+moved {
+  from = aws_lambda_function.precompressed_sidecars
+  to   = aws_lambda_function.precompressed_sidecars[0]
+}
@@ -18,4 +18,16 @@ variable "own_domain_names" {
     acm_certificate_arn = null
     aliases             = null
   }
-}
\ No newline at end of file
+}
+
+variable "private_prefixes" {
+  type        = list(string)
+  description = "Key prefixes CloudFront must never serve (e.g. ['_private/']). The bucket policy denies them to the distribution."
+  default     = []
+}
+
+variable "precompressed_sidecars" {
+  type        = bool
+  description = "Attach the Lambda@Edge origin-request handler that serves {key}.br / {key}.gz sidecars. Enable only where objects are published with --precompress."
+  default     = false
+}
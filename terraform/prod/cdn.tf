@@ -7,9 +7,20 @@ locals {
 module "cdn_s3_cloudfront" {
   source = "../modules/s3_cloudfront"
 
+  providers = {
+    aws          = aws
+    aws.virginia = aws.virginia
+  }
+
   bucket_name                = local.cdn_bucket_name
   origin_access_control_name = local.cdn_origin_access_control_name
 
+  # Publisher bookkeeping (dedup index); "_index/" held it before it moved.
+  private_prefixes = ["_private/", "_index/"]
+
+  # Assets are published with --precompress; serve their .br/.gz sidecars.
+  precompressed_sidecars = true
+
   own_domain_names = {
     acm_certificate_arn = data.aws_acm_certificate.virginia_cert.arn
     aliases             = [local.cdn_domain]